@@ -0,0 +1,87 @@
+"""
+Benchmark: memory per idle account in a batch runner
+Compares holding a logged-in TeveClub (with its requests.Session) per
+account, the dicts AccountStore yields, and fleet.AccountState records.
+Every account has a session cookie and one of a few user agents, as after
+a run.
+
+Run from the repository root:
+    python benchmarks/bench_account_memory.py [accounts]
+"""
+import gc
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.bot_core import TeveClub
+from src.fleet import AccountState
+
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:137.0) Gecko/20100101 Firefox/137.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/124.0 Safari/537.36",
+]
+
+
+def fresh(text):
+    """A new copy of a string, as every row read from SQLite has"""
+    return text.encode().decode()
+
+
+def record(index):
+    """An account as AccountStore returns it"""
+    return {
+        'username': f'camel{index:06d}',
+        'password': f'secret{index:06d}',
+        'cookies': [[fresh('teveclub_sess'), f'{index:032x}', fresh('teveclub.hu'), fresh('/')]],
+        'user_agent': fresh(USER_AGENTS[index % len(USER_AGENTS)]),
+        'food_id': 0,
+        'drink_id': 0,
+        'last_run': 1700000000.0 + index,
+        'last_ok': True,
+        'last_error': None,
+        'next_due': 1700086400.0 + index,
+    }
+
+
+def bot(index):
+    """A TeveClub kept around between runs, with its session cookie"""
+    data = record(index)
+    teve = TeveClub(data['username'], data['password'])
+    teve.user_agent = data['user_agent']
+    teve.session.headers.update({"User-Agent": teve.user_agent})
+    name, value, domain, path = data['cookies'][0]
+    teve.session.cookies.set(name, value, domain=domain, path=path)
+    return teve
+
+
+def measure(build, count):
+    """Bytes allocated per account by `count` calls of build(index), kept alive"""
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    kept = [build(index) for index in range(count)]
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del kept
+    return used / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rows = [
+        ('TeveClub + requests.Session', measure(bot, count)),
+        ('AccountStore dict', measure(record, count)),
+        ('AccountState (__slots__)', measure(lambda i: AccountState.from_record(record(i)), count)),
+    ]
+    print(f"Idle accounts: {count}")
+    for name, per_account in rows:
+        print(f"{name:30} {per_account:9,.0f} bytes/account "
+              f"{per_account * 100000 / 2**20:8,.1f} MB per 100k")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: serialization and transfer of a proxy JSON response
+Compares Django's JsonResponse (stdlib json) with bot_api.encoding on a
+synthetic myteve.pet-sized payload, and the body size and transfer time
+with no compression, gzip and brotli
+
+Run from the repository root:
+    python benchmarks/bench_json_encoding.py [iterations]
+"""
+import gzip
+import os
+import random
+import sys
+import timeit
+from pathlib import Path
+
+DJANGO_DIR = Path(__file__).resolve().parent.parent / 'django'
+sys.path.insert(0, str(DJANGO_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'teveclub_web.settings')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.http import JsonResponse as DjangoJsonResponse
+from bot_api import encoding
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Link speeds used for the transfer estimate, in bits per second
+LINKS = {'3G (1.5 Mbit/s)': 1.5e6, 'DSL (10 Mbit/s)': 10e6}
+
+
+def sample_payload():
+    """A proxy response shaped like myteve.pet: ~40 KB of nested-table HTML"""
+    rng = random.Random(42)
+    words = ('teve', 'etető', 'itató', 'széna', 'kóla', 'pezsgő', 'trükk', 'vágta',
+             'tanít', 'jóllakott', 'szomjas', 'éhes', 'pont', 'szint', 'barát', 'oázis')
+    rows = []
+    for i in range(160):
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(8, 16)))
+        rows.append(
+            f'<tr><td class="c{i % 7}"><a href="/user.pet?id={rng.randint(1, 10**6)}">'
+            f'<img src="/img_des/files/{rng.randint(0, 23)}.gif"></a></td>'
+            f'<td>{text}</td><td><div>{rng.randint(0, 9999)} pont<br>'
+            f'{rng.choice(words).capitalize()}</div></td></tr>\n'
+        )
+    html = (
+        '<html><head><title>TeveClub</title></head><body><center><table>'
+        + ''.join(rows)
+        + '<form><input type="submit" value="Mehet!"></form>Teve Legyen Veled!'
+        + '</table></center></body></html>'
+    )
+    return {'success': True, 'html': html, 'status': 200}
+
+
+def per_call_ms(fn, iterations):
+    return min(timeit.repeat(fn, number=iterations, repeat=3)) / iterations * 1000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    payload = sample_payload()
+
+    print(f"Payload HTML: {len(payload['html']) / 1024:.1f} KB")
+    print()
+    print("Serialization (ms per response)")
+    print(f"  django JsonResponse (stdlib): "
+          f"{per_call_ms(lambda: DjangoJsonResponse(payload), iterations):.3f}")
+    print(f"  bot_api JsonResponse ({settings.JSON_ENCODER}, orjson installed: {encoding.orjson is not None}): "
+          f"{per_call_ms(lambda: encoding.JsonResponse(payload), iterations):.3f}")
+
+    body = encoding.dumps(payload)
+    variants = [('identity', body, 0.0)]
+    variants.append(('gzip', gzip.compress(body, compresslevel=6),
+                     per_call_ms(lambda: gzip.compress(body, compresslevel=6), iterations)))
+    if brotli is not None:
+        variants.append(('br', brotli.compress(body, quality=5),
+                         per_call_ms(lambda: brotli.compress(body, quality=5), iterations)))
+
+    print()
+    print("Transfer (body size, compression cost, time on the wire)")
+    for name, data, cost in variants:
+        wire = ', '.join(f"{link}: {len(data) * 8 / bps * 1000:.1f} ms" for link, bps in LINKS.items())
+        print(f"  {name:8s} {len(data) / 1024:6.1f} KB  +{cost:.3f} ms  {wire}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: CPU per teveclub.hu response, str-based vs src.page.Page
+Replays what get_current_state() and feed() do with one myteve.pet
+response: a marker check, the food/drink regex and the lxml trick parse.
+The old code read r.text (decoded again on every access) and r.content.
+When the response names no charset, requests detects it on each r.text
+access. Page pins the encoding, checks markers on the bytes and decodes
+at most once.
+
+Run from the repository root:
+    python benchmarks/bench_response_decoding.py [iterations]
+"""
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import requests
+from src.bot_core import LOGGED_IN_MARKER, _parse_food_drink, _parse_trick
+from src.page import Page
+
+
+CONTENT_TYPES = {
+    'declared charset': 'text/html; charset=iso-8859-2',
+    'text/html, no charset': 'text/html',
+    'no content type': '',
+}
+
+
+def sample_body():
+    """A myteve.pet-sized (~40 KB) Latin-2 page with the markers the bot looks for"""
+    rows = ''.join(f'<tr><td>Sor {i}: árvíztűrő tükörfúrógép</td><td>{i}</td></tr>'
+                   for i in range(600))
+    html = (
+        '<html><body><center><table><tr><td>menu</td><td><center>'
+        '<table><tr><td>a</td></tr></table><table><tr><td>b</td></tr></table>'
+        '<table><tr><td><table><tr><td>1</td></tr><tr><td>2</td></tr>'
+        '<tr><td>3</td><td><div>Tanult trükk: ugrás<br>szint 3</div></td></tr>'
+        '</table></td></tr></table></center></td></tr></table></center>'
+        f'<p>{LOGGED_IN_MARKER}</p>'
+        '<p>Etető <img src="/img/kaja/9.gif"> Itató <img src="/img/pia/8.gif"></p>'
+        f'<table>{rows}</table><form><input value="Mehet!"></form></body></html>'
+    )
+    return html.encode('iso-8859-2')
+
+
+def response(body, content_type):
+    r = requests.Response()
+    r.status_code = 200
+    r._content = body
+    if content_type:
+        r.headers['Content-Type'] = content_type
+    r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+    return r
+
+
+def old_path(r):
+    """The bot before Page: every check reads r.text"""
+    assert LOGGED_IN_MARKER in r.text
+    assert 'Mehet!' in r.text
+    state = _parse_food_drink(r.text)
+    from lxml import html as lxml_html
+    lxml_html.fromstring(r.content)
+    return state
+
+
+def new_path(r):
+    page = Page(r)
+    assert LOGGED_IN_MARKER in page
+    assert 'Mehet!' in page
+    state = _parse_food_drink(page.text)
+    _parse_trick(page)
+    return state
+
+
+def per_call_ms(fn, body, content_type, iterations):
+    # A fresh response per call, as from the network
+    return min(timeit.repeat(lambda: fn(response(body, content_type)),
+                             number=iterations, repeat=3)) / iterations * 1000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    body = sample_body()
+    print(f"Page: {len(body) / 1024:.1f} KB, {iterations} responses per run")
+    for name, content_type in CONTENT_TYPES.items():
+        old = per_call_ms(old_path, body, content_type, iterations)
+        new = per_call_ms(new_path, body, content_type, iterations)
+        print(f"  {name:24s} r.text: {old:7.3f} ms   Page: {new:6.3f} ms   "
+              f"saved {old - new:7.3f} ms per response")
+
+
+if __name__ == '__main__':
+    main()
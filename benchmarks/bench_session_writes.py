@@ -0,0 +1,78 @@
+"""
+Benchmark: SQLite writes per proxied request
+Drives /api/proxy/ through the Django test client with a canned upstream
+response and counts INSERT/UPDATE/DELETE statements on the default database
+
+Run from the repository root:
+    python benchmarks/bench_session_writes.py [requests]
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+DJANGO_DIR = Path(__file__).resolve().parent.parent / 'django'
+sys.path.insert(0, str(DJANGO_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'teveclub_web.settings')
+os.environ.setdefault('CACHE_DIR', tempfile.mkdtemp(prefix='teveclub-bench-'))
+
+import django
+django.setup()
+
+import requests
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+
+
+def fake_response(session, cookies):
+    """Build a canned myteve.pet response and set the given upstream cookies"""
+    for name, value in cookies.items():
+        session.cookies.set(name, value, domain='teveclub.hu', path='/')
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b'<html><body>Teve Legyen Veled!</body></html>'
+    response.encoding = 'utf-8'
+    return response
+
+
+def run(count):
+    """Issue `count` proxied GETs and return the number of database writes"""
+    writes = []
+
+    def counter(execute, sql, params, many, context):
+        if sql.lstrip().split(' ', 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            writes.append(sql)
+        return execute(sql, params, many, context)
+
+    def request(session, method, url, **kwargs):
+        # Upstream sets its session cookie once; later responses leave the jar unchanged
+        return fake_response(session, {'teveclub_sess': 'abc123'})
+
+    client = Client()
+    payload = '{"url": "https://teveclub.hu/myteve.pet", "method": "GET"}'
+    with mock.patch.object(requests.Session, 'request', request), \
+            connection.execute_wrapper(counter):
+        for _ in range(count):
+            client.post('/api/proxy/', payload, content_type='application/json')
+    return len(writes)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        writes = run(count)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    from django.conf import settings
+    print(f"SESSION_ENGINE: {settings.SESSION_ENGINE}")
+    print(f"Proxied requests: {count}")
+    print(f"SQLite writes:    {writes} ({writes / count:.2f} per request)")
+
+
+if __name__ == '__main__':
+    main()
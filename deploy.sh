@@ -218,9 +218,11 @@ Group=ubuntu
 WorkingDirectory=$SCRIPT_DIR/django
 Environment="PATH=$SCRIPT_DIR/venv/bin"
 Environment="PYTHONPATH=$SCRIPT_DIR/django"
+ExecStartPre=/bin/rm -rf $SCRIPT_DIR/django/metrics
 ExecStart=$SCRIPT_DIR/venv/bin/gunicorn teveclub_web.wsgi:application \\
     --bind 0.0.0.0:8000 \\
     --workers 3 \\
+    --threads 4 \\
     --timeout 60 \\
     --access-logfile $SCRIPT_DIR/logs/access.log \\
     --error-logfile $SCRIPT_DIR/logs/error.log \\
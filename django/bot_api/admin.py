@@ -0,0 +1,14 @@
+"""
+Admin for the bot_api app
+"""
+from django.contrib import admin
+from .models import Account
+
+
+@admin.register(Account)
+class AccountAdmin(admin.ModelAdmin):
+    list_display = ('username', 'owner', 'status', 'step', 'last_run')
+    list_filter = ('status',)
+    search_fields = ('username',)
+    exclude = ('password',)
+    readonly_fields = ('status', 'step', 'message', 'last_run')
@@ -0,0 +1,248 @@
+"""
+Admission control for views that call teveclub.hu
+Bounds the upstream calls in flight across all gunicorn workers and per
+Django session, and rejects quickly with 429 + Retry-After once a limit is
+hit, so overload produces fast retries instead of requests timing out in
+nginx. Only calls that actually go upstream take a slot: a GET that waits
+on an identical in-flight GET (coalesce.py) is admitted for free.
+
+The shared slots are lock files in ADMISSION_DIR: holding an flock on one
+holds the slot, and the kernel releases it if the worker dies, so a crash
+never leaks capacity. Without ADMISSION_DIR (or without fcntl, e.g. on
+Windows) every limit is counted per worker process instead.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+from django.conf import settings
+from .encoding import JsonResponse
+from .metrics import registry
+
+try:
+    import fcntl
+except ImportError:  # Windows development server
+    fcntl = None
+
+
+# Sessions are hashed into this many lock file groups; two sessions in
+# the same group share one per-session limit
+SESSION_BUCKETS = 1024
+
+
+class _SlotFiles:
+    """Slots shared by every process on the host, one lock file each"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def take(self, name, count):
+        """
+        Hold one of `count` slots called `name`
+
+        Returns:
+            int or None: File descriptor to pass to give(), None if all are held
+        """
+        for index in range(count):
+            fd = os.open(self.directory / f'{name}.{index}', os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                continue
+            return fd
+        return None
+
+    def give(self, fd):
+        """Free a slot from take()"""
+        os.close(fd)  # Closing drops the lock
+
+
+class AdmissionController:
+    """Bounded in-flight counters with a latency estimate for Retry-After"""
+
+    # Weight of the newest sample in the latency moving average
+    LATENCY_ALPHA = 0.2
+
+    def __init__(self, max_in_flight, max_per_session, max_per_worker, directory=None):
+        """
+        Args:
+            max_in_flight (int): Upstream calls allowed at once on this host
+                (per process without `directory`)
+            max_per_session (int): Upstream calls allowed at once per session
+            max_per_worker (int): Upstream calls allowed at once in this
+                process, so some of its threads stay free to answer 429s
+            directory (str, optional): Where the shared slot files live
+        """
+        self.max_in_flight = max_in_flight
+        self.max_per_session = max_per_session
+        self.max_per_worker = max_per_worker
+        self.slots = _SlotFiles(directory) if directory and fcntl else None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._per_session = {}
+        self._avg_latency = 1.0
+
+    def _take_local(self, session_key):
+        with self._lock:
+            if self._in_flight >= self.max_per_worker:
+                return False
+            if self.slots is None:
+                if self._in_flight >= self.max_in_flight:
+                    return False
+                if session_key and self._per_session.get(session_key, 0) >= self.max_per_session:
+                    return False
+                if session_key:
+                    self._per_session[session_key] = self._per_session.get(session_key, 0) + 1
+            self._in_flight += 1
+            return True
+
+    def _give_local(self, session_key):
+        with self._lock:
+            self._in_flight -= 1
+            if self.slots is None and session_key:
+                remaining = self._per_session.get(session_key, 1) - 1
+                if remaining:
+                    self._per_session[session_key] = remaining
+                else:
+                    self._per_session.pop(session_key, None)
+
+    def acquire(self, session_key):
+        """
+        Reserve a slot for one upstream call
+
+        Args:
+            session_key (str or None): Django session key
+
+        Returns:
+            tuple or None: Token for release(), None if the caller should back off
+        """
+        if not self._take_local(session_key):
+            return None
+        held = []
+        if self.slots is not None:
+            names = [('all', self.max_in_flight)]
+            if session_key:
+                bucket = int(hashlib.sha256(session_key.encode()).hexdigest(), 16) % SESSION_BUCKETS
+                names.append((f'session-{bucket}', self.max_per_session))
+            for name, count in names:
+                fd = self.slots.take(name, count)
+                if fd is None:
+                    for fd in held:
+                        self.slots.give(fd)
+                    self._give_local(session_key)
+                    return None
+                held.append(fd)
+        return session_key, held
+
+    def release(self, token, elapsed):
+        """
+        Free a slot and fold the call's duration into the latency estimate
+
+        Args:
+            token (tuple): Returned by acquire()
+            elapsed (float): Seconds the call took
+        """
+        session_key, held = token
+        for fd in held:
+            self.slots.give(fd)
+        self._give_local(session_key)
+        with self._lock:
+            self._avg_latency += self.LATENCY_ALPHA * (elapsed - self._avg_latency)
+
+    def hold_thread(self):
+        """
+        Count a long-lived request that makes no upstream call, e.g. a WSGI
+        live stream, against the per-worker limit while it holds its thread
+
+        Returns:
+            bool: False if the worker has no thread to spare
+        """
+        with self._lock:
+            if self._in_flight >= self.max_per_worker:
+                return False
+            self._in_flight += 1
+            return True
+
+    def free_thread(self):
+        """Undo hold_thread()"""
+        with self._lock:
+            self._in_flight -= 1
+
+    def retry_after(self):
+        """
+        Seconds a rejected client should wait: the time needed to drain the
+        calls ahead of it at the observed average upstream latency
+
+        Returns:
+            int: Retry-After value, at least 1
+        """
+        with self._lock:
+            if self.slots is not None:
+                # Rejected because every shared slot is taken
+                backlog = 1.0
+            else:
+                backlog = self._in_flight / max(self.max_in_flight, 1)
+            return max(1, math.ceil(self._avg_latency * backlog))
+
+
+class Rejected(Exception):
+    """No upstream slot was free; admission_controlled answers with 429"""
+
+
+def admitted(request, fetch):
+    """
+    Wrap an upstream call so it only runs with a slot
+
+    Args:
+        request: Django request; its session key is read when the call runs
+        fetch (callable): Performs the upstream request
+
+    Returns:
+        callable: Runs fetch() inside a slot, raises Rejected if none is free
+    """
+    def call():
+        token = controller.acquire(request.session.session_key)
+        if token is None:
+            raise Rejected()
+        start = time.monotonic()
+        try:
+            return fetch()
+        finally:
+            controller.release(token, time.monotonic() - start)
+    return call
+
+
+controller = AdmissionController(
+    settings.UPSTREAM_MAX_IN_FLIGHT,
+    settings.UPSTREAM_MAX_IN_FLIGHT_PER_SESSION,
+    settings.UPSTREAM_MAX_IN_FLIGHT_PER_WORKER,
+    settings.ADMISSION_DIR,
+)
+
+
+def admission_controlled(view):
+    """
+    Answer with 429 when an upstream call of the view was not admitted
+    The view wraps its upstream calls with admitted() and lets Rejected
+    propagate.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except Rejected:
+            retry_after = controller.retry_after()
+            registry.inc('teveclub_admission_rejected_total', view=view.__name__)
+            response = JsonResponse({
+                'success': False,
+                'message': 'Server busy, please retry',
+                'retryAfter': retry_after
+            }, status=429)
+            response['Retry-After'] = str(retry_after)
+            return response
+    return wrapper
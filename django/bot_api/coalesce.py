@@ -0,0 +1,74 @@
+"""
+Single-flight request coalescing for the teveclub.hu proxy
+While an upstream GET for (session, URL) is in flight, identical GETs wait
+for it and share its response instead of going upstream themselves
+"""
+import threading
+
+
+class _Call:
+    """One in-flight upstream call and its outcome"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into a single execution"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """
+        Run fn() unless a call with the same key is already running
+
+        Args:
+            key (tuple): (session key, URL) identifying the call
+            fn (callable): Performs the upstream request
+
+        Returns:
+            tuple: (result, shared) where shared is True for followers
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def forget(self, session_key):
+        """
+        Detach every in-flight call of a session so later GETs start fresh
+        Used before POSTs, whose effects an earlier GET would not reflect
+
+        Args:
+            session_key (str): Django session key
+        """
+        with self._lock:
+            for key in [k for k in self._calls if k[0] == session_key]:
+                del self._calls[key]
+
+
+# Shared by all request threads of this worker process
+upstream_gets = SingleFlight()
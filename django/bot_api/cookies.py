@@ -0,0 +1,76 @@
+"""
+Compact, full-fidelity cookie jar serialization
+Stores each upstream cookie with its domain, path and expiry, so cookies
+with the same name on different paths survive a round trip through the
+Django session or the gateway socket, and expired cookies are dropped
+instead of being carried forward indefinitely.
+"""
+import time
+from requests.cookies import create_cookie
+
+
+# Django session key holding the upstream teveclub.hu cookies
+SESSION_COOKIES_KEY = 'requests_session_cookies'
+
+# Django session key holding the teveclub.hu account name, set at login
+SESSION_ACCOUNT_KEY = 'teveclub_account'
+
+
+def dump_jar(jar, now=None):
+    """
+    Serialize a cookie jar to JSON-friendly rows, skipping expired cookies
+
+    Args:
+        jar (http.cookiejar.CookieJar): Jar to serialize
+        now (float, optional): Current Unix time
+
+    Returns:
+        list: [name, value, domain, path, expires, secure, http_only] rows,
+            sorted so equal jars serialize equally
+    """
+    now = time.time() if now is None else now
+    rows = []
+    for cookie in jar:
+        if cookie.expires is not None and cookie.expires <= now:
+            continue
+        rows.append([
+            cookie.name,
+            cookie.value,
+            cookie.domain,
+            cookie.path,
+            cookie.expires,
+            int(cookie.secure),
+            int(cookie.has_nonstandard_attr('HttpOnly')),
+        ])
+    rows.sort(key=lambda row: (row[2], row[3], row[0]))
+    return rows
+
+
+def load_jar(jar, rows, now=None):
+    """
+    Add serialized cookies to a jar, skipping any that expired since
+
+    Args:
+        jar (http.cookiejar.CookieJar): Jar to fill
+        rows (list or dict): Output of dump_jar(); a flat {name: value} dict
+            from older sessions is accepted too
+        now (float, optional): Current Unix time
+    """
+    if isinstance(rows, dict):
+        for name, value in rows.items():
+            jar.set_cookie(create_cookie(name, value))
+        return
+
+    now = time.time() if now is None else now
+    for name, value, domain, path, expires, secure, http_only in rows:
+        if expires is not None and expires <= now:
+            continue
+        jar.set_cookie(create_cookie(
+            name,
+            value,
+            domain=domain,
+            path=path,
+            expires=expires,
+            secure=bool(secure),
+            rest={'HttpOnly': None} if http_only else {},
+        ))
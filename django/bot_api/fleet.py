@@ -0,0 +1,95 @@
+"""
+Server-side runner for operator accounts
+Runs TeveClub.run_bot for many accounts on a bounded thread pool in the
+scheduler's background lane, recording progress and results on each
+Account row. Every gunicorn worker process has its own pool, so up to
+workers x FLEET_PARALLELISM runs (3 x 4 with the shipped service) can be
+in progress at once; the Account status rows keep them from overlapping.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from src.bot_core import TeveClub
+from . import upstream
+from .log import log_event
+from .metrics import registry
+from .models import Account
+
+
+logger = logging.getLogger(__name__)
+
+# One per worker process, see above
+_executor = ThreadPoolExecutor(max_workers=settings.FLEET_PARALLELISM,
+                               thread_name_prefix='fleet')
+
+
+def queue_runs(owner, ids=None):
+    """
+    Queue a run for an operator's accounts
+
+    Accounts already queued or running are skipped, unless they have been
+    stuck that way longer than FLEET_STALE_AFTER (e.g. after a restart).
+
+    Args:
+        owner (User): Operator owning the accounts
+        ids (list, optional): Account ids to run; all accounts if omitted
+
+    Returns:
+        int: Number of accounts queued
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.FLEET_STALE_AFTER)
+    runnable = ~Q(status__in=Account.ACTIVE) | Q(updated__lt=stale)
+    accounts = Account.objects.filter(owner=owner).filter(runnable)
+    if ids is not None:
+        accounts = accounts.filter(id__in=ids)
+
+    # One UPDATE claims every row still runnable, with the same filter: when
+    # two requests (possibly in different workers) race, each row goes to
+    # one of them, and `updated=now` tells this request's rows apart
+    accounts.update(status=Account.QUEUED, step='', message='', updated=now)
+    claimed = Account.objects.filter(owner=owner, status=Account.QUEUED, updated=now)
+    if ids is not None:
+        claimed = claimed.filter(id__in=ids)
+    queued = list(claimed.values_list('id', flat=True))
+    for account_id in queued:
+        _executor.submit(_run_account, account_id)
+    log_event(logger, logging.INFO, 'fleet.queued', owner=owner.pk, accounts=len(queued))
+    return len(queued)
+
+
+def _run_account(account_id):
+    """Execute one account's run on a pool thread"""
+    close_old_connections()
+    try:
+        # Claim the row so a second queue_runs() cannot run it twice
+        claimed = Account.objects.filter(id=account_id, status=Account.QUEUED).update(
+            status=Account.RUNNING, updated=timezone.now())
+        if not claimed:
+            return
+        account = Account.objects.get(id=account_id)
+
+        def progress(step):
+            Account.objects.filter(id=account_id).update(step=step, updated=timezone.now())
+
+        try:
+            teve = TeveClub(account.username, account.password, scheduler=upstream.scheduler)
+            if teve.run_bot(progress=progress):
+                status, message = Account.DONE, 'All tasks done'
+            else:
+                status, message = Account.FAILED, 'Login failed'
+        except Exception as e:
+            status, message = Account.FAILED, f'Error: {str(e)}'[:255]
+
+        now = timezone.now()
+        Account.objects.filter(id=account_id).update(
+            status=status, message=message, last_run=now, updated=now)
+        registry.inc('teveclub_fleet_runs_total', result=status)
+    except Exception as e:
+        log_event(logger, logging.ERROR, 'fleet.error', exc_info=True, account=account_id, error=str(e))
+    finally:
+        close_old_connections()
@@ -0,0 +1,436 @@
+"""
+Upstream gateway shared by all gunicorn workers
+A single local process owns every teveclub.hu connection, the per-session
+cookie jars, rate limiting and a short-lived page cache. Workers talk to it
+over a Unix socket with length-prefixed frames: a JSON header followed by
+a raw body, so page HTML crosses the socket without re-encoding.
+
+The socket carries session cookies and login passwords, so it lives in a
+directory only its owner can write to, is created owner-only, and clients
+check its owner before sending anything.
+
+Run it with:  python manage.py upstream_gateway
+"""
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import RequestsCookieJar
+from requests.structures import CaseInsensitiveDict
+from .coalesce import SingleFlight
+from .cookies import dump_jar, load_jar
+
+
+_FRAME = struct.Struct('!II')  # header length, body length
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise ConnectionError('Gateway connection closed')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def send_frame(sock, header, body=b''):
+    """Write one frame (JSON header + raw body) to a socket"""
+    head = json.dumps(header).encode('utf-8')
+    sock.sendall(_FRAME.pack(len(head), len(body)) + head + body)
+
+
+def recv_frame(sock):
+    """
+    Read one frame from a socket
+
+    Returns:
+        tuple: (header dict, body bytes)
+    """
+    head_len, body_len = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    header = json.loads(_recv_exact(sock, head_len))
+    return header, _recv_exact(sock, body_len)
+
+
+# Methods a failed send may repeat
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+# Seconds the client waits for a reply beyond the gateway's own timeout
+REPLY_MARGIN = 5
+
+# Longest the client waits for a reply: below nginx's proxy_read_timeout
+# (60s), so a worker thread never outlives the browser request it serves
+MAX_REPLY_WAIT = 55
+
+
+def default_socket_path():
+    """
+    Socket in $XDG_RUNTIME_DIR, else in a per-user directory under the temp
+    dir (created 0700 by the gateway)
+    """
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return os.path.join(os.environ['XDG_RUNTIME_DIR'], 'teveclub-gateway.sock')
+    return os.path.join(tempfile.gettempdir(), f'teveclub-gateway-{os.getuid()}', 'gateway.sock')
+
+
+def _check_directory(directory):
+    """
+    Make sure nobody else can create or swap sockets in `directory`
+
+    Raises:
+        PermissionError: The directory belongs to another user or is
+            writable by group or others
+    """
+    info = os.stat(directory)
+    if info.st_uid not in (os.getuid(), 0):
+        raise PermissionError(f'{directory} belongs to another user')
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f'{directory} is writable by other users')
+
+
+class GatewayUnavailable(Exception):
+    """The gateway socket could not be reached; callers go direct instead"""
+
+
+def _check_socket(path):
+    """
+    Make sure the gateway socket was created by this user before sending
+    it cookies and passwords
+
+    Raises:
+        GatewayUnavailable: The socket is missing, belongs to another user,
+            or lives in a directory others could plant it in
+    """
+    try:
+        if os.stat(path).st_uid != os.getuid():
+            raise GatewayUnavailable(f'{path} belongs to another user')
+        _check_directory(os.path.dirname(os.path.abspath(path)))
+    except OSError as e:
+        raise GatewayUnavailable(str(e)) from e
+
+
+class GatewayClient:
+    """Worker-side RPC client keeping one persistent connection per thread"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Unix socket path the gateway listens on
+        """
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            _check_socket(self.path)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.path)
+            except OSError as e:
+                sock.close()
+                raise GatewayUnavailable(str(e)) from e
+            self._local.sock = sock
+        return sock
+
+    def _drop_connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _send(self, header, timeout):
+        sock = self._connection()
+        sock.settimeout(timeout)
+        send_frame(sock, header)
+        return sock
+
+    def request(self, session_key, session, method, url, data=None, headers=None,
+                timeout=30, verify=True):
+        """
+        Perform an upstream request through the gateway
+
+        Same arguments as upstream.send(). The caller's cookies replace the
+        gateway's jar for this session; the jar the gateway ends up with is
+        copied back into `session` so it can be persisted as usual.
+
+        Raises:
+            GatewayUnavailable: The request never reached the gateway, so
+                the caller may send it directly
+            requests.exceptions.RequestException: The request failed after
+                it was handed to the gateway
+
+        Returns:
+            requests.Response: Rebuilt from the gateway's reply
+        """
+        header = {
+            'session': session_key,
+            'method': method,
+            'url': url,
+            'data': data,
+            'headers': dict(headers or {}),
+            'timeout': timeout,
+            'verify': verify,
+            'cookies': dump_jar(session.cookies),
+        }
+        # The gateway fits its rate limit wait and the upstream request
+        # into `timeout`
+        wait = min(timeout + REPLY_MARGIN, MAX_REPLY_WAIT)
+        try:
+            sock = self._send(header, wait)
+        except OSError as e:
+            # Nothing was written, so the gateway never saw the request: a
+            # stale connection (gateway restarted) is retried once, for
+            # methods that are safe to repeat
+            self._drop_connection()
+            if method.upper() not in IDEMPOTENT_METHODS:
+                raise GatewayUnavailable(str(e)) from e
+            try:
+                sock = self._send(header, wait)
+            except OSError as e:
+                self._drop_connection()
+                raise GatewayUnavailable(str(e)) from e
+
+        # From here on the request may have reached teveclub.hu: never repeat
+        # it, and fail like an upstream error instead of going direct
+        try:
+            reply, body = recv_frame(sock)
+        except socket.timeout as e:
+            self._drop_connection()
+            raise requests.exceptions.Timeout(f'Gateway reply timed out: {e}') from e
+        except (OSError, struct.error) as e:
+            self._drop_connection()
+            raise requests.exceptions.ConnectionError(f'Gateway connection lost: {e}') from e
+
+        if 'error' in reply:
+            error = getattr(requests.exceptions, reply['error'], requests.exceptions.RequestException)
+            raise error(reply['message'])
+
+        session.cookies.clear()
+        load_jar(session.cookies, reply['cookies'])
+
+        response = requests.Response()
+        response.status_code = reply['status']
+        response.headers = CaseInsensitiveDict(reply['headers'])
+        response.encoding = reply['encoding']
+        response.url = reply['url']
+        response._content = body
+        return response
+
+
+class TokenBucket:
+    """Global request rate limit towards teveclub.hu"""
+
+    def __init__(self, rate, burst):
+        """
+        Args:
+            rate (float): Requests per second allowed on average
+            burst (int): Requests allowed back to back
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout):
+        """
+        Wait for a token
+
+        Args:
+            timeout (float): Longest acceptable wait in seconds
+
+        Returns:
+            bool: True once a token was taken, False if it would take too long
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class Gateway:
+    """Owns upstream sessions, the page cache and the rate limit"""
+
+    def __init__(self, rate=10.0, burst=20, cache_ttl=2.0, max_sessions=5000):
+        """
+        Args:
+            rate (float): Upstream requests per second
+            burst (int): Upstream requests allowed back to back
+            cache_ttl (float): Seconds a GET response is reused for its session
+            max_sessions (int): Cookie jars kept before evicting the oldest
+        """
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=64)
+        self.bucket = TokenBucket(rate, burst)
+        self.cache_ttl = cache_ttl
+        self.max_sessions = max_sessions
+        self.inflight = SingleFlight()
+        self._sessions = OrderedDict()
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def _session(self, key, cookies):
+        """
+        Get the cookie jar for a Django session
+
+        The worker's copy of the cookies is authoritative: it changes when the
+        user logs in, out or as someone else, so a jar that differs from it
+        gets a new session, together with dropping the pages cached under the
+        old cookies. Requests still running keep the old session untouched.
+        """
+        with self._lock:
+            session = self._sessions.get(key) if key else None
+            if session is not None:
+                self._sessions.move_to_end(key)
+                jar = RequestsCookieJar()
+                load_jar(jar, cookies)
+                if dump_jar(session.cookies) == dump_jar(jar):
+                    return session
+                self._drop_pages(key)
+
+            session = requests.Session()
+            session.mount('https://', self.adapter)
+            session.mount('http://', self.adapter)
+            load_jar(session.cookies, cookies)
+            if key:
+                self._sessions[key] = session
+                while len(self._sessions) > self.max_sessions:
+                    evicted, _ = self._sessions.popitem(last=False)
+                    self._drop_pages(evicted)
+            return session
+
+    def _drop_pages(self, key):
+        for page_key in [k for k in self._pages if k[0] == key]:
+            del self._pages[page_key]
+
+    def handle(self, header):
+        """
+        Serve one RPC request
+
+        Args:
+            header (dict): Request header sent by GatewayClient
+
+        Returns:
+            tuple: (reply header, body bytes)
+        """
+        key = header['session']
+        session = self._session(key, header['cookies'])
+        try:
+            if header['method'] == 'POST':
+                with self._lock:
+                    self._drop_pages(key)
+                if key:
+                    self.inflight.forget(key)
+                page = self._fetch(session, header)
+            elif key:
+                page = self._cached_get(key, session, header)
+            else:
+                page = self._fetch(session, header)
+        except requests.exceptions.RequestException as e:
+            return {'error': type(e).__name__, 'message': str(e)}, b''
+        except Exception as e:
+            # Always answer, or the client blocks until its timeout
+            return {'error': 'RequestException', 'message': f'{type(e).__name__}: {e}'}, b''
+
+        reply, body = page
+        return dict(reply, cookies=dump_jar(session.cookies)), body
+
+    def _cached_get(self, key, session, header):
+        page_key = (key, header['url'])
+        with self._lock:
+            cached = self._pages.get(page_key)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+
+        page, _ = self.inflight.do(page_key, lambda: self._fetch(session, header))
+        if page[0]['status'] == 200 and self.cache_ttl > 0:
+            now = time.monotonic()
+            with self._lock:
+                if len(self._pages) >= self.max_sessions:
+                    for stale in [k for k, v in self._pages.items() if v[0] <= now]:
+                        del self._pages[stale]
+                self._pages[page_key] = (now + self.cache_ttl, page)
+        return page
+
+    def _fetch(self, session, header):
+        # The rate limit wait and the request share one timeout
+        deadline = time.monotonic() + header['timeout']
+        if not self.bucket.acquire(header['timeout']):
+            raise requests.exceptions.Timeout('Upstream rate limit wait exceeded timeout')
+        response = session.request(
+            header['method'],
+            header['url'],
+            data=header['data'],
+            headers=header['headers'],
+            timeout=max(deadline - time.monotonic(), 1),
+            allow_redirects=True,
+            verify=header['verify']
+        )
+        reply = {
+            'status': response.status_code,
+            'headers': dict(response.headers),
+            'encoding': response.encoding,
+            'url': response.url,
+        }
+        return reply, response.content
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                header, _ = recv_frame(self.request)
+            except (ConnectionError, OSError, struct.error):
+                return
+            reply, body = self.server.gateway.handle(header)
+            send_frame(self.request, reply, body)
+
+
+class GatewayServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded Unix socket server in front of a Gateway"""
+
+    daemon_threads = True
+
+    def __init__(self, path, gateway):
+        """
+        Args:
+            path (str): Unix socket path to listen on (replaced if stale)
+            gateway (Gateway): Serves the requests
+
+        Raises:
+            RuntimeError: The socket's directory is not private to this user
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        try:
+            _check_directory(directory)
+        except PermissionError as e:
+            # Workers refuse such a socket, so do not listen on it either
+            raise RuntimeError(f'Unsafe gateway socket directory: {e}') from e
+        if os.path.exists(path):
+            os.unlink(path)
+        self.gateway = gateway
+        # Created owner-only: no window in which another user can connect
+        umask = os.umask(0o177)
+        try:
+            super().__init__(path, _Handler)
+        finally:
+            os.umask(umask)
@@ -0,0 +1,167 @@
+"""
+Idempotency keys for state-changing proxy POSTs
+The browser sends an Idempotency-Key header with each POST. The first
+request with a (session, key) pair goes upstream; duplicates arriving while
+it runs wait for it, and later duplicates within the TTL are answered from
+its stored result, so double clicks and retries never repeat an action.
+
+Keys live in the 'idempotency' cache, a file cache shared by every gunicorn
+worker: a duplicate is caught whichever worker it lands on. The first
+request claims its key with cache.add(), which only one caller can win.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+import zlib
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+# Longer keys are ignored rather than stored
+MAX_KEY_LENGTH = 128
+
+# Stored under a key while its first request runs
+PENDING = 'pending'
+
+# Seconds a claim outlives its request at most: longer than gunicorn lets a
+# request run (--timeout 60), so a killed worker's claim still expires
+CLAIM_TTL = 90
+
+# Seconds between checks of a claim held by another request
+POLL_INTERVAL = 0.1
+
+
+# Seconds a client told "still running" should wait before retrying
+RETRY_AFTER = 2
+
+
+class OriginalFailed(requests.exceptions.RequestException):
+    """The request a duplicate waited for failed; the duplicate is not sent"""
+
+
+class StillRunning(Exception):
+    """The first request with the key outlasted the duplicate's wait"""
+
+
+class IdempotencyFileCache(FileBasedCache):
+    """
+    File cache with an atomic add() whose culling never drops a running claim
+    FileBasedCache.add() checks for the file and then writes it, so two
+    workers could both win; here the entry is created with os.link(), which
+    fails if it already exists. When MAX_ENTRIES is reached, expired entries
+    go first, then the oldest finished results; PENDING entries are kept.
+    """
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        self._cull()
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            for _ in range(2):
+                try:
+                    os.link(tmp_path, fname)
+                    return True
+                except FileExistsError:
+                    # has_key() deletes an expired entry, so one retry can win
+                    if self.has_key(key, version):
+                        return False
+            return False
+        finally:
+            os.remove(tmp_path)
+
+    def _cull(self):
+        filelist = self._list_cache_files()
+        if len(filelist) < self._max_entries:
+            return
+        finished = []
+        for fname in filelist:
+            try:
+                with open(fname, 'rb') as f:
+                    if self._is_expired(f):  # Deletes the file
+                        continue
+                    value = pickle.loads(zlib.decompress(f.read()))
+                    mtime = os.fstat(f.fileno()).st_mtime
+            except (OSError, EOFError, zlib.error, pickle.UnpicklingError):
+                continue  # Removed or being rewritten meanwhile
+            if value != PENDING:
+                finished.append((mtime, fname))
+        if self._cull_frequency == 0:
+            excess = len(finished)
+        else:
+            excess = len(finished) // self._cull_frequency
+        for _, fname in sorted(finished)[:excess]:
+            self._delete(fname)
+
+
+class IdempotencyCache:
+    """Keyed calls and their results, shared by every worker process"""
+
+    def __init__(self, alias, ttl):
+        """
+        Args:
+            alias (str): CACHES entry shared by the workers
+            ttl (float): Seconds a finished result is replayed
+        """
+        self.alias = alias
+        self.ttl = ttl
+
+    def do(self, key, fn, wait):
+        """
+        Run fn() once per key within the TTL
+
+        Args:
+            key (tuple): (session key, idempotency key, URL)
+            fn (callable): Performs the upstream request; its result must
+                be picklable
+            wait (float): Longest a duplicate waits for the first request,
+                e.g. the upstream timeout; it holds a worker thread meanwhile
+
+        Returns:
+            tuple: (result, replayed) where replayed is True for duplicates
+
+        Raises:
+            OriginalFailed: A duplicate's first request failed or never finished
+            StillRunning: A duplicate's first request did not finish within `wait`
+        """
+        cache = caches[self.alias]  # Cache objects are per thread
+        name = 'idem:' + hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+        deadline = time.monotonic() + wait
+        waited = False
+        while True:
+            if not waited and cache.add(name, PENDING, CLAIM_TTL):
+                break
+            stored = cache.get(name)
+            if stored is None:
+                if waited:
+                    # The claim was dropped: its request failed (or its
+                    # worker died), so it may or may not have reached
+                    # teveclub.hu. Never send it a second time.
+                    raise OriginalFailed('The first request with this Idempotency-Key failed')
+                continue  # Expired between add() and get(): claim again
+            if stored != PENDING:
+                return stored, True
+            if time.monotonic() >= deadline:
+                raise StillRunning()
+            waited = True
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            result = fn()
+        except BaseException:
+            # Failures are not remembered: a retry should really try again
+            cache.delete(name)
+            raise
+        cache.set(name, result, self.ttl)
+        return result, False
+
+
+# Shared by all request threads and worker processes
+recent_posts = IdempotencyCache('idempotency', settings.IDEMPOTENCY_TTL)
@@ -0,0 +1,112 @@
+"""
+Background jobs for the web Auto Mode
+Runs TeveClub.run_bot on an in-process thread pool so a run no longer ties
+up a request thread (or dies with the browser tab). Job state lives in the
+shared cache, so any gunicorn worker can answer progress polls.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from src.bot_core import TeveClub
+from . import upstream
+
+
+JOB_CACHE_KEY = 'auto-job:{}'
+
+_executor = ThreadPoolExecutor(max_workers=settings.JOB_WORKERS,
+                               thread_name_prefix='auto-job')
+_pending_lock = threading.Lock()
+_pending = 0
+
+
+def get_job(job_id):
+    """
+    Look up a job record
+
+    Args:
+        job_id (str): Job identifier
+
+    Returns:
+        dict or None: The job record, or None if unknown or expired
+    """
+    return cache.get(JOB_CACHE_KEY.format(job_id))
+
+
+def _save_job(job):
+    cache.set(JOB_CACHE_KEY.format(job['id']), job, settings.JOB_RESULT_TTL)
+
+
+def public_job(job):
+    """Job record without server-side fields, for JSON responses"""
+    return {key: value for key, value in job.items() if key != 'owner'}
+
+
+def submit_auto_job(owner, username, password):
+    """
+    Queue an Auto Mode run (login, feed, learn, guess)
+
+    Args:
+        owner (str): Django session key allowed to read the job
+        username (str): Teveclub username
+        password (str): Teveclub password, kept in memory only
+
+    Returns:
+        dict or None: The new job record, or None if this worker is full
+    """
+    global _pending
+    with _pending_lock:
+        if _pending >= settings.JOB_MAX_PENDING:
+            return None
+        _pending += 1
+
+    job = {
+        'id': uuid.uuid4().hex,
+        'owner': owner,
+        'username': username,
+        'status': 'queued',
+        'step': None,
+        'message': None,
+        'created': time.time(),
+        'finished': None,
+    }
+    try:
+        _save_job(job)
+        snapshot = dict(job)  # The pool thread mutates `job` from here on
+        _executor.submit(_run_auto_job, job, password)
+    except BaseException:
+        # The job never reached the pool, so _run_auto_job will not free its slot
+        with _pending_lock:
+            _pending -= 1
+        raise
+    return snapshot
+
+
+def _run_auto_job(job, password):
+    """Execute one Auto Mode job on a pool thread"""
+    global _pending
+
+    def progress(step):
+        job['status'] = 'running'
+        job['step'] = step
+        _save_job(job)
+
+    try:
+        # Background lane: runs only use slots interactive requests leave free
+        teve = TeveClub(job['username'], password, scheduler=upstream.scheduler)
+        if teve.run_bot(progress=progress):
+            job['status'] = 'done'
+            job['message'] = 'All tasks done'
+        else:
+            job['status'] = 'failed'
+            job['message'] = 'Login failed'
+    except Exception as e:
+        job['status'] = 'failed'
+        job['message'] = f'Error: {str(e)}'
+    finally:
+        job['finished'] = time.time()
+        _save_job(job)
+        with _pending_lock:
+            _pending -= 1
@@ -0,0 +1,140 @@
+"""
+Structured logging for the proxy hot path
+Request threads only check the level, apply sampling and drop a record on a
+bounded queue; a background thread formats it as a JSON line and writes it.
+Credentials and cookies are redacted before a record is created.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import threading
+import time
+from django.conf import settings
+
+
+# Field names containing any of these are never logged in clear
+SENSITIVE_KEYS = ('pass', 'cookie', 'token', 'secret', 'csrf')
+
+
+def redact(fields):
+    """
+    Mask sensitive values, recursing into nested dicts
+
+    Args:
+        fields (dict): Event fields
+
+    Returns:
+        dict: Copy safe to log
+    """
+    clean = {}
+    for key, value in fields.items():
+        if any(word in key.lower() for word in SENSITIVE_KEYS):
+            clean[key] = '***'
+        elif isinstance(value, dict):
+            clean[key] = redact(value)
+        else:
+            clean[key] = value
+    return clean
+
+
+class _Sampler:
+    """Per-event sampling rate plus a per-second cap, so volume stays flat"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._windows = {}
+
+    def allow(self, event):
+        rate = settings.LOG_SAMPLE_RATES.get(event, 1.0)
+        if rate < 1.0 and random.random() >= rate:
+            return False
+        second = int(time.monotonic())
+        with self._lock:
+            window = self._windows.get(event)
+            if window is None or window[0] != second:
+                window = self._windows[event] = [second, 0]
+            window[1] += 1
+            return window[1] <= settings.LOG_MAX_EVENTS_PER_SECOND
+
+
+_sampler = _Sampler()
+
+
+def log_event(logger, level, event, exc_info=False, **fields):
+    """
+    Log a structured event if its level is enabled and it survives sampling
+    Warnings and errors are never sampled away
+
+    Args:
+        logger (logging.Logger): Logger to emit on
+        level (int): logging level
+        event (str): Dotted event name, e.g. 'proxy.response'
+        exc_info (bool): Attach the current exception's traceback
+        **fields: Event fields; sensitive ones are redacted
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if level < logging.WARNING and not _sampler.allow(event):
+        return
+    logger.log(level, event, exc_info=exc_info,
+               extra={'event': event, 'fields': redact(fields)})
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, event and its fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': getattr(record, 'event', record.getMessage()),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+    def prepare(self, record):
+        # Only the traceback is rendered on the calling thread (it cannot
+        # cross threads); the JSON formatting happens on the listener thread
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def queue_handler(maxsize=10000):
+    """
+    Handler factory for settings.LOGGING
+    Starts a listener thread that writes JSON lines to stderr
+
+    Returns:
+        DroppingQueueHandler: Handler to attach to loggers
+    """
+    records = queue.Queue(maxsize)
+    output = logging.StreamHandler()
+    output.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(records, output, respect_handler_level=False)
+    listener.start()
+    atexit.register(listener.stop)
+    return DroppingQueueHandler(records)
@@ -0,0 +1,26 @@
+"""
+Pack the food and drink icons into sprite sheets
+Usage: python manage.py build_sprites [--columns N]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from bot_api.sprites import COLUMNS, build_sprites
+
+
+class Command(BaseCommand):
+    help = 'Build static/images/sprites/ (sheets and manifest) from the food and drink icons'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--columns',
+            type=int,
+            default=COLUMNS,
+            help=f'Icons per sheet row (default: {COLUMNS})'
+        )
+
+    def handle(self, *args, **options):
+        images_dir = settings.BASE_DIR / 'static' / 'images'
+        manifest = build_sprites(images_dir, columns=options['columns'])
+        for kind, sheet in manifest.items():
+            self.stdout.write(f"{sheet['sheet']}: {len(sheet['icons'])} icons, "
+                              f"{sheet['width']}x{sheet['height']}")
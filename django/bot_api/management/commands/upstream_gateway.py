@@ -0,0 +1,34 @@
+"""
+Run the upstream gateway shared by all gunicorn workers
+Usage: python manage.py upstream_gateway [--socket PATH]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from bot_api.gateway import Gateway, GatewayServer, default_socket_path
+
+
+class Command(BaseCommand):
+    help = 'Serve teveclub.hu connections, cookie jars, rate limiting and page cache over a Unix socket'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket',
+            default=settings.UPSTREAM_GATEWAY_SOCKET or default_socket_path(),
+            help='Unix socket path (default: UPSTREAM_GATEWAY_SOCKET, else a private per-user directory)'
+        )
+
+    def handle(self, *args, **options):
+        gateway = Gateway(
+            rate=settings.GATEWAY_RATE_LIMIT,
+            burst=settings.GATEWAY_RATE_BURST,
+            cache_ttl=settings.GATEWAY_PAGE_CACHE_TTL,
+            max_sessions=settings.GATEWAY_MAX_SESSIONS,
+        )
+        server = GatewayServer(options['socket'], gateway)
+        self.stdout.write(f"Upstream gateway listening on {options['socket']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
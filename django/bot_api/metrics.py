@@ -0,0 +1,224 @@
+"""
+In-process metrics with a file-backed multiprocess mode
+Each worker keeps counters, gauges and histograms in memory (one lock, no
+I/O on the request path); a background thread writes a snapshot to
+METRICS_DIR/<pid>-<start>.json once per second. /api/metrics/ merges every
+worker's snapshot into a single Prometheus text exposition. Snapshots of
+exited workers are kept, and a reused pid gets a new file, so merged
+counters never go backwards.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from django.conf import settings
+
+
+# Histogram upper bounds in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# name -> (type, help)
+METRICS = {
+    'teveclub_http_requests_total': ('counter', 'Django requests by view and status'),
+    'teveclub_http_request_duration_seconds': ('histogram', 'Django request latency by view'),
+    'teveclub_http_requests_in_flight': ('gauge', 'Django requests being served'),
+    'teveclub_upstream_responses_total': ('counter', 'teveclub.hu responses by path and status'),
+    'teveclub_upstream_request_duration_seconds': ('histogram', 'teveclub.hu request latency by path'),
+    'teveclub_upstream_errors_total': ('counter', 'teveclub.hu requests that raised, by path and error'),
+    'teveclub_upstream_in_flight': ('gauge', 'teveclub.hu requests in progress'),
+    'teveclub_upstream_queue_seconds': ('histogram', 'Wait for an upstream scheduler slot by lane'),
+    'teveclub_upstream_tls_fallback_total': ('counter', 'Failed TLS verifications that switched a host to unverified'),
+    'teveclub_upstream_unverified_total': ('counter', 'teveclub.hu responses received without TLS verification'),
+    'teveclub_upstream_coalesced_total': ('counter', 'GETs answered from another in-flight request'),
+    'teveclub_idempotent_replays_total': ('counter', 'Duplicate POSTs answered from the first request'),
+    'teveclub_push_subscribers': ('gauge', 'Open live-state streams'),
+    'teveclub_push_pollers': ('gauge', 'Accounts being polled for live state'),
+    'teveclub_push_polls_total': ('counter', 'myteve.pet fetches made by live-state pollers'),
+    'teveclub_fleet_runs_total': ('counter', 'Operator account runs by result'),
+    'teveclub_admission_rejected_total': ('counter', 'Requests rejected with 429 by admission control'),
+    'teveclub_session_writes_total': ('counter', 'Session store writes caused by upstream cookie changes'),
+}
+
+# Seconds between snapshot writes of a worker
+FLUSH_INTERVAL = 1.0
+
+# A snapshot not rewritten for this long belongs to an exited worker, whose
+# gauges no longer count
+STALE_AFTER = 5 * FLUSH_INTERVAL
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class Registry:
+    """Metrics of one process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        # Tells this process apart from an earlier one with the same pid
+        self._started = time.time_ns()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._flusher = None
+
+    def inc(self, name, value=1, **labels):
+        """Add to a counter"""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add(self, name, value, **labels):
+        """Move a gauge up or down"""
+        key = _key(name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """Record one histogram sample"""
+        key = _key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                # One slot per bucket, +Inf, then sum
+                hist = self._histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+            hist[bisect_left(BUCKETS, seconds)] += 1
+            hist[-1] += seconds
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: JSON-serializable copy of every series
+        """
+        with self._lock:
+            return {
+                'pid': self._pid,
+                'counters': [[n, dict(l), v] for (n, l), v in self._counters.items()],
+                'gauges': [[n, dict(l), v] for (n, l), v in self._gauges.items()],
+                'histograms': [[n, dict(l), list(h)] for (n, l), h in self._histograms.items()],
+            }
+
+    def start(self):
+        """Start this process's snapshot writer thread, if not yet running"""
+        if not settings.METRICS_DIR:
+            return
+        if os.getpid() != self._pid:
+            # Forked after import (gunicorn --preload): the parent's numbers
+            # and writer thread are not ours
+            with self._lock:
+                self._reset()
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop,
+                                                 name='metrics-flush', daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        pid = self._pid
+        while os.getpid() == pid:
+            time.sleep(FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except OSError:
+                pass  # Next interval tries again
+
+    def flush(self):
+        """Write this worker's snapshot to METRICS_DIR"""
+        if not settings.METRICS_DIR:
+            return
+        directory = Path(settings.METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'{self._pid}-{self._started}.json'
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp, path)
+
+
+registry = Registry()
+
+
+def collect():
+    """
+    Merge the snapshots of all workers (or just this process without METRICS_DIR)
+    Counters and histograms of exited workers still count; their gauges do not.
+
+    Returns:
+        tuple: (counters, gauges, histograms) dicts keyed by (name, labels)
+    """
+    if settings.METRICS_DIR:
+        registry.flush()
+        snapshots = []
+        now = time.time()
+        for path in Path(settings.METRICS_DIR).glob('*.json'):
+            try:
+                live = now - path.stat().st_mtime < STALE_AFTER
+                snapshots.append((json.loads(path.read_text()), live))
+            except (OSError, ValueError):
+                continue  # Being replaced right now; next scrape gets it
+    else:
+        snapshots = [(registry.snapshot(), True)]
+
+    counters, gauges, histograms = {}, {}, {}
+    for snap, live in snapshots:
+        for name, labels, value in snap['counters']:
+            key = _key(name, labels)
+            counters[key] = counters.get(key, 0) + value
+        if live:
+            for name, labels, value in snap['gauges']:
+                key = _key(name, labels)
+                gauges[key] = gauges.get(key, 0) + value
+        for name, labels, hist in snap['histograms']:
+            key = _key(name, labels)
+            merged = histograms.setdefault(key, [0] * len(hist))
+            for i, value in enumerate(hist):
+                merged[i] += value
+    return counters, gauges, histograms
+
+
+def _escape(value):
+    """Escape a label value for the text exposition format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def render():
+    """
+    Returns:
+        str: Prometheus text exposition of the merged metrics
+    """
+    counters, gauges, histograms = collect()
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'histogram':
+            for (series, labels), hist in sorted(histograms.items()):
+                if series != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), hist[:-1]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+                lines.append(f'{name}_sum{_labels(labels)} {hist[-1]}')
+                lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+        else:
+            values = counters if kind == 'counter' else gauges
+            for (series, labels), value in sorted(values.items()):
+                if series == name:
+                    lines.append(f'{name}{_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
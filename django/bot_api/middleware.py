@@ -0,0 +1,96 @@
+"""
+Middleware for the bot_api app
+"""
+import gzip
+import re
+import time
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from .metrics import registry
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+_accepts_br = re.compile(r'\bbr\b')
+_accepts_gzip = re.compile(r'\bgzip\b')
+
+
+def negotiate_encoding(request):
+    """
+    Returns:
+        str or None: 'br' or 'gzip' if the client accepts it, else None
+    """
+    accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if brotli is not None and _accepts_br.search(accepted):
+        return 'br'
+    if _accepts_gzip.search(accepted):
+        return 'gzip'
+    return None
+
+
+def compress(content, encoding):
+    """Compress a body for the encoding chosen by negotiate_encoding()"""
+    if encoding == 'br':
+        return brotli.compress(content, quality=5)
+    return gzip.compress(content, compresslevel=6)
+
+
+class MetricsMiddleware:
+    """
+    Record request count, latency and in-flight requests per view
+    Snapshots are written by the registry's own thread, never here.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        registry.start()  # Once per process; a no-op afterwards
+        registry.add('teveclub_http_requests_in_flight', 1)
+        start = time.monotonic()
+        status = '500'
+        try:
+            response = self.get_response(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            match = request.resolver_match
+            view = match.url_name if match and match.url_name else 'unmatched'
+            registry.observe('teveclub_http_request_duration_seconds',
+                             time.monotonic() - start, view=view)
+            registry.inc('teveclub_http_requests_total', view=view, status=status)
+            registry.add('teveclub_http_requests_in_flight', -1)
+
+
+class JsonCompressionMiddleware:
+    """
+    Compress JSON API responses toward the browser
+    Prefers brotli when the optional `brotli` package is installed and the
+    client accepts it, otherwise gzip. Static files are left to WhiteNoise.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if (response.streaming
+                or response.has_header('Content-Encoding')
+                or not response.get('Content-Type', '').startswith('application/json')
+                or len(response.content) < settings.JSON_COMPRESS_MIN_SIZE):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request)
+        if encoding is None:
+            return response
+
+        content = compress(response.content, encoding)
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:34
+
+from django.conf import settings
+from django.db import migrations, models
+import bot_api.models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Account',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=64)),
+                ('password', bot_api.models.EncryptedCharField(max_length=512)),
+                ('status', models.CharField(choices=[('idle', 'Idle'), ('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='idle', max_length=16)),
+                ('step', models.CharField(blank=True, default='', max_length=16)),
+                ('message', models.CharField(blank=True, default='', max_length=255)),
+                ('last_run', models.DateTimeField(blank=True, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='teveclub_accounts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['owner', 'id'], name='account_owner_page'), models.Index(fields=['owner', 'status', 'id'], name='account_owner_status_page')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='account',
+            constraint=models.UniqueConstraint(fields=('owner', 'username'), name='unique_account_per_owner'),
+        ),
+    ]
@@ -0,0 +1,98 @@
+"""
+Models for the bot_api app
+Teveclub accounts managed by operators through the multi-account API
+"""
+import base64
+import hashlib
+from functools import lru_cache
+from cryptography.fernet import Fernet, MultiFernet
+from django.conf import settings
+from django.db import models
+
+
+@lru_cache(maxsize=None)
+def _cipher(keys):
+    return MultiFernet([Fernet(key) for key in keys])
+
+
+def password_cipher():
+    """
+    Returns:
+        MultiFernet: Encrypts with the first ACCOUNT_PASSWORD_KEYS entry and
+            decrypts with any of them; derived from SECRET_KEY when unset
+    """
+    keys = settings.ACCOUNT_PASSWORD_KEYS
+    if not keys:
+        keys = [base64.urlsafe_b64encode(hashlib.sha256(settings.SECRET_KEY.encode()).digest())]
+    return _cipher(tuple(keys))
+
+
+class EncryptedCharField(models.CharField):
+    """CharField stored as a Fernet token, so the database never holds the plain value"""
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return password_cipher().decrypt(value.encode()).decode()
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None:
+            return value
+        return password_cipher().encrypt(value.encode()).decode()
+
+
+class Account(models.Model):
+    """A teveclub.hu account and the outcome of its latest run"""
+
+    IDLE = 'idle'
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (IDLE, 'Idle'),
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    ACTIVE = (QUEUED, RUNNING)
+
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                              related_name='teveclub_accounts')
+    username = models.CharField(max_length=64)
+    # Needed to log in upstream; never returned by the API. Encrypted at
+    # rest: a 128-character password makes a 268-character token
+    password = EncryptedCharField(max_length=512)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=IDLE)
+    step = models.CharField(max_length=16, blank=True, default='')
+    message = models.CharField(max_length=255, blank=True, default='')
+    last_run = models.DateTimeField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'username'], name='unique_account_per_owner'),
+        ]
+        indexes = [
+            # Keyset pagination, optionally filtered by status
+            models.Index(fields=['owner', 'id'], name='account_owner_page'),
+            models.Index(fields=['owner', 'status', 'id'], name='account_owner_status_page'),
+        ]
+
+    def __str__(self):
+        return self.username
+
+    def as_dict(self):
+        """Public fields for JSON responses"""
+        return {
+            'id': self.id,
+            'username': self.username,
+            'status': self.status,
+            'step': self.step or None,
+            'message': self.message or None,
+            'lastRun': self.last_run.isoformat() if self.last_run else None,
+        }
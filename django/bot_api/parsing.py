@@ -0,0 +1,116 @@
+"""
+Parsers for the myteve.pet page
+Shared by the state views and the push pollers
+"""
+import logging
+import re
+from lxml import html as lxml_html
+from .log import log_event
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_trick(content):
+    """
+    Extract the currently learned trick
+
+    Args:
+        content (bytes): myteve.pet page body
+
+    Returns:
+        str or None: Trick text, None if it could not be found
+    """
+    tree = lxml_html.fromstring(content)
+
+    # Get trick text using xpath - try multiple possible paths
+    trick_elements = tree.xpath('/html/body/center/table/tbody/tr[1]/td[2]/center/table[3]/tbody/tr/td/table/tbody/tr[3]/td[2]/div[1]')
+
+    if not trick_elements:
+        # Try without tbody (browsers auto-insert tbody but HTML might not have it)
+        trick_elements = tree.xpath('/html/body/center/table/tr[1]/td[2]/center/table[3]/tr/td/table/tr[3]/td[2]/div[1]')
+
+    if not trick_elements:
+        # Try more flexible pattern looking for specific text
+        trick_elements = tree.xpath('//div[contains(text(), "Tanult trükk") or contains(text(), "trükk")]')
+
+    trick_text = None
+    if trick_elements:
+        # Get all text nodes before <br> tag
+        div_element = trick_elements[0]
+        text_parts = []
+
+        # Iterate through text content and child elements
+        if div_element.text:
+            text_parts.append(div_element.text)
+
+        for child in div_element:
+            if child.tag == 'br':
+                break  # Stop at first <br>
+            if child.text:
+                text_parts.append(child.text)
+            if child.tail:
+                text_parts.append(child.tail)
+
+        trick_text = ''.join(text_parts).strip()
+        log_event(logger, logging.DEBUG, 'state.trick_found', trick=trick_text)
+    elif logger.isEnabledFor(logging.DEBUG):
+        # Only walk the tree for diagnostics when someone will see them
+        log_event(logger, logging.DEBUG, 'state.trick_missing',
+                  tables=len(tree.xpath('//table')))
+
+    return trick_text
+
+
+def parse_food_drink(html):
+    """
+    Extract the food and drink currently set
+
+    Args:
+        html (str): myteve.pet page text
+
+    Returns:
+        dict: {foodId, foodIcon, drinkId, drinkIcon}, None where not found
+    """
+    result = {
+        'foodId': None,
+        'foodIcon': None,
+        'drinkId': None,
+        'drinkIcon': None
+    }
+
+    # Look for food: "Etet\u0151" or "Eteto" followed by image
+    # Try multiple patterns
+    food_match = re.search(r'Etet[\u0151o][^<]*<[^>]*<a[^>]*>.*?files/(\d+)\.gif', html, re.IGNORECASE | re.DOTALL)
+    if not food_match:
+        food_match = re.search(r'Etet[\u0151o].*?(\d+)\.gif', html, re.IGNORECASE | re.DOTALL)
+    if not food_match:
+        # Try simpler pattern matching any path before number.gif
+        food_match = re.search(r'Etet[\u0151o].*?/(\d+)\.gif', html, re.IGNORECASE | re.DOTALL)
+
+    if food_match:
+        result['foodId'] = int(food_match.group(1))
+        result['foodIcon'] = f"{food_match.group(1)}.gif"
+    elif logger.isEnabledFor(logging.DEBUG):
+        # Debug: show what we're searching in
+        food_section = re.search(r'Etet[\u0151o].{0,200}', html, re.IGNORECASE | re.DOTALL)
+        log_event(logger, logging.DEBUG, 'state.food_missing',
+                  sample=food_section.group(0) if food_section else None)
+
+    # Look for drink: "Itat\u00f3" or "Itato" followed by image
+    drink_match = re.search(r'Itat[\u00f3o][^<]*<[^>]*<a[^>]*>.*?files/(\d+)\.gif', html, re.IGNORECASE | re.DOTALL)
+    if not drink_match:
+        drink_match = re.search(r'Itat[\u00f3o].*?(\d+)\.gif', html, re.IGNORECASE | re.DOTALL)
+    if not drink_match:
+        drink_match = re.search(r'Itat[\u00f3o].*?/(\d+)\.gif', html, re.IGNORECASE | re.DOTALL)
+
+    if drink_match:
+        result['drinkId'] = int(drink_match.group(1))
+        result['drinkIcon'] = f"{drink_match.group(1)}.gif"
+    elif logger.isEnabledFor(logging.DEBUG):
+        # Debug: show what we're searching in
+        drink_section = re.search(r'Itat[\u00f3o].{0,200}', html, re.IGNORECASE | re.DOTALL)
+        log_event(logger, logging.DEBUG, 'state.drink_missing',
+                  sample=drink_section.group(0) if drink_section else None)
+
+    return result
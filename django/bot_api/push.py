@@ -0,0 +1,280 @@
+"""
+Live pet-state push
+One poller thread per logged-in browser session (per gunicorn worker)
+refreshes myteve.pet with that session's own cookies and fans changes out
+to every open tab of it. Sessions never share a poller, so nobody receives
+state fetched with someone else's login. The interval doubles while
+nothing changes and resets after a change or a POST through the proxy; a
+poller stops when its last subscriber goes away, on logout, or once
+teveclub.hu no longer shows the session as logged in. Cookies teveclub.hu
+refreshes while polling are written back to the browser session.
+"""
+import asyncio
+import json
+import logging
+import queue
+import threading
+from importlib import import_module
+from django.conf import settings
+from django.db import connection
+from src.bot_core import LOGGED_IN_MARKER
+from src.scheduler import BACKGROUND
+from . import upstream
+from .cookies import SESSION_ACCOUNT_KEY, SESSION_COOKIES_KEY, dump_jar, load_jar
+from .log import log_event
+from .metrics import registry
+from .parsing import parse_food_drink, parse_trick
+
+
+logger = logging.getLogger(__name__)
+
+MYTEVE_URL = 'https://teveclub.hu/myteve.pet'
+
+STATE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+}
+
+# Events a slow subscriber may fall behind by before the oldest are dropped
+SUBSCRIBER_BACKLOG = 16
+
+# Delivered instead of a state when the stream should end
+END = None
+
+SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+
+
+class LoggedOut(Exception):
+    """myteve.pet no longer shows the session as logged in"""
+
+
+def fetch_state(session_key, cookies):
+    """
+    Fetch and parse the pet state with a stored cookie jar
+
+    Args:
+        session_key (str): Django session the cookies belong to
+        cookies (list): Rows from dump_jar()
+
+    Returns:
+        tuple: (state dict, updated cookie rows)
+
+    Raises:
+        LoggedOut: The cookies no longer hold a teveclub.hu login
+    """
+    session = upstream.new_session()
+    load_jar(session.cookies, cookies)
+    response = upstream.send(session_key, session, 'GET', MYTEVE_URL,
+                             headers=STATE_HEADERS, timeout=30, lane=BACKGROUND)
+    response.raise_for_status()
+    text = response.text
+    if LOGGED_IN_MARKER not in text:
+        raise LoggedOut()
+    state = parse_food_drink(text)
+    state['trick'] = parse_trick(response.content)
+    return state, dump_jar(session.cookies)
+
+
+def store_cookies(account, session_key, cookies):
+    """
+    Write a poller's refreshed cookie rows back to its browser session, so
+    the session's next proxied request sends what teveclub.hu last set
+    Skipped once the session logged out or switched account, and for
+    signed-cookie sessions, which only the browser stores.
+    """
+    store = SessionStore(session_key)
+    if not store.exists(session_key) or store.get(SESSION_ACCOUNT_KEY) != account:
+        return
+    if store.get(SESSION_COOKIES_KEY) != cookies:
+        store[SESSION_COOKIES_KEY] = cookies
+        store.save()
+        registry.inc('teveclub_session_writes_total')
+
+
+def format_event(state):
+    """Encode a state change as one server-sent event"""
+    return f'event: state\ndata: {json.dumps(state)}\n\n'
+
+
+class QueueSubscriber:
+    """Subscriber read by a blocking (WSGI) stream"""
+
+    def __init__(self):
+        self.queue = queue.Queue(SUBSCRIBER_BACKLOG)
+
+    def deliver(self, state):
+        while True:
+            try:
+                self.queue.put_nowait(state)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+class AsyncSubscriber:
+    """Subscriber read by an asyncio (ASGI) stream"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(SUBSCRIBER_BACKLOG)
+
+    def _put(self, state):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(state)
+
+    def deliver(self, state):
+        self.loop.call_soon_threadsafe(self._put, state)
+
+
+class AccountPoller(threading.Thread):
+    """Polls one session's myteve.pet while any of its tabs is subscribed"""
+
+    def __init__(self, hub, account, session_key):
+        super().__init__(name=f'push-{account}', daemon=True)
+        self.hub = hub
+        self.account = account
+        self.session_key = session_key
+        self.key = (account, session_key)
+        self.subscribers = set()
+        self.cookies = []
+        self.state = None
+        self.interval = hub.min_interval
+        self.wake = threading.Event()
+
+    def run(self):
+        registry.add('teveclub_push_pollers', 1)
+        try:
+            while self._has_subscribers():
+                # Cleared before polling, so a poke during the poll still
+                # shortens the next wait
+                self.wake.clear()
+                self._poll()
+                self.wake.wait(self.interval)
+        finally:
+            registry.add('teveclub_push_pollers', -1)
+            connection.close()  # This thread's session store connection
+
+    def _has_subscribers(self):
+        with self.hub.lock:
+            if self.subscribers:
+                return True
+            # Leave under the hub lock so subscribe() never joins a dying poller
+            if self.hub.pollers.get(self.key) is self:
+                del self.hub.pollers[self.key]
+            return False
+
+    def _poll(self):
+        with self.hub.lock:
+            cookies = self.cookies
+        registry.inc('teveclub_push_polls_total')
+        try:
+            state, cookies = fetch_state(self.session_key, cookies)
+        except LoggedOut:
+            log_event(logger, logging.INFO, 'push.logged_out', account=self.account)
+            self.hub.stop(self.account, self.session_key)
+            return
+        except Exception as e:
+            log_event(logger, logging.WARNING, 'push.poll_failed', account=self.account, error=str(e))
+            self.interval = min(self.interval * 2, self.hub.max_interval)
+            return
+
+        with self.hub.lock:
+            refreshed = cookies != self.cookies
+            self.cookies = cookies
+            changed = {key: value for key, value in state.items()
+                       if self.state is None or self.state.get(key) != value}
+            self.state = state
+            subscribers = list(self.subscribers)
+        if refreshed:
+            try:
+                store_cookies(self.account, self.session_key, cookies)
+            except Exception as e:
+                log_event(logger, logging.WARNING, 'push.store_cookies_failed',
+                          account=self.account, error=str(e))
+        if changed:
+            self.interval = self.hub.min_interval
+            for subscriber in subscribers:
+                subscriber.deliver(changed)
+        else:
+            self.interval = min(self.interval * 2, self.hub.max_interval)
+
+
+class PushHub:
+    """Registry of session pollers for this worker"""
+
+    def __init__(self, min_interval, max_interval):
+        """
+        Args:
+            min_interval (float): Seconds between polls right after a change
+            max_interval (float): Upper bound the interval backs off to
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.lock = threading.Lock()
+        self.pollers = {}  # (account, session key) -> AccountPoller
+
+    def subscribe(self, account, session_key, cookies, subscriber):
+        """
+        Start receiving state changes for an account in one browser session
+        The subscriber immediately gets the last known state, if any.
+
+        Args:
+            account (str): teveclub.hu account name
+            session_key (str): Django session of the subscriber
+            cookies (list): The session's upstream cookie rows
+            subscriber: QueueSubscriber or AsyncSubscriber
+        """
+        key = (account, session_key)
+        with self.lock:
+            poller = self.pollers.get(key)
+            start = poller is None
+            if start:
+                poller = self.pollers[key] = AccountPoller(self, account, session_key)
+            poller.subscribers.add(subscriber)
+            # Same session, so the newest copy of its jar is the freshest
+            poller.cookies = cookies
+            state = poller.state
+        registry.add('teveclub_push_subscribers', 1)
+        if start:
+            poller.start()
+        elif state is not None:
+            subscriber.deliver(state)
+
+    def unsubscribe(self, account, session_key, subscriber):
+        """Stop a subscription; the poller exits after its last one"""
+        with self.lock:
+            poller = self.pollers.get((account, session_key))
+            if poller is None or subscriber not in poller.subscribers:
+                return
+            poller.subscribers.discard(subscriber)
+            if not poller.subscribers:
+                poller.wake.set()
+        registry.add('teveclub_push_subscribers', -1)
+
+    def poke(self, account, session_key):
+        """Poll an account soon, e.g. after a POST that may have changed it"""
+        with self.lock:
+            poller = self.pollers.get((account, session_key))
+        if poller is not None:
+            poller.interval = self.min_interval
+            poller.wake.set()
+
+    def stop(self, account, session_key):
+        """End a session's poller and its streams, e.g. after logout"""
+        with self.lock:
+            poller = self.pollers.pop((account, session_key), None)
+            if poller is None:
+                return
+            subscribers = list(poller.subscribers)
+            poller.subscribers.clear()
+            poller.wake.set()
+        registry.add('teveclub_push_subscribers', -len(subscribers))
+        for subscriber in subscribers:
+            subscriber.deliver(END)
+
+
+hub = PushHub(settings.PUSH_MIN_INTERVAL, settings.PUSH_MAX_INTERVAL)
@@ -0,0 +1,100 @@
+"""
+Food and drink sprite sheets
+Packs the icons under static/images/<kind>/ into one PNG per kind plus a
+manifest of where each icon sits, so the web UI loads two images instead
+of one per icon. Build with: python manage.py build_sprites
+"""
+import json
+import math
+from pathlib import Path
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+
+KINDS = ('food', 'drink')
+
+# Static paths, relative to STATICFILES_DIRS
+SPRITE_DIR = 'images/sprites'
+MANIFEST_PATH = f'{SPRITE_DIR}/manifest.json'
+
+COLUMNS = 8
+
+
+def _icon_key(path):
+    """Sort icons by numeric id, then by name"""
+    return (0, int(path.stem), '') if path.stem.isdigit() else (1, 0, path.stem)
+
+
+def build_sprites(images_dir, columns=COLUMNS):
+    """
+    Pack every kind's icons into a sprite sheet and write the manifest
+
+    Args:
+        images_dir (Path): The static images directory
+        columns (int): Icons per sheet row
+
+    Returns:
+        dict: The manifest written, {kind: {sheet, width, height, icons:
+            {icon file name: [x, y, width, height]}}}
+    """
+    # Only this build step needs Pillow, not the running site
+    from PIL import Image
+
+    images_dir = Path(images_dir)
+    out_dir = images_dir / 'sprites'
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = {}
+    for kind in KINDS:
+        paths = sorted((images_dir / kind).glob('*.gif'), key=_icon_key)
+        if not paths:
+            continue
+        icons = [Image.open(path).convert('RGBA') for path in paths]
+        cell_w = max(icon.width for icon in icons)
+        cell_h = max(icon.height for icon in icons)
+        cols = min(columns, len(icons))
+        rows = math.ceil(len(icons) / cols)
+
+        sheet = Image.new('RGBA', (cols * cell_w, rows * cell_h), (0, 0, 0, 0))
+        offsets = {}
+        for index, (path, icon) in enumerate(zip(paths, icons)):
+            x, y = (index % cols) * cell_w, (index // cols) * cell_h
+            sheet.paste(icon, (x, y))
+            offsets[path.name] = [x, y, icon.width, icon.height]
+
+        sheet_name = f'{kind}.png'
+        sheet.save(out_dir / sheet_name, optimize=True)
+        manifest[kind] = {
+            'sheet': f'{SPRITE_DIR}/{sheet_name}',
+            'width': sheet.width,
+            'height': sheet.height,
+            'icons': offsets,
+        }
+
+    with open(out_dir / 'manifest.json', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+        f.write('\n')
+    return manifest
+
+
+def manifest_path():
+    """Filesystem path of the sprite manifest, None if it was never built"""
+    return finders.find(MANIFEST_PATH)
+
+
+def load_manifest():
+    """
+    Sprite manifest for the frontend, with each sheet's (hashed) static URL
+
+    Returns:
+        dict: The build_sprites() manifest plus a 'url' per kind; empty if
+            no sprites were built, so the frontend uses single icons
+    """
+    path = manifest_path()
+    if not path:
+        return {}
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    for sheet in manifest.values():
+        sheet['url'] = staticfiles_storage.url(sheet['sheet'])
+    return manifest
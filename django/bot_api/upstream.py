@@ -0,0 +1,240 @@
+"""
+Upstream client for teveclub.hu
+Sends requests either through the shared gateway process (when
+UPSTREAM_GATEWAY_SOCKET is set and reachable) or directly from this worker
+over a connection pool shared by all of its sessions. TLS verification
+follows settings.UPSTREAM_TLS_POLICY, remembering per host when a
+certificate could not be verified. Every request holds a slot of the
+worker's UpstreamScheduler, in the interactive lane unless told otherwise;
+Auto Mode jobs and push pollers use the background lane. Every response
+gets its encoding pinned here (the declared charset, else the site's
+Latin-2), so all views decode a page the same way and never run charset
+detection.
+"""
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from src.page import page_encoding
+from src.scheduler import INTERACTIVE, SlotTimeout, UpstreamScheduler
+from .gateway import IDEMPOTENT_METHODS, GatewayClient, GatewayUnavailable
+from .log import log_event
+from .metrics import registry
+
+
+logger = logging.getLogger(__name__)
+
+
+# One pool per worker: every per-user Session reuses these connections
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+
+_gateway = GatewayClient(settings.UPSTREAM_GATEWAY_SOCKET) if settings.UPSTREAM_GATEWAY_SOCKET else None
+_gateway_down_until = 0.0
+
+# How long to go direct after the gateway could not be reached
+GATEWAY_RETRY_INTERVAL = 30
+
+# teveclub.hu pages reported by name in metrics; any other path is 'other',
+# since the proxy forwards whatever URL the browser sends
+KNOWN_PATHS = frozenset({
+    '/', '/index.pet', '/myteve.pet', '/setfood.pet', '/setdrink.pet',
+    '/tanit.pet', '/egyszam.pet',
+})
+
+
+def metric_labels(host, path):
+    """
+    Bounded metric labels for an upstream URL
+
+    Returns:
+        tuple: (host label, path label), each a known value or 'other'
+    """
+    if host != 'teveclub.hu' and not (host or '').endswith('.teveclub.hu'):
+        return 'other', 'other'
+    return 'teveclub.hu', path if path in KNOWN_PATHS else 'other'
+
+
+class TlsPolicy:
+    """
+    Decide per host whether to verify certificates
+    'verify' always verifies and surfaces SSLError, 'insecure' never
+    verifies, and 'fallback' verifies until a host fails once, then goes
+    unverified for that host until the remembered outcome expires.
+    """
+
+    POLICIES = ('verify', 'fallback', 'insecure')
+
+    def __init__(self, policy, ttl):
+        """
+        Args:
+            policy (str): 'verify', 'fallback' or 'insecure'
+            ttl (float): Seconds a failed verification is remembered
+        """
+        if policy not in self.POLICIES:
+            raise ImproperlyConfigured(f"Unknown UPSTREAM_TLS_POLICY: {policy!r}")
+        self.policy = policy
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._unverified = {}  # host -> monotonic expiry
+
+    def should_verify(self, host):
+        """
+        Returns:
+            bool: Whether the next request to `host` should verify TLS
+        """
+        if self.policy != 'fallback':
+            return self.policy == 'verify'
+        expiry = self._unverified.get(host)
+        if expiry is None:
+            return True
+        if time.monotonic() >= expiry:
+            with self._lock:
+                self._unverified.pop(host, None)
+            return True
+        return False
+
+    def can_fall_back(self):
+        return self.policy == 'fallback'
+
+    def mark_unverified(self, host):
+        """Remember that `host` failed verification"""
+        with self._lock:
+            self._unverified[host] = time.monotonic() + self.ttl
+
+
+tls = TlsPolicy(settings.UPSTREAM_TLS_POLICY, settings.UPSTREAM_TLS_FALLBACK_TTL)
+
+
+# One per worker process: the slot limits are per worker, not per host
+try:
+    scheduler = UpstreamScheduler(
+        settings.UPSTREAM_SLOTS,
+        weights=settings.UPSTREAM_LANE_WEIGHTS,
+        reserved=settings.UPSTREAM_INTERACTIVE_RESERVED,
+        observer=lambda lane, waited: registry.observe(
+            'teveclub_upstream_queue_seconds', waited, lane=lane),
+    )
+except ValueError as e:
+    raise ImproperlyConfigured(f'Upstream scheduler settings: {e}') from e
+
+
+def new_session():
+    """
+    Create a requests.Session wired to the worker's shared connection pool
+
+    Returns:
+        requests.Session: Session with its own cookie jar
+    """
+    session = requests.Session()
+    session.mount('https://', _adapter)
+    session.mount('http://', _adapter)
+    return session
+
+
+def gateway_reachable():
+    """
+    Returns:
+        bool: True if the gateway socket accepts a connection on this thread
+    """
+    try:
+        _gateway._connection()
+        return True
+    except GatewayUnavailable:
+        return False
+
+
+def send(session_key, session, method, url, data=None, headers=None, timeout=30,
+         lane=INTERACTIVE):
+    """
+    Perform one upstream request for a Django session
+
+    Args:
+        session_key (str or None): Django session key, identifies the cookie jar
+        session (requests.Session): Session holding this user's cookies;
+            updated with any cookies the response sets
+        method (str): 'GET' or 'POST'
+        url (str): teveclub.hu URL
+        data (dict, optional): Form data for POSTs
+        headers (dict, optional): Request headers
+        timeout (float): Seconds before giving up, including the wait for
+            a scheduler slot
+        lane (str): Scheduler lane the request queues in
+
+    Returns:
+        requests.Response: The upstream response, its encoding pinned
+    """
+    parts = urlsplit(url)
+    host = parts.hostname
+    host_label, path = metric_labels(host, parts.path or '/')
+    verify = tls.should_verify(host)
+    registry.add('teveclub_upstream_in_flight', 1)
+    start = time.monotonic()
+    try:
+        # The slot wait and the request share one deadline, so a queued
+        # request still answers within the proxy's timeout
+        deadline = start + timeout
+        with scheduler.slot(lane, timeout=timeout):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise SlotTimeout(f'No time left after waiting for the {lane} lane')
+            try:
+                response = _send(session_key, session, method, url, data, headers, remaining, verify)
+            except requests.exceptions.SSLError as e:
+                if not verify or not tls.can_fall_back():
+                    raise
+                # Later requests skip the failing handshake
+                tls.mark_unverified(host)
+                log_event(logger, logging.WARNING, 'upstream.tls_fallback', host=host,
+                          ttl=tls.ttl, error=str(e))
+                registry.inc('teveclub_upstream_tls_fallback_total', host=host_label)
+                verify = False
+                # Redirects are followed, so the error may come from a later
+                # hop after a POST body was already sent: only repeat
+                # requests that are safe to send twice
+                if method.upper() not in IDEMPOTENT_METHODS:
+                    raise
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise
+                response = _send(session_key, session, method, url, data, headers, remaining, verify)
+    except SlotTimeout as e:
+        # Surface a scheduler wait timeout like an upstream timeout
+        registry.inc('teveclub_upstream_errors_total', path=path, error='Timeout')
+        raise requests.exceptions.Timeout(str(e)) from e
+    except Exception as e:
+        registry.inc('teveclub_upstream_errors_total', path=path, error=type(e).__name__)
+        raise
+    finally:
+        registry.observe('teveclub_upstream_request_duration_seconds',
+                         time.monotonic() - start, path=path)
+        registry.add('teveclub_upstream_in_flight', -1)
+    response.encoding = page_encoding(response)
+    registry.inc('teveclub_upstream_responses_total', path=path, status=str(response.status_code))
+    if not verify:
+        registry.inc('teveclub_upstream_unverified_total', host=host_label)
+    return response
+
+
+def _send(session_key, session, method, url, data, headers, timeout, verify):
+    global _gateway_down_until
+    if _gateway is not None and time.monotonic() >= _gateway_down_until:
+        try:
+            return _gateway.request(session_key, session, method, url, data=data,
+                                    headers=headers, timeout=timeout, verify=verify)
+        except GatewayUnavailable as e:
+            log_event(logger, logging.WARNING, 'upstream.gateway_unavailable', error=str(e))
+            _gateway_down_until = time.monotonic() + GATEWAY_RETRY_INTERVAL
+
+    return session.request(
+        method,
+        url,
+        data=data,
+        headers=headers,
+        timeout=timeout,
+        allow_redirects=True,
+        verify=verify
+    )
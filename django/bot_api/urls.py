@@ -1,6 +1,7 @@
 """
 URL configuration for bot_api app
-Single proxy endpoint - forwards requests to teveclub.hu
+Proxy endpoint forwarding requests to teveclub.hu, plus background jobs,
+the operator multi-account API, metrics and health checks
 """
 from django.urls import path
 from . import views
@@ -9,4 +10,14 @@ urlpatterns = [
     path('proxy/', views.proxy, name='proxy'),
     path('get-current-food-drink/', views.get_current_food_drink, name='get_current_food_drink'),
     path('get-current-trick/', views.get_current_trick, name='get_current_trick'),
+    path('jobs/auto/', views.start_auto_job, name='start_auto_job'),
+    path('jobs/<str:job_id>/', views.job_status, name='job_status'),
+    path('operator/login/', views.operator_login, name='operator_login'),
+    path('operator/logout/', views.operator_logout, name='operator_logout'),
+    path('accounts/', views.accounts, name='accounts'),
+    path('accounts/run/', views.run_accounts, name='run_accounts'),
+    path('accounts/<int:account_id>/', views.delete_account, name='delete_account'),
+    path('state/stream/', views.state_stream, name='state_stream'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('health/', views.health, name='health'),
 ]
@@ -1,42 +1,169 @@
 """
 Views for the Teveclub Frontend
-Django acts as a minimal proxy to bypass CORS
-No bot logic - just forwards HTTP requests to teveclub.hu
+Django acts as a minimal proxy to bypass CORS, forwarding HTTP requests
+to teveclub.hu. Only Auto Mode runs bot logic, as background jobs.
 """
-from django.shortcuts import render
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.conf import settings
+from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
+from django.contrib.staticfiles.finders import get_finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection
+from django.db.models import Count
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
+from django.views.decorators.http import condition, require_http_methods
 import requests
+import asyncio
+import hashlib
 import json
-import re
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
 from bs4 import BeautifulSoup
-from lxml import html as lxml_html
+from src.bot_core import LOGGED_IN_MARKER
+from .admission import Rejected, admission_controlled, admitted, controller as admission_controller
+from .coalesce import upstream_gets
+from .cookies import SESSION_ACCOUNT_KEY, SESSION_COOKIES_KEY, dump_jar, load_jar
+from .encoding import JsonResponse
+from .idempotency import MAX_KEY_LENGTH, RETRY_AFTER, StillRunning, recent_posts
+from . import fleet, jobs, push, sprites, upstream
+from .log import log_event
+from .metrics import registry, render as render_metrics
+from .middleware import compress, negotiate_encoding
+from .models import Account
+from .parsing import parse_food_drink, parse_trick
+
+
+logger = logging.getLogger(__name__)
+
+
+# Seconds a proxied teveclub.hu request may take, well below nginx's 60s
+PROXY_TIMEOUT = 30
 
 
 # Store sessions per Django session
 def get_session_for_user(request):
     """Get or create a requests.Session for this Django session"""
-    if 'requests_session_cookies' not in request.session:
-        request.session['requests_session_cookies'] = {}
-    
     # Create a new requests session with stored cookies
-    session = requests.Session()
-    cookies = request.session.get('requests_session_cookies', {})
-    for name, value in cookies.items():
-        session.cookies.set(name, value)
+    session = upstream.new_session()
+    load_jar(session.cookies, request.session.get(SESSION_COOKIES_KEY, []))
     
     return session
 
 
+def coalesced_get(request, session, url, fetch):
+    """
+    Run fetch() once for identical concurrent GETs of the same Django session
+    Followers share the leader's response and pick up the cookies it received.
+    Only the leader takes an admission slot.
+    
+    Args:
+        request: Django request
+        session (requests.Session): Upstream session for this request
+        url (str): Upstream URL being fetched
+        fetch (callable): Performs the GET with `session`
+        
+    Returns:
+        requests.Response: The (possibly shared) upstream response
+    """
+    fetch = admitted(request, fetch)
+    session_key = request.session.session_key
+    if not session_key:
+        # No Django session yet, nothing to coalesce against
+        return fetch()
+    
+    (response, cookies), shared = upstream_gets.do(
+        (session_key, url), lambda: (fetch(), session.cookies))
+    if shared:
+        registry.inc('teveclub_upstream_coalesced_total')
+        session.cookies.update(cookies)
+    return response
+
+
+def idempotent_post(request, session, url, fetch, timeout):
+    """
+    Run a POST at most once per Idempotency-Key within the replay window
+    Duplicates wait for or reuse the first request's response and cookies
+    
+    Args:
+        request: Django request, may carry an Idempotency-Key header
+        session (requests.Session): Upstream session for this request
+        url (str): Upstream URL being posted to
+        fetch (callable): Performs the POST with `session`
+        timeout (float): The POST's upstream timeout; duplicates wait no longer
+        
+    Returns:
+        tuple: (requests.Response, replayed)
+    
+    Raises:
+        StillRunning: A duplicate gave up waiting for the first request
+    """
+    key = request.headers.get('Idempotency-Key', '')
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return fetch(), False
+    
+    # Keys are scoped to the browser session, which must exist to hold them
+    if not request.session.session_key:
+        request.session.save()
+    
+    (response, cookies), replayed = recent_posts.do(
+        (request.session.session_key, key, url), lambda: (fetch(), dump_jar(session.cookies)),
+        wait=timeout)
+    if replayed:
+        registry.inc('teveclub_idempotent_replays_total')
+        session.cookies.clear()
+        load_jar(session.cookies, cookies)
+    return response, replayed
+
+
 def save_session_for_user(request, session):
-    """Save requests.Session cookies to Django session"""
-    request.session['requests_session_cookies'] = dict(session.cookies.items())
-    request.session.modified = True
+    """
+    Save requests.Session cookies to Django session
+    Keeps domain, path and expiry, drops expired cookies, and only touches
+    the session store when the upstream cookie jar changed
+    """
+    cookies = dump_jar(session.cookies)
+    if request.session.get(SESSION_COOKIES_KEY) != cookies:
+        request.session[SESSION_COOKIES_KEY] = cookies
+        registry.inc('teveclub_session_writes_total')
+
+
+def track_account(request, form_data, response):
+    """
+    Remember which teveclub.hu account this browser session is logged into
+    and refresh its live state after every other POST
+    The account is only recorded once the login response shows it logged
+    in, and logging out stops the session's live-state poller.
+    """
+    session_key = request.session.session_key
+    account = request.session.get(SESSION_ACCOUNT_KEY)
+    if form_data.get('tevenev'):
+        if LOGGED_IN_MARKER not in response.text:
+            return
+        new_account = form_data['tevenev'].strip().lower()
+        if account and account != new_account:
+            push.hub.stop(account, session_key)
+        request.session[SESSION_ACCOUNT_KEY] = new_account
+    elif form_data.get('logout'):
+        request.session.pop(SESSION_ACCOUNT_KEY, None)
+        if account:
+            push.hub.stop(account, session_key)
+    elif account:
+        push.hub.poke(account, session_key)
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@admission_controlled
 def proxy(request):
     """
     Proxy all requests to teveclub.hu
@@ -75,83 +202,78 @@ def proxy(request):
             headers['Content-Type'] = 'application/x-www-form-urlencoded'
         
         # Make request to teveclub.hu
-        print(f"[PROXY] Request: {method} {url}")
-        print(f"[PROXY] Form data: {form_data}")
-        
-        try:
-            if method == 'POST':
-                response = session.post(
-                    url, 
-                    data=form_data, 
-                    headers=headers, 
-                    timeout=30,
-                    allow_redirects=True,
-                    verify=True
-                )
-            else:
-                response = session.get(
-                    url, 
-                    headers=headers, 
-                    timeout=30,
-                    allow_redirects=True,
-                    verify=True
-                )
-        except requests.exceptions.SSLError as e:
-            # Try without SSL verification if SSL fails
-            print(f"[PROXY] SSL Error, retrying without verification: {e}")
-            if method == 'POST':
-                response = session.post(
-                    url, 
-                    data=form_data, 
-                    headers=headers, 
-                    timeout=30,
-                    allow_redirects=True,
-                    verify=False
-                )
-            else:
-                response = session.get(
-                    url, 
-                    headers=headers, 
-                    timeout=30,
-                    allow_redirects=True,
-                    verify=False
-                )
+        log_event(logger, logging.DEBUG, 'proxy.request', method=method, url=url, form=form_data)
+        
+        def fetch():
+            # TLS verification policy and per-host fallback live in upstream.send
+            return upstream.send(
+                request.session.session_key,
+                session,
+                method,
+                url,
+                data=form_data if method == 'POST' else None,
+                headers=headers,
+                timeout=PROXY_TIMEOUT
+            )
+        
+        if method == 'POST':
+            # POSTs change upstream state: never coalesce them, and make
+            # later GETs fetch fresh instead of joining an older one
+            if request.session.session_key:
+                upstream_gets.forget(request.session.session_key)
+            response, replayed = idempotent_post(request, session, url, admitted(request, fetch),
+                                                 PROXY_TIMEOUT)
+            track_account(request, form_data, response)
+        else:
+            response = coalesced_get(request, session, url, fetch)
+            replayed = False
         
         # Save session cookies
         save_session_for_user(request, session)
         
-        # Debug: log response
-        print(f"[PROXY] {method} {url}")
-        print(f"[PROXY] Status: {response.status_code}")
-        print(f"[PROXY] Response length: {len(response.text)} chars")
-        print(f"[PROXY] Cookies: {dict(session.cookies.items())}")
+        log_event(logger, logging.INFO, 'proxy.response', method=method, url=url,
+                  status=response.status_code, length=len(response.content),
+                  jar_size=len(session.cookies))
         
         # Check if we got an error page
         if response.status_code >= 500:
-            print(f"[PROXY] Server error response: {response.text[:200]}")
+            log_event(logger, logging.WARNING, 'proxy.upstream_error', method=method, url=url,
+                      status=response.status_code)
         
-        return JsonResponse({
+        proxied = JsonResponse({
             'success': response.status_code < 400,
             'html': response.text,
             'status': response.status_code
         })
+        if replayed:
+            proxied['Idempotent-Replayed'] = 'true'
+        return proxied
         
+    except Rejected:
+        raise  # 429 from admission_controlled
+    except StillRunning:
+        # Answer instead of holding this thread past the proxy timeout
+        response = JsonResponse({
+            'success': False,
+            'message': 'The same request is still running, please retry',
+            'retryAfter': RETRY_AFTER
+        }, status=409)
+        response['Retry-After'] = str(RETRY_AFTER)
+        return response
     except requests.exceptions.Timeout:
-        print("[PROXY] Request timeout")
+        log_event(logger, logging.WARNING, 'proxy.timeout', url=url)
         return JsonResponse({
             'success': False,
             'message': 'Request timed out'
         }, status=504)
     except requests.exceptions.RequestException as e:
-        print(f"[PROXY] Request exception: {e}")
+        log_event(logger, logging.WARNING, 'proxy.request_failed', url=url, error=str(e))
         return JsonResponse({
             'success': False,
             'message': f'Request failed: {str(e)}'
         }, status=500)
     except Exception as e:
-        print(f"[PROXY] Unexpected error: {e}")
-        import traceback
-        traceback.print_exc()
+        log_event(logger, logging.ERROR, 'proxy.error', exc_info=True, error=str(e))
         return JsonResponse({
             'success': False,
             'message': f'Error: {str(e)}'
@@ -160,6 +282,7 @@ def proxy(request):
 
 @csrf_exempt
 @require_http_methods(["GET"])
+@admission_controlled
 def get_current_trick(request):
     """
     Fetch current trick text from myteve.pet
@@ -175,12 +298,17 @@ def get_current_trick(request):
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
         }
         
-        response = session.get(
-            'https://teveclub.hu/myteve.pet',
+        url = 'https://teveclub.hu/myteve.pet'
+        response = coalesced_get(request, session, url, lambda: upstream.send(
+            request.session.session_key,
+            session,
+            'GET',
+            url,
             headers=headers,
-            timeout=30,
-            verify=False
-        )
+            timeout=30
+        ))
+        
+        save_session_for_user(request, session)
         
         if response.status_code != 200:
             return JsonResponse({
@@ -188,55 +316,17 @@ def get_current_trick(request):
                 'message': f'Failed to fetch myteve.pet: {response.status_code}'
             })
         
-        # Parse HTML with lxml
-        tree = lxml_html.fromstring(response.content)
-        
-        # Get trick text using xpath - try multiple possible paths
-        trick_elements = tree.xpath('/html/body/center/table/tbody/tr[1]/td[2]/center/table[3]/tbody/tr/td/table/tbody/tr[3]/td[2]/div[1]')
-        
-        if not trick_elements:
-            # Try without tbody (browsers auto-insert tbody but HTML might not have it)
-            trick_elements = tree.xpath('/html/body/center/table/tr[1]/td[2]/center/table[3]/tr/td/table/tr[3]/td[2]/div[1]')
-        
-        if not trick_elements:
-            # Try more flexible pattern looking for specific text
-            trick_elements = tree.xpath('//div[contains(text(), "Tanult trükk") or contains(text(), "trükk")]')
-        
-        trick_text = None
-        if trick_elements:
-            # Get all text nodes before <br> tag
-            div_element = trick_elements[0]
-            text_parts = []
-            
-            # Iterate through text content and child elements
-            if div_element.text:
-                text_parts.append(div_element.text)
-            
-            for child in div_element:
-                if child.tag == 'br':
-                    break  # Stop at first <br>
-                if child.text:
-                    text_parts.append(child.text)
-                if child.tail:
-                    text_parts.append(child.tail)
-            
-            trick_text = ''.join(text_parts).strip()
-            print(f"[GET_CURRENT_TRICK] Found trick: {trick_text}")
-        else:
-            # Debug output
-            print("[GET_CURRENT_TRICK] Trick element not found, trying to find any table structure")
-            tables = tree.xpath('//table')
-            print(f"[GET_CURRENT_TRICK] Found {len(tables)} tables in HTML")
+        trick_text = parse_trick(response.content)
         
         return JsonResponse({
             'success': True,
             'trick': trick_text
         })
         
+    except Rejected:
+        raise  # 429 from admission_controlled
     except Exception as e:
-        print(f"[GET_CURRENT_TRICK] Error: {e}")
-        import traceback
-        traceback.print_exc()
+        log_event(logger, logging.ERROR, 'state.trick_error', exc_info=True, error=str(e))
         return JsonResponse({
             'success': False,
             'message': f'Error: {str(e)}'
@@ -245,6 +335,7 @@ def get_current_trick(request):
 
 @csrf_exempt
 @require_http_methods(["GET"])
+@admission_controlled
 def get_current_food_drink(request):
     """
     Fetch and parse current food/drink from myteve.pet
@@ -260,12 +351,17 @@ def get_current_food_drink(request):
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
         }
         
-        response = session.get(
-            'https://teveclub.hu/myteve.pet',
+        url = 'https://teveclub.hu/myteve.pet'
+        response = coalesced_get(request, session, url, lambda: upstream.send(
+            request.session.session_key,
+            session,
+            'GET',
+            url,
             headers=headers,
-            timeout=30,
-            verify=False
-        )
+            timeout=30
+        ))
+        
+        save_session_for_user(request, session)
         
         if response.status_code != 200:
             return JsonResponse({
@@ -273,74 +369,451 @@ def get_current_food_drink(request):
                 'message': f'Failed to fetch myteve.pet: {response.status_code}'
             })
         
-        html = response.text
-        
-        # Parse HTML to find food and drink images
-        result = {
-            'foodId': None,
-            'foodIcon': None,
-            'drinkId': None,
-            'drinkIcon': None
-        }
-        
-        # Look for food: "Etet\u0151" or "Eteto" followed by image
-        # Try multiple patterns
-        food_match = re.search(r'Etet[\u0151o][^<]*<[^>]*<a[^>]*>.*?files/(\d+)\.gif', html, re.IGNORECASE | re.DOTALL)
-        if not food_match:
-            food_match = re.search(r'Etet[\u0151o].*?(\d+)\.gif', html, re.IGNORECASE | re.DOTALL)
-        if not food_match:
-            # Try simpler pattern matching any path before number.gif
-            food_match = re.search(r'Etet[\u0151o].*?/(\d+)\.gif', html, re.IGNORECASE | re.DOTALL)
-        
-        if food_match:
-            result['foodId'] = int(food_match.group(1))
-            result['foodIcon'] = f"{food_match.group(1)}.gif"
-            print(f"[GET_FOOD_DRINK] Found food: {result['foodId']}")
-        else:
-            # Debug: show what we're searching in
-            food_section = re.search(r'Etet[\u0151o].{0,200}', html, re.IGNORECASE | re.DOTALL)
-            if food_section:
-                print(f"[GET_FOOD_DRINK] Food section sample: {food_section.group(0)}")
-            else:
-                print("[GET_FOOD_DRINK] Food keyword not found in HTML")
-        
-        # Look for drink: "Itat\u00f3" or "Itato" followed by image
-        drink_match = re.search(r'Itat[\u00f3o][^<]*<[^>]*<a[^>]*>.*?files/(\d+)\.gif', html, re.IGNORECASE | re.DOTALL)
-        if not drink_match:
-            drink_match = re.search(r'Itat[\u00f3o].*?(\d+)\.gif', html, re.IGNORECASE | re.DOTALL)
-        if not drink_match:
-            drink_match = re.search(r'Itat[\u00f3o].*?/(\d+)\.gif', html, re.IGNORECASE | re.DOTALL)
-            
-        if drink_match:
-            result['drinkId'] = int(drink_match.group(1))
-            result['drinkIcon'] = f"{drink_match.group(1)}.gif"
-            print(f"[GET_FOOD_DRINK] Found drink: {result['drinkId']}")
-        else:
-            # Debug: show what we're searching in
-            drink_section = re.search(r'Itat[\u00f3o].{0,200}', html, re.IGNORECASE | re.DOTALL)
-            if drink_section:
-                print(f"[GET_FOOD_DRINK] Drink section sample: {drink_section.group(0)}")
-            else:
-                print("[GET_FOOD_DRINK] Drink keyword not found in HTML")
+        result = parse_food_drink(response.text)
         
         return JsonResponse({
             'success': True,
             'data': result
         })
         
+    except Rejected:
+        raise  # 429 from admission_controlled
     except Exception as e:
-        print(f"[GET_FOOD_DRINK] Error: {e}")
-        import traceback
-        traceback.print_exc()
+        log_event(logger, logging.ERROR, 'state.food_drink_error', exc_info=True, error=str(e))
         return JsonResponse({
             'success': False,
             'message': f'Error: {str(e)}'
         }, status=500)
 
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def start_auto_job(request):
+    """
+    Queue a server-side Auto Mode run (login, feed, learn, guess)
+    Returns immediately with the job; poll job_status for progress
+    """
+    try:
+        data = json.loads(request.body)
+        username = data.get('username', '').strip()
+        password = data.get('password', '').strip()
+        
+        if not username or not password:
+            return JsonResponse({
+                'success': False,
+                'message': 'Username and password are required'
+            }, status=400)
+        
+        # Jobs belong to the browser session that started them
+        if not request.session.session_key:
+            request.session.save()
+        
+        job = jobs.submit_auto_job(request.session.session_key, username, password)
+        if job is None:
+            response = JsonResponse({
+                'success': False,
+                'message': 'Too many Auto Mode runs queued, please retry'
+            }, status=429)
+            response['Retry-After'] = '5'
+            return response
+        
+        log_event(logger, logging.INFO, 'jobs.queued', job=job['id'], username=username)
+        return JsonResponse({
+            'success': True,
+            'job': jobs.public_job(job)
+        }, status=202)
+        
+    except Exception as e:
+        log_event(logger, logging.ERROR, 'jobs.error', exc_info=True, error=str(e))
+        return JsonResponse({
+            'success': False,
+            'message': f'Error: {str(e)}'
+        }, status=500)
+
+
+@require_http_methods(["GET"])
+def job_status(request, job_id):
+    """
+    Report progress or the stored result of an Auto Mode job
+    Returns: {job: {id, status, step, message, ...}}
+    """
+    job = jobs.get_job(job_id)
+    if job is None or job['owner'] != request.session.session_key:
+        return JsonResponse({
+            'success': False,
+            'message': 'Job not found'
+        }, status=404)
+    
+    return JsonResponse({
+        'success': True,
+        'job': jobs.public_job(job)
+    })
+
+
+def operator_required(view):
+    """Answer 401 unless the request comes from a logged-in operator"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({
+                'success': False,
+                'message': 'Login required'
+            }, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@ensure_csrf_cookie
+@require_http_methods(["GET", "POST"])
+def operator_login(request):
+    """
+    Log an operator (Django user) in for the multi-account API
+    GET reports the current login and sets the CSRF cookie POSTs need
+    Body: {username, password}
+    """
+    if request.method == 'GET':
+        return JsonResponse({
+            'success': True,
+            'authenticated': request.user.is_authenticated,
+            'username': request.user.get_username() if request.user.is_authenticated else None
+        })
+    
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        data = {}
+    user = authenticate(request, username=data.get('username', ''), password=data.get('password', ''))
+    if user is None:
+        return JsonResponse({
+            'success': False,
+            'message': 'Invalid username or password'
+        }, status=401)
+    
+    auth_login(request, user)
+    return JsonResponse({
+        'success': True,
+        'username': user.get_username()
+    })
+
+
+@require_http_methods(["POST"])
+def operator_logout(request):
+    """Log the operator out"""
+    auth_logout(request)
+    return JsonResponse({'success': True})
+
+
+@require_http_methods(["GET", "POST"])
+@operator_required
+def accounts(request):
+    """
+    GET: one page of the operator's accounts, oldest first
+        Query: status (optional filter), after (id cursor), limit
+        Returns: {accounts: [...], next: cursor or null, counts: {status: n}}
+    POST: register accounts, updating the password of known ones
+        Body: {username, password} or {accounts: [{username, password}, ...]}
+    """
+    if request.method == 'POST':
+        return _register_accounts(request)
+    
+    try:
+        after = int(request.GET.get('after', 0))
+        limit = min(int(request.GET.get('limit', settings.FLEET_PAGE_SIZE)), settings.FLEET_MAX_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'message': 'after and limit must be integers'
+        }, status=400)
+    
+    owned = Account.objects.filter(owner=request.user)
+    page = owned.filter(id__gt=after)
+    status = request.GET.get('status')
+    if status:
+        page = page.filter(status=status)
+    rows = list(page.order_by('id')[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    
+    counts = {row['status']: row['n'] for row in
+              owned.order_by().values('status').annotate(n=Count('id'))}
+    return JsonResponse({
+        'success': True,
+        'accounts': [account.as_dict() for account in rows],
+        'next': rows[-1].id if more else None,
+        'counts': counts
+    })
+
+
+def _register_accounts(request):
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        data = None
+    entries = data.get('accounts', [data]) if isinstance(data, dict) else None
+    if not entries or len(entries) > settings.FLEET_MAX_PAGE_SIZE:
+        return JsonResponse({
+            'success': False,
+            'message': f'Send 1 to {settings.FLEET_MAX_PAGE_SIZE} accounts'
+        }, status=400)
+    
+    new_accounts = []
+    for entry in entries:
+        username = str(entry.get('username', '')).strip() if isinstance(entry, dict) else ''
+        password = str(entry.get('password', '')).strip() if isinstance(entry, dict) else ''
+        if not username or not password:
+            return JsonResponse({
+                'success': False,
+                'message': 'Every account needs a username and password'
+            }, status=400)
+        new_accounts.append(Account(owner=request.user, username=username, password=password))
+    
+    Account.objects.bulk_create(
+        new_accounts,
+        update_conflicts=True,
+        unique_fields=['owner', 'username'],
+        update_fields=['password', 'updated']
+    )
+    return JsonResponse({
+        'success': True,
+        'registered': len(new_accounts)
+    }, status=201)
+
+
+@require_http_methods(["DELETE"])
+@operator_required
+def delete_account(request, account_id):
+    """Remove one of the operator's accounts"""
+    deleted, _ = Account.objects.filter(owner=request.user, id=account_id).delete()
+    if not deleted:
+        return JsonResponse({
+            'success': False,
+            'message': 'Account not found'
+        }, status=404)
+    return JsonResponse({'success': True})
+
+
+@require_http_methods(["POST"])
+@operator_required
+def run_accounts(request):
+    """
+    Queue runs (login, feed, learn, guess) for the operator's accounts
+    Body (optional): {ids: [...]} to run only some accounts
+    Returns 202 with {queued: n}; follow progress through GET accounts
+    """
+    try:
+        data = json.loads(request.body) if request.body else {}
+    except ValueError:
+        data = {}
+    ids = data.get('ids') if isinstance(data, dict) else None
+    if ids is not None and not (isinstance(ids, list) and all(isinstance(i, int) for i in ids)):
+        return JsonResponse({
+            'success': False,
+            'message': 'ids must be a list of account ids'
+        }, status=400)
+    
+    queued = fleet.queue_runs(request.user, ids)
+    return JsonResponse({
+        'success': True,
+        'queued': queued
+    }, status=202)
+
+
+# Blocking streams currently holding a WSGI thread in this worker
+_wsgi_streams = 0
+_wsgi_streams_lock = threading.Lock()
+
+# Comment line sent when nothing changed, so proxies keep the connection open
+SSE_KEEPALIVE = 15
+
+
+def _sync_state_stream(account, session_key, subscriber):
+    global _wsgi_streams
+    deadline = time.monotonic() + settings.PUSH_MAX_STREAM_SECONDS
+    try:
+        yield f'retry: {settings.PUSH_RETRY_MS}\n\n'
+        while time.monotonic() < deadline:
+            try:
+                state = subscriber.queue.get(timeout=SSE_KEEPALIVE)
+            except queue.Empty:
+                yield ': ping\n\n'
+                continue
+            if state is push.END:
+                break  # Logged out; the reconnect gets 204
+            yield push.format_event(state)
+    finally:
+        push.hub.unsubscribe(account, session_key, subscriber)
+        admission_controller.free_thread()
+        with _wsgi_streams_lock:
+            _wsgi_streams -= 1
+
+
+async def _async_state_stream(account, session_key, cookies):
+    subscriber = push.AsyncSubscriber(asyncio.get_running_loop())
+    push.hub.subscribe(account, session_key, cookies, subscriber)
+    deadline = time.monotonic() + settings.PUSH_MAX_STREAM_SECONDS
+    try:
+        yield f'retry: {settings.PUSH_RETRY_MS}\n\n'
+        while time.monotonic() < deadline:
+            try:
+                state = await asyncio.wait_for(subscriber.queue.get(), SSE_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if state is push.END:
+                break  # Logged out; the reconnect gets 204
+            yield push.format_event(state)
+    finally:
+        push.hub.unsubscribe(account, session_key, subscriber)
+
+
+@require_http_methods(["GET"])
+def state_stream(request):
+    """
+    Server-sent events with live food/drink/trick changes of the logged-in
+    account. Under ASGI the stream costs no thread; under WSGI each one holds
+    a worker thread, so they are capped per worker, counted against
+    UPSTREAM_MAX_IN_FLIGHT_PER_WORKER, and end after PUSH_MAX_STREAM_SECONDS,
+    when EventSource reconnects.
+    """
+    global _wsgi_streams
+    account = request.session.get(SESSION_ACCOUNT_KEY)
+    if not account:
+        # 204 tells EventSource not to reconnect
+        return HttpResponse(status=204)
+    
+    session_key = request.session.session_key
+    cookies = request.session.get(SESSION_COOKIES_KEY, [])
+    if isinstance(request, ASGIRequest):
+        stream = _async_state_stream(account, session_key, cookies)
+    else:
+        # A stream's thread comes out of the same per-worker budget as
+        # upstream calls, so a thread is still left to answer 429s
+        with _wsgi_streams_lock:
+            if _wsgi_streams >= settings.PUSH_MAX_WSGI_STREAMS or not admission_controller.hold_thread():
+                return JsonResponse({
+                    'success': False,
+                    'message': 'Too many live streams, poll instead'
+                }, status=503)
+            _wsgi_streams += 1
+        subscriber = push.QueueSubscriber()
+        push.hub.subscribe(account, session_key, cookies, subscriber)
+        stream = _sync_state_stream(account, session_key, subscriber)
+    
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Let nginx pass events through at once
+    return response
+
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """
+    Prometheus scrape endpoint, merged across all gunicorn workers
+    """
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@require_http_methods(["GET"])
+def health(request):
+    """
+    Liveness/readiness check of the stores the views depend on
+    Returns: {status, checks: {database, cache, gateway?}}; 503 if any failed
+    """
+    checks = {}
+    try:
+        connection.ensure_connection()
+        checks['database'] = 'ok'
+    except Exception as e:
+        checks['database'] = f'error: {e}'
+    try:
+        cache.set('health-check', 1, 10)
+        checks['cache'] = 'ok' if cache.get('health-check') == 1 else 'error: value not stored'
+    except Exception as e:
+        checks['cache'] = f'error: {e}'
+    if settings.UPSTREAM_GATEWAY_SOCKET:
+        checks['gateway'] = 'ok' if upstream.gateway_reachable() else 'unreachable'
+    
+    # The gateway is optional: workers fall back to direct requests without it
+    healthy = all(v == 'ok' for k, v in checks.items() if k != 'gateway')
+    return JsonResponse({
+        'status': 'ok' if healthy else 'error',
+        'checks': checks
+    }, status=200 if healthy else 503)
+
+
+# index.html rendered once per process (re-rendered when the template or
+# the static manifest changes), with compressed variants made on demand
+_index_page = None
+_index_lock = threading.Lock()
+
+
+def _index_mtime():
+    """Newest modification time of the files the rendered index depends on"""
+    paths = [get_template('index.html').origin.name]
+    sprite_manifest = sprites.manifest_path()
+    if sprite_manifest:
+        paths.append(sprite_manifest)
+    manifest_name = getattr(staticfiles_storage, 'manifest_name', None)
+    if manifest_name and staticfiles_storage.exists(manifest_name):
+        paths.append(staticfiles_storage.path(manifest_name))
+    return max(os.path.getmtime(path) for path in paths)
+
+
+def _static_assets():
+    """Map of image paths to their (hashed) static URLs, for app.js"""
+    return {
+        path: staticfiles_storage.url(path)
+        for finder in get_finders()
+        for path, _ in finder.list([])
+        if path.startswith('images/')
+    }
+
+
+def get_index_page():
+    """
+    Returns:
+        dict: {mtime, etag, last_modified, bodies: {encoding or None: bytes}}
+    """
+    global _index_page
+    mtime = _index_mtime()
+    page = _index_page
+    if page is None or page['mtime'] != mtime:
+        with _index_lock:
+            if _index_page is None or _index_page['mtime'] != mtime:
+                body = render_to_string('index.html', {
+                    'static_assets': _static_assets(),
+                    'sprites': sprites.load_manifest(),
+                }).encode('utf-8')
+                _index_page = {
+                    'mtime': mtime,
+                    # Weak: the gzip/br variants share it
+                    'etag': 'W/"%s"' % hashlib.sha256(body).hexdigest()[:32],
+                    'last_modified': datetime.fromtimestamp(mtime, tz=dt_timezone.utc),
+                    'bodies': {None: body},
+                }
+            page = _index_page
+    return page
+
+
+@require_http_methods(["GET", "HEAD"])
+@ensure_csrf_cookie
+@cache_control(no_cache=True)
+@condition(etag_func=lambda request: get_index_page()['etag'],
+           last_modified_func=lambda request: get_index_page()['last_modified'])
 def index(request):
     """
-    Render the main page
-    Frontend JavaScript calls Django proxy which forwards to teveclub.hu
+    Serve the main page
+    Frontend JavaScript calls Django proxy which forwards to teveclub.hu.
+    The page is pre-rendered; browsers revalidate it and usually get a 304.
     """
-    return render(request, 'index.html')
+    page = get_index_page()
+    encoding = negotiate_encoding(request)
+    body = page['bodies'].get(encoding)
+    if body is None:
+        body = page['bodies'][encoding] = compress(page['bodies'][None], encoding)
+    
+    response = HttpResponse(body, content_type='text/html; charset=utf-8')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -1,11 +1,51 @@
 // Teveclub Bot - Frontend API Client
 // Uses Django proxy to communicate with teveclub.hu
 
+// Hashed, immutably cached URLs of static images, embedded by the index page
+const STATIC_ASSETS = JSON.parse(document.getElementById('static-assets')?.textContent || '{}');
+
+function staticURL(path) {
+    return STATIC_ASSETS[path] || `/static/${path}`;
+}
+
+// Live-state stream reconnects after the server refused or dropped it:
+// the first waits STATE_STREAM_RETRY_MS, each later one twice as long, and
+// after STATE_STREAM_MAX_RETRIES the page stops trying until the next login
+const STATE_STREAM_RETRY_MS = 30000;
+const STATE_STREAM_MAX_RETRIES = 4;
+
+// Food/drink sprite sheets: kind -> {url, icons: {file name: [x, y, w, h]}}
+const SPRITES = JSON.parse(document.getElementById('sprite-manifest')?.textContent || '{}');
+
+// Markup for a food or drink icon, from the sprite sheet when it has it
+function iconHTML(kind, icon, alt, className = '') {
+    const sheet = SPRITES[kind];
+    const cell = sheet?.icons[icon];
+    if (cell) {
+        const [x, y, w, h] = cell;
+        return `<span class="sprite-icon ${className}" role="img" aria-label="${alt}" ` +
+            `style="width: ${w}px; height: ${h}px; background-image: url('${sheet.url}'); ` +
+            `background-position: -${x}px -${y}px;"></span>`;
+    }
+    return `<img src="${staticURL(`images/${kind}/${icon}`)}" class="${className}" ` +
+        `style="width: 30px; height: 30px; vertical-align: middle; object-fit: contain;" ` +
+        `alt="${alt}" onerror="this.style.display='none';">`;
+}
+
 class TeveclubAPI {
     constructor() {
         this.proxyURL = '/api/proxy/';
         this.teveclubBase = 'https://teveclub.hu';
         this.csrfToken = this.getCSRFToken();
+        // Idempotency keys of POSTs still waiting for a response, by request body
+        this.pendingPosts = new Map();
+    }
+
+    newIdempotencyKey() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
     }
 
     getCSRFToken() {
@@ -24,23 +64,55 @@ class TeveclubAPI {
         return cookieValue;
     }
 
+    async fetchWithBackoff(url, options, maxRetries = 4) {
+        // The server answers 429 with a Retry-After hint when it is overloaded.
+        // Wait at least that long, doubling per attempt, with jitter so
+        // clients rejected together do not all come back together
+        for (let attempt = 0; ; attempt++) {
+            const response = await fetch(url, options);
+            if (response.status !== 429 || attempt >= maxRetries) {
+                return response;
+            }
+            const retryAfter = parseFloat(response.headers.get('Retry-After')) || 1;
+            const delay = Math.max(retryAfter * 1000, 500 * Math.pow(2, attempt));
+            console.log(`Server busy, retrying in ${Math.round(delay)} ms`);
+            await new Promise(resolve => setTimeout(resolve, delay * (1 + Math.random() * 0.3)));
+        }
+    }
+
     async proxyRequest(url, method = 'GET', data = null) {
+        const body = JSON.stringify({
+            url: url,
+            method: method,
+            data: data
+        });
+        const headers = {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': this.csrfToken
+        };
+
+        // State-changing POSTs carry an idempotency key so the server runs
+        // them once: 429 retries reuse the key, and an identical POST sent
+        // while the first is still pending (double click) shares it
+        const idempotent = method === 'POST';
+        if (idempotent) {
+            if (!this.pendingPosts.has(body)) {
+                this.pendingPosts.set(body, { key: this.newIdempotencyKey(), users: 0 });
+            }
+            const pending = this.pendingPosts.get(body);
+            pending.users++;
+            headers['Idempotency-Key'] = pending.key;
+        }
+
         const options = {
             method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-                'X-CSRFToken': this.csrfToken
-            },
+            headers: headers,
             credentials: 'same-origin',
-            body: JSON.stringify({
-                url: url,
-                method: method,
-                data: data
-            })
+            body: body
         };
 
         try {
-            const response = await fetch(this.proxyURL, options);
+            const response = await this.fetchWithBackoff(this.proxyURL, options);
             const result = await response.json();
             return result;
         } catch (error) {
@@ -49,6 +121,13 @@ class TeveclubAPI {
                 success: false,
                 message: `Network error: ${error.message}`
             };
+        } finally {
+            if (idempotent) {
+                const pending = this.pendingPosts.get(body);
+                if (--pending.users === 0) {
+                    this.pendingPosts.delete(body);
+                }
+            }
         }
     }
 
@@ -206,9 +285,40 @@ class TeveclubAPI {
         return { success: true, message: 'Logged out successfully' };
     }
 
+    async startAutoJob(username, password) {
+        try {
+            const response = await this.fetchWithBackoff('/api/jobs/auto/', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': this.csrfToken
+                },
+                credentials: 'same-origin',
+                body: JSON.stringify({ username: username, password: password })
+            });
+            return await response.json();
+        } catch (error) {
+            console.error('Error starting auto job:', error);
+            return { success: false, message: `Network error: ${error.message}` };
+        }
+    }
+
+    async getJob(jobId) {
+        try {
+            const response = await this.fetchWithBackoff(`/api/jobs/${jobId}/`, {
+                method: 'GET',
+                credentials: 'same-origin'
+            });
+            return await response.json();
+        } catch (error) {
+            console.error('Error fetching job:', error);
+            return { success: false, message: `Network error: ${error.message}` };
+        }
+    }
+
     async getCurrentFoodDrink() {
         try {
-            const response = await fetch('/api/get-current-food-drink/', {
+            const response = await this.fetchWithBackoff('/api/get-current-food-drink/', {
                 method: 'GET',
                 headers: {
                     'X-CSRFToken': this.csrfToken
@@ -233,7 +343,7 @@ class TeveclubAPI {
 
     async getCurrentTrick() {
         try {
-            const response = await fetch('/api/get-current-trick/', {
+            const response = await this.fetchWithBackoff('/api/get-current-trick/', {
                 method: 'GET',
                 headers: {
                     'X-CSRFToken': this.csrfToken
@@ -284,6 +394,7 @@ class TeveclubUI {
         this.initElements();
         this.loadSavedCredentials();
         this.bindEvents();
+        this.resumeAutoJob();
     }
 
     initElements() {
@@ -320,10 +431,10 @@ class TeveclubUI {
 
         // Set default icons
         if (this.foodIcon) {
-            this.foodIcon.innerHTML = '<img src="/static/images/food/0.gif" style="width: 30px; height: 30px; object-fit: contain;" alt="food">';
+            this.foodIcon.innerHTML = iconHTML('food', '0.gif', 'food');
         }
         if (this.drinkIcon) {
-            this.drinkIcon.innerHTML = '<img src="/static/images/drink/0.gif" style="width: 30px; height: 30px; object-fit: contain;" alt="drink">';
+            this.drinkIcon.innerHTML = iconHTML('drink', '0.gif', 'drink');
         }
 
         // Status
@@ -445,10 +556,7 @@ class TeveclubUI {
         console.log('Initializing food list with', foods.length, 'items');
         this.foodList.innerHTML = foods.map(food => `
             <div class="food-item" data-id="${food.id}">
-                <img src="/static/images/food/${food.icon}" 
-                     alt="${food.name}" 
-                     class="dropdown-item-icon"
-                     onerror="this.style.display='none';">
+                ${iconHTML('food', food.icon, food.name, 'dropdown-item-icon')}
                 <span class="dropdown-item-name">${food.name}</span>
                 ${food.cost > 0 ? `<span class="cost">(${food.cost} dt)</span>` : '<span class="free">Ingyenes!</span>'}
             </div>
@@ -467,10 +575,7 @@ class TeveclubUI {
         const drinks = this.api.getDrinkItems();
         this.drinkList.innerHTML = drinks.map(drink => `
             <div class="drink-item" data-id="${drink.id}">
-                <img src="/static/images/drink/${drink.icon}" 
-                     alt="${drink.name}"
-                     class="dropdown-item-icon"
-                     onerror="this.style.display='none';">
+                ${iconHTML('drink', drink.icon, drink.name, 'dropdown-item-icon')}
                 <span class="dropdown-item-name">${drink.name}</span>
                 ${drink.cost > 0 ? `<span class="cost">(${drink.cost} dt)</span>` : '<span class="free">Ingyenes!</span>'}
             </div>
@@ -532,55 +637,67 @@ class TeveclubUI {
 
         const autoModeBtn = document.getElementById('auto-mode-btn');
         this.setButtonLoading(autoModeBtn, true);
-        this.showStatus(this.loginStatus, '⚡ Auto Mode: Logging in...', 'info');
+        this.showStatus(this.loginStatus, '⚡ Auto Mode: Queuing...', 'info');
 
-        // Step 1: Login
-        const loginResult = await this.api.login(username, password);
+        // The server runs login, feed, learn and guess in the background,
+        // so closing the tab no longer aborts the run
+        const result = await this.api.startAutoJob(username, password);
         
-        if (!loginResult.success) {
+        if (!result.success) {
             this.setButtonLoading(autoModeBtn, false);
-            this.showStatus(this.loginStatus, `❌ Login failed: ${loginResult.message}`, 'error');
+            this.showStatus(this.loginStatus, `❌ Auto Mode failed: ${result.message}`, 'error');
             return;
         }
 
         // Save credentials if remember me is checked
         this.saveCredentials(username, password);
         
-        this.showStatus(this.loginStatus, '⚡ Auto Mode: Feeding...', 'info');
-
-        // Step 2: Feed
-        const feedResult = await this.api.feed();
-        if (!feedResult.success) {
-            this.showStatus(this.loginStatus, `⚠️ Feed warning: ${feedResult.message}`, 'warning');
-        }
-
-        this.showStatus(this.loginStatus, '⚡ Auto Mode: Learning...', 'info');
-
-        // Step 3: Learn
-        const learnResult = await this.api.learn();
-        if (!learnResult.success) {
-            this.showStatus(this.loginStatus, `⚠️ Learn warning: ${learnResult.message}`, 'warning');
-        }
+        localStorage.setItem('teveclub_auto_job', result.job.id);
+        await this.followAutoJob(result.job.id);
+    }
 
-        this.showStatus(this.loginStatus, '⚡ Auto Mode: Guessing...', 'info');
+    async followAutoJob(jobId) {
+        const autoModeBtn = document.getElementById('auto-mode-btn');
+        const stepLabels = {
+            login: 'Logging in...',
+            feed: 'Feeding...',
+            learn: 'Learning...',
+            guess: 'Guessing...'
+        };
+        this.setButtonLoading(autoModeBtn, true);
 
-        // Step 4: Guess
-        const guessResult = await this.api.guess();
-        if (!guessResult.success) {
-            this.showStatus(this.loginStatus, `⚠️ Guess warning: ${guessResult.message}`, 'warning');
+        while (true) {
+            const result = await this.api.getJob(jobId);
+            
+            if (!result.success) {
+                this.showStatus(this.loginStatus, `⚠️ Auto Mode status unavailable: ${result.message}`, 'warning');
+                break;
+            }
+            
+            const job = result.job;
+            if (job.status === 'done') {
+                this.showStatus(this.loginStatus, '✅ Auto Mode completed successfully! All tasks done.', 'success');
+                break;
+            }
+            if (job.status === 'failed') {
+                this.showStatus(this.loginStatus, `❌ Auto Mode failed: ${job.message}`, 'error');
+                break;
+            }
+            
+            const label = stepLabels[job.step] || 'Queued...';
+            this.showStatus(this.loginStatus, `⚡ Auto Mode: ${label}`, 'info');
+            await new Promise(resolve => setTimeout(resolve, 1000));
         }
 
-        this.showStatus(this.loginStatus, '⚡ Auto Mode: Logging out...', 'info');
-
-        // Step 5: Logout
-        const logoutResult = await this.api.logout();
-
+        localStorage.removeItem('teveclub_auto_job');
         this.setButtonLoading(autoModeBtn, false);
+    }
 
-        if (logoutResult.success) {
-            this.showStatus(this.loginStatus, '✅ Auto Mode completed successfully! All tasks done.', 'success');
-        } else {
-            this.showStatus(this.loginStatus, '⚠️ Auto Mode completed but logout failed', 'warning');
+    resumeAutoJob() {
+        // Pick up a run started before the page was closed or reloaded
+        const jobId = localStorage.getItem('teveclub_auto_job');
+        if (jobId) {
+            this.followAutoJob(jobId);
         }
     }
 
@@ -610,9 +727,8 @@ class TeveclubUI {
             this.showStatus(this.loginStatus, '✅ Login successful!', 'success');
             this.welcomeText.textContent = `Welcome, ${username}! 🐪`;
             
-            // Fetch current food/drink and trick
-            this.updateCurrentFoodDrink();
-            this.updateCurrentTrick();
+            // Follow current food/drink and trick
+            this.startStateStream();
             
             setTimeout(() => {
                 this.loginPanel.style.display = 'none';
@@ -686,7 +802,7 @@ class TeveclubUI {
             // Update button icon immediately
             const foodIconElement = document.getElementById('food-icon');
             if (foodIconElement) {
-                foodIconElement.innerHTML = `<img src="/static/images/food/${foodIcon}" style="width: 30px; height: 30px; object-fit: contain;" alt="${foodName}">`;
+                foodIconElement.innerHTML = iconHTML('food', foodIcon, foodName);
             }
             
             this.updateMainStatus(`✅ Food set to: ${foodName}`, true);
@@ -710,7 +826,7 @@ class TeveclubUI {
             // Update button icon immediately
             const drinkIconElement = document.getElementById('drink-icon');
             if (drinkIconElement) {
-                drinkIconElement.innerHTML = `<img src="/static/images/drink/${drinkIcon}" style="width: 30px; height: 30px; object-fit: contain;" alt="${drinkName}">`;
+                drinkIconElement.innerHTML = iconHTML('drink', drinkIcon, drinkName);
             }
             
             this.updateMainStatus(`✅ Drink set to: ${drinkName}`, true);
@@ -725,47 +841,97 @@ class TeveclubUI {
         console.log('getCurrentFoodDrink result:', result);
         
         if (result.success && result.data) {
-            const { foodIcon, drinkIcon } = result.data;
-            
-            // Update food button icon
-            if (foodIcon) {
-                const foodIconElement = document.getElementById('food-icon');
-                console.log('Updating food icon to:', foodIcon);
-                if (foodIconElement) {
-                    const imgUrl = `/static/images/food/${foodIcon}`;
-                    foodIconElement.innerHTML = `<img src="${imgUrl}" style="width: 30px; height: 30px; vertical-align: middle; object-fit: contain;" alt="current food">`;
-                }
-            }
-            
-            // Update drink button icon
-            if (drinkIcon) {
-                const drinkIconElement = document.getElementById('drink-icon');
-                console.log('Updating drink icon to:', drinkIcon);
-                if (drinkIconElement) {
-                    const imgUrl = `/static/images/drink/${drinkIcon}`;
-                    drinkIconElement.innerHTML = `<img src="${imgUrl}" style="width: 30px; height: 30px; vertical-align: middle; object-fit: contain;" alt="current drink">`;
-                }
-            }
+            this.renderFoodDrink(result.data);
         } else {
             console.log('Failed to get current food/drink');
         }
     }
 
+    renderFoodDrink({ foodIcon, drinkIcon }) {
+        // Update food button icon
+        if (foodIcon) {
+            const foodIconElement = document.getElementById('food-icon');
+            console.log('Updating food icon to:', foodIcon);
+            if (foodIconElement) {
+                foodIconElement.innerHTML = iconHTML('food', foodIcon, 'current food');
+            }
+        }
+        
+        // Update drink button icon
+        if (drinkIcon) {
+            const drinkIconElement = document.getElementById('drink-icon');
+            console.log('Updating drink icon to:', drinkIcon);
+            if (drinkIconElement) {
+                drinkIconElement.innerHTML = iconHTML('drink', drinkIcon, 'current drink');
+            }
+        }
+    }
+
     async updateCurrentTrick() {
         console.log('Fetching current trick...');
         const result = await this.api.getCurrentTrick();
         console.log('getCurrentTrick result:', result);
         
-        if (result.success && result.trick) {
-            if (this.trickText) {
-                this.trickText.textContent = result.trick;
-                this.trickText.style.display = 'block';
-            }
+        this.renderTrick(result.success ? result.trick : null);
+    }
+
+    renderTrick(trick) {
+        if (!this.trickText) {
+            return;
+        }
+        if (trick) {
+            this.trickText.textContent = trick;
+            this.trickText.style.display = 'block';
         } else {
             console.log('Failed to get current trick');
-            if (this.trickText) {
-                this.trickText.style.display = 'none';
+            this.trickText.style.display = 'none';
+        }
+    }
+
+    startStateStream(attempt = 0) {
+        // Live food/drink/trick updates pushed by the server. The server
+        // polls once per account for all tabs; when it cannot take the
+        // stream, fetch once and retry the stream with backoff
+        this.stopStateStream();
+        if (!window.EventSource) {
+            this.updateCurrentFoodDrink();
+            this.updateCurrentTrick();
+            return;
+        }
+        
+        const source = new EventSource('/api/state/stream/');
+        source.addEventListener('open', () => {
+            attempt = 0;
+        });
+        source.addEventListener('state', (event) => {
+            const state = JSON.parse(event.data);
+            if ('foodIcon' in state || 'drinkIcon' in state) {
+                this.renderFoodDrink(state);
+            }
+            if ('trick' in state) {
+                this.renderTrick(state.trick);
+            }
+        });
+        source.onerror = () => {
+            if (source.readyState !== EventSource.CLOSED) {
+                return;  // EventSource is reconnecting by itself
             }
+            this.stateSource = null;
+            this.updateCurrentFoodDrink();
+            this.updateCurrentTrick();
+            if (attempt < STATE_STREAM_MAX_RETRIES) {
+                const delay = STATE_STREAM_RETRY_MS * 2 ** attempt;
+                this.stateStreamRetry = setTimeout(() => this.startStateStream(attempt + 1), delay);
+            }
+        };
+        this.stateSource = source;
+    }
+
+    stopStateStream() {
+        clearTimeout(this.stateStreamRetry);
+        if (this.stateSource) {
+            this.stateSource.close();
+            this.stateSource = null;
         }
     }
 
@@ -778,6 +944,7 @@ class TeveclubUI {
         this.setButtonLoading(this.logoutBtn, false);
 
         if (result.success) {
+            this.stopStateStream();
             this.updateMainStatus('✅ Logged out successfully', true);
             
             setTimeout(() => {
@@ -4,11 +4,16 @@ Django settings for teveclub_web project.
 
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Make the bot package (../src) importable for server-side jobs
+if str(BASE_DIR.parent) not in sys.path:
+    sys.path.append(str(BASE_DIR.parent))
+
 # Load environment variables
 load_dotenv(BASE_DIR / '.env')
 
@@ -34,6 +39,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'bot_api.middleware.MetricsMiddleware',
+    'bot_api.middleware.JsonCompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -103,11 +110,154 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache settings
+# File-based so every gunicorn worker sees the same entries
+CACHE_DIR = os.getenv('CACHE_DIR', str(BASE_DIR / 'cache'))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR,
+        'TIMEOUT': 60 * 60 * 24 * 14,  # Match SESSION_COOKIE_AGE
+    }
+}
+
 # Session settings
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# cached_db: reads come from the cache, the database is the persistent fallback
+# signed_cookies: no server-side storage at all, state lives in the browser cookie
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'cached_db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_BACKEND]
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = 'Lax'
 
+# Upstream (teveclub.hu) admission control. UPSTREAM_MAX_IN_FLIGHT and
+# UPSTREAM_MAX_IN_FLIGHT_PER_SESSION hold across all gunicorn workers through
+# lock files in ADMISSION_DIR (empty = counted per worker instead).
+# Keep UPSTREAM_MAX_IN_FLIGHT_PER_WORKER (upstream calls plus WSGI live
+# streams) below --threads so a thread is left to answer 429s.
+UPSTREAM_MAX_IN_FLIGHT = int(os.getenv('UPSTREAM_MAX_IN_FLIGHT', '9'))
+UPSTREAM_MAX_IN_FLIGHT_PER_SESSION = int(os.getenv('UPSTREAM_MAX_IN_FLIGHT_PER_SESSION', '2'))
+UPSTREAM_MAX_IN_FLIGHT_PER_WORKER = int(os.getenv('UPSTREAM_MAX_IN_FLIGHT_PER_WORKER', '3'))
+ADMISSION_DIR = os.getenv('ADMISSION_DIR', str(BASE_DIR / 'admission'))
+
+# Upstream scheduler, one per gunicorn worker process (3 workers = 3 x
+# UPSTREAM_SLOTS towards teveclub.hu; the admission limits and the gateway
+# rate limit are the host-wide caps): UPSTREAM_SLOTS requests in progress
+# at once, UPSTREAM_INTERACTIVE_RESERVED of them kept for the web UI;
+# contended slots are shared by weight, both lanes required, e.g.
+# "interactive=4,background=1"
+UPSTREAM_SLOTS = int(os.getenv('UPSTREAM_SLOTS', '4'))
+UPSTREAM_INTERACTIVE_RESERVED = int(os.getenv('UPSTREAM_INTERACTIVE_RESERVED', '2'))
+UPSTREAM_LANE_WEIGHTS = {
+    lane: float(weight)
+    for lane, weight in (
+        item.split('=') for item in
+        os.getenv('UPSTREAM_LANE_WEIGHTS', 'interactive=4,background=1').split(',')
+        if item
+    )
+}
+
+# TLS toward teveclub.hu: 'verify', 'fallback' (verify, but remember hosts
+# with a broken certificate chain and skip verification for them for
+# UPSTREAM_TLS_FALLBACK_TTL seconds) or 'insecure'
+UPSTREAM_TLS_POLICY = os.getenv('UPSTREAM_TLS_POLICY', 'fallback')
+UPSTREAM_TLS_FALLBACK_TTL = int(os.getenv('UPSTREAM_TLS_FALLBACK_TTL', '3600'))
+
+# Optional upstream gateway (python manage.py upstream_gateway)
+# When set, workers send teveclub.hu requests through this Unix socket
+UPSTREAM_GATEWAY_SOCKET = os.getenv('UPSTREAM_GATEWAY_SOCKET', '')
+GATEWAY_RATE_LIMIT = float(os.getenv('GATEWAY_RATE_LIMIT', '10'))
+GATEWAY_RATE_BURST = int(os.getenv('GATEWAY_RATE_BURST', '20'))
+GATEWAY_PAGE_CACHE_TTL = float(os.getenv('GATEWAY_PAGE_CACHE_TTL', '2'))
+GATEWAY_MAX_SESSIONS = int(os.getenv('GATEWAY_MAX_SESSIONS', '5000'))
+
+# Proxy POSTs carrying an Idempotency-Key are executed once per key;
+# duplicates within the TTL get the stored result, whichever gunicorn
+# worker they reach
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', '120'))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv('IDEMPOTENCY_MAX_KEYS', '1000'))
+CACHES['idempotency'] = {
+    'BACKEND': 'bot_api.idempotency.IdempotencyFileCache',
+    'LOCATION': os.path.join(CACHE_DIR, 'idempotency'),
+    'TIMEOUT': IDEMPOTENCY_TTL,
+    'OPTIONS': {'MAX_ENTRIES': IDEMPOTENCY_MAX_KEYS},
+}
+
+# Operator multi-account API: runs per gunicorn worker process (each has its
+# own pool, so 3 workers run up to 3 x FLEET_PARALLELISM accounts at once),
+# page sizes, and how long a queued/running account may look stuck before
+# it can be rerun
+FLEET_PARALLELISM = int(os.getenv('FLEET_PARALLELISM', '4'))
+FLEET_PAGE_SIZE = int(os.getenv('FLEET_PAGE_SIZE', '100'))
+FLEET_MAX_PAGE_SIZE = int(os.getenv('FLEET_MAX_PAGE_SIZE', '1000'))
+FLEET_STALE_AFTER = int(os.getenv('FLEET_STALE_AFTER', '3600'))
+
+# Fernet keys encrypting operator account passwords in the database, comma
+# separated: the first encrypts, all decrypt, so a new key can be put first
+# while old rows are still readable. Generate one with
+# python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"
+# Unset, a key is derived from SECRET_KEY, and changing SECRET_KEY then
+# makes the stored passwords unreadable.
+ACCOUNT_PASSWORD_KEYS = [key for key in os.getenv('ACCOUNT_PASSWORD_KEYS', '').split(',') if key]
+
+# Live state push (/api/state/stream/): one poller per browser session and worker,
+# backing off from PUSH_MIN_INTERVAL to PUSH_MAX_INTERVAL seconds while idle.
+# Under WSGI each stream holds a thread, so at most PUSH_MAX_WSGI_STREAMS
+# per worker, counted in UPSTREAM_MAX_IN_FLIGHT_PER_WORKER; serve
+# teveclub_web.asgi with an ASGI server to lift that.
+PUSH_MIN_INTERVAL = float(os.getenv('PUSH_MIN_INTERVAL', '5'))
+PUSH_MAX_INTERVAL = float(os.getenv('PUSH_MAX_INTERVAL', '60'))
+PUSH_MAX_STREAM_SECONDS = int(os.getenv('PUSH_MAX_STREAM_SECONDS', '300'))
+PUSH_MAX_WSGI_STREAMS = int(os.getenv('PUSH_MAX_WSGI_STREAMS', '1'))
+PUSH_RETRY_MS = int(os.getenv('PUSH_RETRY_MS', '3000'))
+
+# Background Auto Mode jobs, per gunicorn worker
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_MAX_PENDING = int(os.getenv('JOB_MAX_PENDING', '20'))
+JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', str(60 * 60 * 24)))
+
+# Logging: JSON lines written by a background thread (see bot_api/log.py)
+# LOG_SAMPLE_RATES keeps a fraction of chatty events, e.g. "proxy.request=0.1"
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_SAMPLE_RATES = {
+    event: float(rate)
+    for event, rate in (
+        item.split('=') for item in
+        os.getenv('LOG_SAMPLE_RATES', 'proxy.request=0.1,proxy.response=0.1').split(',')
+        if item
+    )
+}
+LOG_MAX_EVENTS_PER_SECOND = int(os.getenv('LOG_MAX_EVENTS_PER_SECOND', '20'))
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'queue': {
+            '()': 'bot_api.log.queue_handler',
+        },
+    },
+    'loggers': {
+        'bot_api': {
+            'handlers': ['queue'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
+
+# JSON API responses: 'auto' uses orjson when installed, else the stdlib
+JSON_ENCODER = os.getenv('JSON_ENCODER', 'auto')
+# Bodies smaller than this are not worth compressing
+JSON_COMPRESS_MIN_SIZE = int(os.getenv('JSON_COMPRESS_MIN_SIZE', '512'))
+
+# Metrics: each worker writes its snapshot here and /api/metrics/ merges them.
+# Empty = per-process metrics only. Clear the directory when the service starts.
+METRICS_DIR = os.getenv('METRICS_DIR', str(BASE_DIR / 'metrics'))
+
 # CSRF settings
 CSRF_COOKIE_HTTPONLY = False  # Allow JavaScript to read it
 CSRF_COOKIE_SAMESITE = 'Lax'
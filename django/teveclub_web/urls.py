@@ -3,10 +3,10 @@ URL configuration for teveclub_web project.
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.views.generic import TemplateView
+from bot_api import views as bot_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('bot_api.urls')),
-    path('', TemplateView.as_view(template_name='index.html'), name='home'),
+    path('', bot_views.index, name='home'),
 ]
@@ -141,6 +141,7 @@ Environment="PYTHONPATH=/home/ubuntu/teveclub/django"
 ExecStart=/home/ubuntu/teveclub/venv/bin/gunicorn teveclub_web.wsgi:application \
     --bind 0.0.0.0:8000 \
     --workers 3 \
+    --threads 4 \
     --timeout 60 \
     --access-logfile /home/ubuntu/teveclub/logs/access.log \
     --error-logfile /home/ubuntu/teveclub/logs/error.log \
@@ -2,32 +2,72 @@
 """
 Main entry point for Teveclub Bot
 Can run in either GUI mode or CLI mode
+The bot and the GUI are imported by the mode that needs them: CLI runs
+never load tkinter, and printing the usage loads neither. CLI runs go to
+the warm daemon (src/daemon.py) when one is listening.
 """
 import sys
-from src.bot_core import TeveClub
-from src.gui import run_gui
 
 
-def run_cli(username, password):
+def run_cli(username, password, action='run'):
     """
     Run the bot in command-line mode
+    Submits to the warm daemon when it is running, else runs in-process.
     
     Args:
         username (str): Teveclub username
         password (str): Teveclub password
+        action (str): 'run' (all tasks), 'login', 'feed', 'learn' or 'guess'
+    
+    Returns:
+        bool: True if the action succeeded
     """
+    from src.daemon import DaemonUnavailable, run_action, submit
+
     print(f"Starting Teveclub Bot for user: {username}")
+    try:
+        return submit(action, username, password)
+    except DaemonUnavailable:
+        pass
+
+    from src.bot_core import TeveClub
     teve = TeveClub(username, password)
-    teve.run_bot()
+    return run_action(teve, action)
+
+
+def run_daemon(path=None):
+    """
+    Run the warm bot daemon in the foreground
+    
+    Args:
+        path (str, optional): Unix socket path to listen on
+    """
+    from src.daemon import serve
+    serve(path)
+
+
+def run_gui():
+    """Run the bot in GUI mode"""
+    from src import startup
+    from src.gui import run_gui as start_gui
+    startup.mark("gui imported")
+    start_gui()
 
 
 def main():
     """Main function to determine run mode"""
-    if len(sys.argv) > 2:
+    from src.daemon import ACTIONS
+
+    if len(sys.argv) in (2, 3) and sys.argv[1] == '--daemon':
+        # Warm daemon serving CLI runs
+        run_daemon(sys.argv[2] if len(sys.argv) == 3 else None)
+    elif len(sys.argv) == 3 or (len(sys.argv) == 4 and sys.argv[3] in ACTIONS):
         # CLI mode with arguments
         username = str(sys.argv[1])
         password = str(sys.argv[2])
-        run_cli(username, password)
+        action = sys.argv[3] if len(sys.argv) == 4 else 'run'
+        if not run_cli(username, password, action):
+            sys.exit(1)
     elif len(sys.argv) == 2 and sys.argv[1] in ['--gui', '-g']:
         # Explicit GUI mode
         run_gui()
@@ -38,9 +78,9 @@ def main():
         print("Usage:")
         print("  GUI mode (default):  python main.py")
         print("  GUI mode (explicit): python main.py --gui")
-        print("  CLI mode:            python main.py <username> <password>")
+        print("  CLI mode:            python main.py <username> <password> [run|login|feed|learn|guess]")
+        print("  Warm daemon:         python main.py --daemon [socket path]")
         sys.exit(1)
 
-
 if __name__ == "__main__":
     main()
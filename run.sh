@@ -54,6 +54,7 @@ echo "Starting Gunicorn..."
 gunicorn teveclub_project.wsgi:application \
     --bind 0.0.0.0:8000 \
     --workers 3 \
+    --threads 4 \
     --timeout 60 \
     --access-logfile "$APP_DIR/logs/access.log" \
     --error-logfile "$APP_DIR/logs/error.log" \
@@ -40,6 +40,7 @@ if [ "$MODE" = "prod" ]; then
     gunicorn teveclub_project.wsgi:application \
         --bind 0.0.0.0:8000 \
         --workers 3 \
+        --threads 4 \
         --timeout 60 \
         --access-logfile ../logs/access.log \
         --error-logfile ../logs/error.log \
@@ -1,8 +1,18 @@
 """
 Teveclub Bot Package
 """
-from src.bot_core import TeveClub
-from src.gui import run_gui
 
 __version__ = "2.0.0"
 __all__ = ['TeveClub', 'run_gui']
+
+
+def __getattr__(name):
+    # Imported on first use so headless users (CLI, Django jobs) do not need
+    # tkinter, and the daemon client does not load requests at all
+    if name == 'TeveClub':
+        from src.bot_core import TeveClub
+        return TeveClub
+    if name == 'run_gui':
+        from src.gui import run_gui
+        return run_gui
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
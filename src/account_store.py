@@ -0,0 +1,356 @@
+"""
+Account store for large fleets
+One SQLite database (WAL mode, standard library only) holds every account:
+credentials, session cookies, the sticky user agent, food/drink preference
+and the result of the last run. It is indexed by username and by the time
+each account is next due. Runners stream accounts in batches instead of
+loading the whole fleet, and updates are written in one transaction per
+batch instead of rewriting a JSON file per save.
+
+    store = AccountStore('accounts.db')
+    store.import_json('credentials.json')
+    for account in store.iter_accounts(due_before=time.time()):
+        ...
+    store.update([(username, {'last_run': now, 'last_ok': True}), ...])
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Columns callers may change with update(); username is the key
+STATE_FIELDS = ('password', 'cookies', 'user_agent', 'food_id', 'drink_id',
+                'last_run', 'last_ok', 'last_error', 'next_due')
+
+# Rows read per round trip while streaming
+BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    username   TEXT PRIMARY KEY,
+    password   TEXT NOT NULL,
+    cookies    TEXT,
+    user_agent TEXT,
+    food_id    INTEGER,
+    drink_id   INTEGER,
+    last_run   REAL,
+    last_ok    INTEGER,
+    last_error TEXT,
+    next_due   REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS accounts_next_due ON accounts (next_due);
+"""
+
+_COLUMNS = ('username',) + STATE_FIELDS
+
+
+def _encode(field, value):
+    if field == 'cookies' and value is not None:
+        return json.dumps(value, separators=(',', ':'))
+    if field == 'last_ok' and value is not None:
+        return int(bool(value))
+    return value
+
+
+def _decode(row):
+    account = dict(zip(_COLUMNS, row))
+    if account['cookies']:
+        account['cookies'] = json.loads(account['cookies'])
+    if account['last_ok'] is not None:
+        account['last_ok'] = bool(account['last_ok'])
+    return account
+
+
+def session_state(teve, now=None):
+    """
+    Cookies and user agent of a TeveClub session, in the form the store keeps
+
+    Args:
+        teve (TeveClub): Bot whose session to save
+        now (float, optional): Current Unix time
+
+    Returns:
+        dict: {'cookies': [[name, value, domain, path, expires, secure,
+            http_only], ...], 'user_agent': str}; the rows of the web
+            proxy's session cookies, without the cookies that expired
+    """
+    now = time.time() if now is None else now
+    cookies = [[cookie.name, cookie.value, cookie.domain, cookie.path, cookie.expires,
+                int(cookie.secure), int(cookie.has_nonstandard_attr('HttpOnly'))]
+               for cookie in teve.session.cookies
+               if cookie.expires is None or cookie.expires > now]
+    return {'cookies': cookies, 'user_agent': teve.user_agent}
+
+
+def restore_session(teve, account, now=None):
+    """
+    Put saved cookies and the sticky user agent back on a TeveClub session
+
+    Args:
+        teve (TeveClub): Freshly created bot
+        account (dict): Stored account from AccountStore
+        now (float, optional): Current Unix time
+
+    Returns:
+        bool: True if any cookies were restored
+    """
+    if account.get('user_agent'):
+        teve.user_agent = account['user_agent']
+        teve.session.headers.update({"User-Agent": teve.user_agent})
+    now = time.time() if now is None else now
+    restored = False
+    for row in account.get('cookies') or []:
+        # Rows saved before expiry and flags were kept have only four fields
+        name, value, domain, path, expires, secure, http_only = (list(row) + [None, 0, 0])[:7]
+        if expires is not None and expires <= now:
+            continue
+        teve.session.cookies.set(name, value, domain=domain, path=path, expires=expires,
+                                 secure=bool(secure),
+                                 rest={'HttpOnly': None} if http_only else {})
+        restored = True
+    return restored
+
+
+class AccountStore:
+    """SQLite-backed account store, safe to share between threads"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Database file; created with its directory if missing
+        """
+        self.path = os.path.abspath(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                               isolation_level=None)
+        # WAL: readers (streaming runners) never block the writer or each other
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run several writes as one transaction; rolled back on error
+
+        Yields:
+            sqlite3.Connection: Connection to execute the writes on
+        """
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def count(self):
+        """Number of stored accounts"""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM accounts').fetchone()[0]
+
+    def get(self, username):
+        """
+        Look up one account
+
+        Returns:
+            dict or None: The account, None if it is not stored
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT {", ".join(_COLUMNS)} FROM accounts WHERE username = ?',
+                (username,)).fetchone()
+        return _decode(row) if row else None
+
+    def iter_accounts(self, due_before=None, batch_size=BATCH_SIZE):
+        """
+        Stream accounts without loading them all into memory
+
+        Reads in keyset-paginated batches, each one short query of its own,
+        so no read transaction stays open while the caller works through
+        the accounts and WAL checkpoints can complete. Accounts written
+        meanwhile may show their new values; one whose next_due moves past
+        `due_before` is not yielded again.
+
+        Args:
+            due_before (float, optional): Only accounts whose next_due is at
+                or before this time.time() value, soonest first; all
+                accounts in insertion order if omitted
+            batch_size (int): Rows fetched per query
+
+        Yields:
+            dict: One account at a time
+        """
+        columns = ', '.join(_COLUMNS)
+        if due_before is None:
+            query = (f'SELECT {columns}, rowid FROM accounts WHERE rowid > ? '
+                     'ORDER BY rowid LIMIT ?')
+        else:
+            query = (f'SELECT {columns}, rowid FROM accounts '
+                     'WHERE next_due <= ? AND (next_due, rowid) > (?, ?) '
+                     'ORDER BY next_due, rowid LIMIT ?')
+        last_due, last_rowid = float('-inf'), 0
+        while True:
+            if due_before is None:
+                params = (last_rowid, batch_size)
+            else:
+                params = (due_before, last_due, last_rowid, batch_size)
+            with self._lock:
+                rows = self._conn.execute(query, params).fetchall()
+            for row in rows:
+                yield _decode(row[:-1])
+            if len(rows) < batch_size:
+                return
+            last_due, last_rowid = rows[-1][_COLUMNS.index('next_due')], rows[-1][-1]
+
+    def upsert(self, accounts):
+        """
+        Add accounts or change their password, in one transaction
+
+        Stored session state is kept unless the password changed.
+
+        Args:
+            accounts (iterable): {'username', 'password'} dicts, optionally
+                with 'food_id' and 'drink_id'
+
+        Returns:
+            int: Accounts written
+        """
+        rows = ((a['username'], a['password'], a.get('food_id'), a.get('drink_id'))
+                for a in accounts)
+        with self.transaction() as conn:
+            cursor = conn.executemany("""
+                INSERT INTO accounts (username, password, food_id, drink_id)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (username) DO UPDATE SET
+                    cookies = CASE WHEN password = excluded.password THEN cookies END,
+                    password = excluded.password,
+                    food_id = COALESCE(excluded.food_id, food_id),
+                    drink_id = COALESCE(excluded.drink_id, drink_id)
+            """, rows)
+            return cursor.rowcount
+
+    def update(self, updates):
+        """
+        Change stored fields of many accounts in one transaction
+
+        Args:
+            updates (iterable): (username, {field: value}) pairs; fields from
+                STATE_FIELDS. Unknown usernames are ignored.
+
+        Returns:
+            int: Accounts changed
+
+        Raises:
+            ValueError: A field is not in STATE_FIELDS
+        """
+        changed = 0
+        with self.transaction() as conn:
+            for username, fields in updates:
+                unknown = set(fields) - set(STATE_FIELDS)
+                if unknown:
+                    raise ValueError(f"Unknown account fields: {', '.join(sorted(unknown))}")
+                if not fields:
+                    continue
+                assignments = ', '.join(f'{field} = ?' for field in fields)
+                values = [_encode(field, value) for field, value in fields.items()]
+                changed += conn.execute(
+                    f'UPDATE accounts SET {assignments} WHERE username = ?',
+                    values + [username]).rowcount
+        return changed
+
+    def record_run(self, username, ok, interval, error=None, state=None):
+        """
+        Store the result of a run and when the account is next due
+
+        Args:
+            username (str): Account that ran
+            ok (bool): Whether the run succeeded
+            interval (float): Seconds until the account is due again
+            error (str, optional): Why the run failed
+            state (dict, optional): session_state() of the bot after the run
+        """
+        now = time.time()
+        fields = {'last_run': now, 'last_ok': ok, 'last_error': error,
+                  'next_due': now + interval}
+        fields.update(state or {})
+        self.update([(username, fields)])
+
+    def remove(self, usernames):
+        """
+        Delete accounts
+
+        Returns:
+            int: Accounts deleted
+        """
+        with self.transaction() as conn:
+            return conn.executemany('DELETE FROM accounts WHERE username = ?',
+                                    ((username,) for username in usernames)).rowcount
+
+    def import_json(self, path):
+        """
+        Import credentials.json (one account) or an exported account list
+
+        Args:
+            path (str): JSON file with {'username', 'password'} or a list of them
+
+        Returns:
+            int: Accounts imported, 0 if the file is missing or unreadable
+        """
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return 0
+        if isinstance(data, dict):
+            data = [data]
+        if not isinstance(data, list):
+            return 0
+        accounts = [entry for entry in data
+                    if isinstance(entry, dict) and entry.get('username') and entry.get('password')]
+        return self.upsert(accounts) if accounts else 0
+
+    def export_json(self, path):
+        """
+        Write every account, with its state, as a JSON list
+
+        Streams rows to a temp file then replaces `path`, so a crash never
+        leaves a truncated export.
+
+        Returns:
+            int: Accounts exported
+        """
+        tmp_path = os.path.abspath(path) + '.tmp'
+        exported = 0
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('[')
+            for account in self.iter_accounts():
+                f.write(',\n  ' if exported else '\n  ')
+                json.dump(account, f, ensure_ascii=False)
+                exported += 1
+            f.write('\n]\n')
+        os.replace(tmp_path, path)
+        return exported
@@ -1,29 +1,50 @@
 """
 Teveclub Bot Core Module
 Contains the main bot class with all game actions
+BeautifulSoup and lxml are imported where a page is parsed, so importing
+this module (CLI start, Django jobs) stays cheap.
 """
 import requests
-from bs4 import BeautifulSoup
 import random
 import time
 import re
-from lxml import html as lxml_html
-from src.config import LOGIN_URL, MYTEVE_URL, TANIT_URL, TIPP_URL, SETFOOD_URL, SETDRINK_URL
+from src.page import Page
+from src.scheduler import ScheduledSession
+from src.config import (LOGIN_URL, MYTEVE_URL, TANIT_URL, TIPP_URL, SETFOOD_URL, SETDRINK_URL,
+                        FREE_FOOD, FREE_DRINK)
 from src.utils import get_user_agent, do_sleep
 
 
+# Shown on myteve.pet only to a logged-in user
+LOGGED_IN_MARKER = 'Teve Legyen Veled!'
+
+# Daily actions, in the order run_bot performs them
+BOT_ACTIONS = ('feed', 'learn', 'guess')
+
+_ACTION_ERRORS = {
+    'feed': "Feeding failed!!!",
+    'learn': "Learning failed!!!",
+    'guess': "Guess Game failed!!",
+}
+
+
 class TeveClub:
     """Main bot class for interacting with Teveclub website"""
     
-    def __init__(self, username, password):
+    def __init__(self, username, password, scheduler=None):
         """
         Initialize the TeveClub bot
         
         Args:
             username (str): User's teveclub username
             password (str): User's teveclub password
+            scheduler (UpstreamScheduler, optional): Queue every request in
+                its background lane, behind interactive traffic
         """
-        self.session = requests.Session()
+        if scheduler is not None:
+            self.session = ScheduledSession(scheduler)
+        else:
+            self.session = requests.Session()
         self.username = username
         self.password = password
         self.user_agent = None
@@ -44,7 +65,9 @@ class TeveClub:
         Returns:
             bool: True if login successful, False otherwise
         """
-        self.user_agent = get_user_agent()
+        # Sticky: a restored or earlier user agent is kept across logins
+        if not self.user_agent:
+            self.user_agent = get_user_agent()
         self.session.headers.update({"User-Agent": self.user_agent})
         
         data = {
@@ -58,14 +81,23 @@ class TeveClub:
         r = self.session.post(LOGIN_URL, data=data)
         do_sleep()
         
-        r = self.session.get(MYTEVE_URL)
+        page = Page(self.session.get(MYTEVE_URL))
         do_sleep()
         
-        login_success = 'Teve Legyen Veled!' in r.text
+        login_success = LOGGED_IN_MARKER in page
         if login_success:
             print('Login success!!')
         
         return login_success
+
+    def is_logged_in(self):
+        """
+        Check whether the session is still logged in, without logging in
+        
+        Returns:
+            bool: True if myteve.pet shows the logged-in page
+        """
+        return LOGGED_IN_MARKER in Page(self.session.get(MYTEVE_URL))
         
     def learn(self):
         """
@@ -77,16 +109,17 @@ class TeveClub:
         self.session.get(MYTEVE_URL)
         do_sleep()
         
-        r = self.session.get(TANIT_URL)
+        page = Page(self.session.get(TANIT_URL))
         do_sleep()
         
-        if 'Nincs több olyan trükk, amit a tevéd meg tud tanulni!' in r.text:
+        if 'Nincs több olyan trükk, amit a tevéd meg tud tanulni!' in page:
             print('No new trick to learn!!!')
             return False
         
-        if 'Válaszd ki, hogy mit tanuljon a tevéd:' in r.text:
+        if 'Válaszd ki, hogy mit tanuljon a tevéd:' in page:
             print('There is to learn!')
-            soup = BeautifulSoup(r.text, "html.parser")
+            from bs4 import BeautifulSoup
+            soup = BeautifulSoup(page.text, "html.parser")
             
             # Get available learning options
             options = {}
@@ -123,27 +156,24 @@ class TeveClub:
         Returns:
             bool: True if feeding successful, False otherwise
         """
-        r = self.session.get(MYTEVE_URL)
+        page = Page(self.session.get(MYTEVE_URL))
         do_sleep()
         
         # Check if feeding button is available
-        if 'Mehet!' not in r.text:
+        if 'Mehet!' not in page:
             print('Pet does not need feeding right now!')
             return False
         
-        # Parse the page to check current food/water levels
-        soup = BeautifulSoup(r.text, "html.parser")
-        
         # Feed until the pet is satisfied or max attempts reached
         feed_count = 0
         max_attempts = 10
         
         while feed_count < max_attempts:
             # Check if we can still feed
-            r = self.session.get(MYTEVE_URL)
+            page = Page(self.session.get(MYTEVE_URL))
             do_sleep()
             
-            if 'Mehet!' not in r.text:
+            if 'Mehet!' not in page:
                 print(f'Pet is full after {feed_count} feeding(s)!')
                 break
             
@@ -153,12 +183,12 @@ class TeveClub:
                 'pia': '1',
                 'etet': 'Mehet!',
             }
-            r = self.session.post(MYTEVE_URL, data=data)
+            page = Page(self.session.post(MYTEVE_URL, data=data))
             feed_count += 1
             do_sleep()
             
             # Check response for success
-            if 'elég jóllakott' in r.text or 'tele a hasa' in r.text:
+            if 'elég jóllakott' in page or 'tele a hasa' in page:
                 print(f'Pet is satisfied after {feed_count} feeding(s)!')
                 break
         
@@ -177,38 +207,82 @@ class TeveClub:
         do_sleep()
         return True
 
-    def run_bot(self):
+    def run_bot(self, progress=None, login=True, food_id=None, drink_id=None):
         """
         Run all bot actions in sequence
         
+        Args:
+            progress (callable, optional): Called with the step name
+                ('login', 'feed', 'learn', 'guess') as each step starts
+            login (bool): Log in first; False if the session already is
+            food_id (int, optional): Food to keep set, from FREE_FOOD
+            drink_id (int, optional): Drink to keep set, from FREE_DRINK
+        
         Returns:
             bool: True if bot ran successfully, False otherwise
         """
-        if not self.login():
-            print("Login failed!!!")
-            return False
+        if login:
+            if progress:
+                progress('login')
+            if not self.login():
+                print("Login failed!!!")
+                return False
         
-        # Feed the pet
-        try:
-            self.feed()
-        except Exception as e:
-            print(f"Feeding failed!!! Error: {e}")
-        
-        # Learn tricks
-        try:
-            self.learn()
-        except Exception as e:
-            print(f"Learning failed!!! Error: {e}")
-        
-        # Play guess game
-        try:
-            self.guess()
-        except Exception as e:
-            print(f"Guess Game failed!! Error: {e}")
+        self.ensure_state(food_id, drink_id, actions=BOT_ACTIONS, progress=progress)
         
         time.sleep(3)
         return True
 
+    def ensure_state(self, food_id=None, drink_id=None, actions=(), progress=None):
+        """
+        Bring the camel to the desired state with as few requests as possible
+        Food and drink are only set when myteve.pet shows something else, so
+        repeat runs with the same preferences send no preference writes.
+        
+        Args:
+            food_id (int, optional): Desired food, from FREE_FOOD
+            drink_id (int, optional): Desired drink, from FREE_DRINK
+            actions (iterable): Any of BOT_ACTIONS, performed in that order
+                after the preferences
+            progress (callable, optional): Called with each action's name as
+                it starts
+        
+        Returns:
+            dict: {'food_set': bool, 'drink_set': bool, 'done': [actions
+                that did something]}; an action that had nothing to do,
+                e.g. feed() on a full camel, is not listed
+        
+        Raises:
+            ValueError: Unknown food, drink or action
+        """
+        if food_id is not None and food_id not in dict(FREE_FOOD):
+            raise ValueError(f"Unknown food id {food_id!r}")
+        if drink_id is not None and drink_id not in dict(FREE_DRINK):
+            raise ValueError(f"Unknown drink id {drink_id!r}")
+        unknown = set(actions) - set(BOT_ACTIONS)
+        if unknown:
+            raise ValueError(f"Unknown actions: {', '.join(sorted(unknown))}")
+        
+        result = {'food_set': False, 'drink_set': False, 'done': []}
+        if food_id is not None or drink_id is not None:
+            current = self.get_current_food_drink() or {}
+            if food_id is not None and current.get('food_id') != food_id:
+                result['food_set'] = self.set_food(food_id)
+            if drink_id is not None and current.get('drink_id') != drink_id:
+                result['drink_set'] = self.set_drink(drink_id)
+        
+        for action in BOT_ACTIONS:
+            if action not in actions:
+                continue
+            if progress:
+                progress(action)
+            try:
+                if getattr(self, action)():
+                    result['done'].append(action)
+            except Exception as e:
+                print(f"{_ACTION_ERRORS[action]} Error: {e}")
+        return result
+
     def set_food(self, food_id):
         """
         Set the food preference for the pet
@@ -257,23 +331,9 @@ class TeveClub:
             dict: {'food_id': int, 'drink_id': int} or None if failed
         """
         try:
-            r = self.session.get(MYTEVE_URL)
+            page = Page(self.session.get(MYTEVE_URL))
             do_sleep()
-            html = r.text
-            
-            result = {'food_id': None, 'drink_id': None}
-            
-            # Look for food image
-            food_match = re.search(r'Etet[\u0151o].*?/(\d+)\.gif', html, re.IGNORECASE | re.DOTALL)
-            if food_match:
-                result['food_id'] = int(food_match.group(1))
-            
-            # Look for drink image
-            drink_match = re.search(r'Itat[\u00f3o].*?/(\d+)\.gif', html, re.IGNORECASE | re.DOTALL)
-            if drink_match:
-                result['drink_id'] = int(drink_match.group(1))
-            
-            return result
+            return _parse_food_drink(page.text)
         except Exception as e:
             print(f'Get current food/drink failed: {e}')
             return None
@@ -286,39 +346,92 @@ class TeveClub:
             str: Trick text or None if failed
         """
         try:
-            r = self.session.get(MYTEVE_URL)
+            page = Page(self.session.get(MYTEVE_URL))
             do_sleep()
-            
-            # Parse with lxml
-            tree = lxml_html.fromstring(r.content)
-            
-            # Try XPath
-            trick_elements = tree.xpath('/html/body/center/table/tbody/tr[1]/td[2]/center/table[3]/tbody/tr/td/table/tbody/tr[3]/td[2]/div[1]')
-            
-            if not trick_elements:
-                trick_elements = tree.xpath('/html/body/center/table/tr[1]/td[2]/center/table[3]/tr/td/table/tr[3]/td[2]/div[1]')
-            
-            if trick_elements:
-                div_element = trick_elements[0]
-                text_parts = []
-                
-                # Get text before <br>
-                if div_element.text:
-                    text_parts.append(div_element.text)
-                
-                for child in div_element:
-                    if child.tag == 'br':
-                        break
-                    if child.text:
-                        text_parts.append(child.text)
-                    if child.tail:
-                        text_parts.append(child.tail)
-                
-                trick_text = ''.join(text_parts).strip()
-                return trick_text
-            
-            return None
+            return _parse_trick(page)
         except Exception as e:
             print(f'Get current trick failed: {e}')
             return None
-        return True
+
+    def get_current_state(self):
+        """
+        Get current food, drink and trick with a single myteve.pet request
+        
+        Returns:
+            dict: {'food_id': int, 'drink_id': int, 'trick': str} or None
+                if failed
+        """
+        try:
+            page = Page(self.session.get(MYTEVE_URL))
+            do_sleep()
+            state = _parse_food_drink(page.text)
+            state['trick'] = _parse_trick(page)
+            return state
+        except Exception as e:
+            print(f'Get current state failed: {e}')
+            return None
+
+
+def _parse_food_drink(html):
+    """
+    Extract the current food and drink ids from a myteve.pet page
+    
+    Args:
+        html (str): Page text
+    
+    Returns:
+        dict: {'food_id': int, 'drink_id': int}, None where not found
+    """
+    result = {'food_id': None, 'drink_id': None}
+    
+    # Look for food image
+    food_match = re.search(r'Etet[\u0151o].*?/(\d+)\.gif', html, re.IGNORECASE | re.DOTALL)
+    if food_match:
+        result['food_id'] = int(food_match.group(1))
+    
+    # Look for drink image
+    drink_match = re.search(r'Itat[\u00f3o].*?/(\d+)\.gif', html, re.IGNORECASE | re.DOTALL)
+    if drink_match:
+        result['drink_id'] = int(drink_match.group(1))
+    
+    return result
+
+
+def _parse_trick(page):
+    """
+    Extract the current trick text from a myteve.pet page
+    
+    Args:
+        page (Page): myteve.pet response
+    
+    Returns:
+        str: Trick text or None if not found
+    """
+    tree = page.tree()
+
+    # Try XPath
+    trick_elements = tree.xpath('/html/body/center/table/tbody/tr[1]/td[2]/center/table[3]/tbody/tr/td/table/tbody/tr[3]/td[2]/div[1]')
+
+    if not trick_elements:
+        trick_elements = tree.xpath('/html/body/center/table/tr[1]/td[2]/center/table[3]/tr/td/table/tr[3]/td[2]/div[1]')
+
+    if trick_elements:
+        div_element = trick_elements[0]
+        text_parts = []
+
+        # Get text before <br>
+        if div_element.text:
+            text_parts.append(div_element.text)
+
+        for child in div_element:
+            if child.tag == 'br':
+                break
+            if child.text:
+                text_parts.append(child.text)
+            if child.tail:
+                text_parts.append(child.tail)
+
+        trick_text = ''.join(text_parts).strip()
+        return trick_text
+
+    return None
@@ -13,6 +13,8 @@ SETDRINK_URL = "https://teveclub.hu/setdrink.pet"
 
 # File paths
 CREDENTIALS_FILE = "credentials.json"
+ACCOUNTS_FILE = "accounts.json"  # Legacy account list, imported into ACCOUNTS_DB
+ACCOUNTS_DB = "accounts.db"
 USER_AGENTS_FILE = "user_agents.json"
 ICON_FILE = "icon.ico"
 
@@ -21,12 +23,21 @@ DEFAULT_USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:137.0) Gecko/20100101 Firefox/137.0",
 ]
 
+# teveclub.hu pages are Hungarian Latin-2. Used whenever a response does not
+# name its charset, instead of requests' guess (ISO-8859-1 for text/html,
+# slow character detection otherwise)
+PAGE_ENCODING = "iso-8859-2"
+
 # Bot settings
 MAX_FEED_ATTEMPTS = 10
 SLEEP_MIN = 0.0
 SLEEP_MAX = 1.0
 SLEEP_LAMBDA = 0.6
 
+# Multi-account panel
+ACCOUNT_WORKERS = 8             # Accounts refreshed/run at the same time
+ACCOUNT_REFRESH_INTERVAL = 300  # Seconds between background refreshes
+
 # Free food items (id, name)
 FREE_FOOD = [
     (0, "széna"),
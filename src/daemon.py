@@ -0,0 +1,355 @@
+"""
+Warm bot daemon for the command line
+A long-running process keeps logged-in TeveClub sessions and one pool of
+keep-alive connections, and serves "run account X" style requests over a
+Unix socket. `python main.py user pass` submits to it when it is running,
+so a repeated run costs only its teveclub.hu requests; otherwise the CLI
+runs the bot in-process as before.
+
+Requests and replies are JSON lines. The client sends
+    {"action": "run", "username": ..., "password": ...}
+and receives {"event": "output", "text": ...} for every line the bot
+prints, then {"event": "result", "ok": ..., "seconds": ...}.
+
+Start it with:  python main.py --daemon [socket path]
+"""
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+ACTIONS = ('run', 'login', 'feed', 'learn', 'guess')
+
+# Logged-in accounts kept warm before the least recently used is dropped
+MAX_ACCOUNTS = 100
+
+# Seconds the client waits for the next line of a run
+CLIENT_TIMEOUT = 600
+
+
+def default_socket_path():
+    """
+    Socket path from TEVECLUB_DAEMON_SOCKET, else one in $XDG_RUNTIME_DIR,
+    else one in a per-user directory under the temp dir (created 0700 by
+    the daemon)
+    """
+    if os.environ.get('TEVECLUB_DAEMON_SOCKET'):
+        return os.environ['TEVECLUB_DAEMON_SOCKET']
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return os.path.join(os.environ['XDG_RUNTIME_DIR'], 'teveclub-bot.sock')
+    uid = os.getuid() if hasattr(os, 'getuid') else 0
+    return os.path.join(tempfile.gettempdir(), f'teveclub-bot-{uid}', 'daemon.sock')
+
+
+class DaemonUnavailable(Exception):
+    """No daemon is listening; the caller runs the bot in-process instead"""
+
+
+def _check_directory(directory):
+    """
+    Make sure nobody else can create or swap sockets in `directory`
+
+    Raises:
+        PermissionError: The directory belongs to another user or is
+            writable by group or others
+    """
+    info = os.stat(directory)
+    if info.st_uid not in (os.getuid(), 0):
+        raise PermissionError(f'{directory} belongs to another user')
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f'{directory} is writable by other users')
+
+
+def _check_socket(path):
+    """
+    Make sure a socket was created by this user before sending it passwords
+
+    Raises:
+        DaemonUnavailable: The socket is missing, belongs to another user, or
+            lives in a directory others could plant it in
+    """
+    try:
+        if os.stat(path).st_uid != os.getuid():
+            raise DaemonUnavailable(f'{path} belongs to another user')
+        _check_directory(os.path.dirname(os.path.abspath(path)))
+    except OSError as e:
+        raise DaemonUnavailable(str(e)) from e
+
+
+def _connect(path):
+    if not hasattr(socket, 'AF_UNIX'):
+        raise DaemonUnavailable('Unix sockets are not supported on this platform')
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError as e:
+        sock.close()
+        raise DaemonUnavailable(str(e)) from e
+    return sock
+
+
+def submit(action, username, password, path=None, output=None):
+    """
+    Run an action in the daemon, streaming the bot's output
+
+    Args:
+        action (str): One of ACTIONS
+        username (str): Teveclub username
+        password (str): Teveclub password
+        path (str, optional): Daemon socket; default_socket_path() if omitted
+        output (file, optional): Where the bot's output goes; stdout if omitted
+
+    Returns:
+        bool: True if the action succeeded
+
+    Raises:
+        DaemonUnavailable: No daemon is listening on the socket
+    """
+    output = output or sys.stdout
+    path = path or default_socket_path()
+    if not hasattr(socket, 'AF_UNIX'):
+        raise DaemonUnavailable('Unix sockets are not supported on this platform')
+    _check_socket(path)
+    sock = _connect(path)
+    sock.settimeout(CLIENT_TIMEOUT)
+    with sock, sock.makefile('rw', encoding='utf-8', newline='\n') as stream:
+        stream.write(json.dumps({'action': action, 'username': username,
+                                 'password': password}) + '\n')
+        stream.flush()
+        for line in stream:
+            event = json.loads(line)
+            if event['event'] == 'output':
+                output.write(event['text'])
+                output.flush()
+            elif event['event'] == 'result':
+                return event['ok']
+            elif event['event'] == 'error':
+                output.write(f"Daemon error: {event['message']}\n")
+                return False
+    output.write('Daemon closed the connection\n')
+    return False
+
+
+def run_action(teve, action, login=True):
+    """
+    Run one CLI action on a TeveClub instance
+
+    Args:
+        teve (TeveClub): Bot to run the action with
+        action (str): One of ACTIONS
+        login (bool): Log in first; False if the session already is
+
+    Returns:
+        bool: True if the action succeeded
+    """
+    if action == 'run':
+        return teve.run_bot(login=login)
+    if login and not teve.login():
+        print("Login failed!!!")
+        return False
+    if action != 'login':
+        getattr(teve, action)()
+    return True
+
+
+class _ThreadOutput(io.TextIOBase):
+    """sys.stdout replacement sending each handler thread's prints to its client"""
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self._local = threading.local()
+
+    def capture(self, sink):
+        """Route the calling thread's output to sink(text); None to stop"""
+        self._local.sink = sink
+
+    def write(self, text):
+        sink = getattr(self._local, 'sink', None)
+        if sink is None:
+            return self.fallback.write(text)
+        sink(text)
+        return len(text)
+
+    def flush(self):
+        self.fallback.flush()
+
+
+class _Account:
+    """A warm TeveClub session and the lock serializing its runs"""
+
+    def __init__(self, teve):
+        self.teve = teve
+        self.lock = threading.Lock()
+        self.logged_in = False
+
+
+class BotDaemon:
+    """Keeps TeveClub sessions warm and runs actions on them"""
+
+    def __init__(self, max_accounts=MAX_ACCOUNTS):
+        """
+        Args:
+            max_accounts (int): Sessions kept before evicting the oldest
+        """
+        # Imported here so the thin client never loads requests or the bot
+        from requests.adapters import HTTPAdapter
+        from src.bot_core import TeveClub
+
+        self._teveclub = TeveClub
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+        self.max_accounts = max_accounts
+        self._accounts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _account(self, username, password):
+        """Get the warm session for an account, creating it on first use"""
+        with self._lock:
+            account = self._accounts.get(username)
+            if account is not None:
+                # Kept even when the password differs: a run may hold it,
+                # and handle() logs in again under its lock
+                self._accounts.move_to_end(username)
+                return account
+            teve = self._teveclub(username, password)
+            teve.session.mount('https://', self.adapter)
+            teve.session.mount('http://', self.adapter)
+            account = self._accounts[username] = _Account(teve)
+            self._accounts.move_to_end(username)
+            while len(self._accounts) > self.max_accounts:
+                self._accounts.popitem(last=False)
+            return account
+
+    def handle(self, request):
+        """
+        Run one client request on the calling thread
+
+        Args:
+            request (dict): {action, username, password}
+
+        Returns:
+            bool: True if the action succeeded
+        """
+        if request.get('action') not in ACTIONS:
+            raise ValueError(f"Unknown action {request.get('action')!r}")
+        account = self._account(request['username'], request['password'])
+        with account.lock:
+            teve = account.teve
+            if teve.password != request['password']:
+                # A different password must log in again, not reuse the session
+                teve.password = request['password']
+                account.logged_in = False
+            warm = account.logged_in and teve.is_logged_in()
+            if warm:
+                print(f"Reusing session for user: {teve.username}")
+            ok = run_action(teve, request['action'], login=not warm)
+            # Every action but a failed login leaves the session logged in
+            account.logged_in = ok or warm
+            return ok
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _send(self, event):
+        if self.gone:
+            return
+        try:
+            self.wfile.write((json.dumps(event) + '\n').encode('utf-8'))
+            self.wfile.flush()
+        except OSError:
+            # Client went away; finish the run anyway so the session stays valid
+            self.gone = True
+
+    def _output(self, text):
+        self.buffer += text
+        lines, _, self.buffer = self.buffer.rpartition('\n')
+        if lines:
+            self._send({'event': 'output', 'text': lines + '\n'})
+
+    def handle(self):
+        self.gone = False
+        self.buffer = ''
+        line = self.rfile.readline()
+        if not line:
+            return
+        stdout = self.server.stdout
+        stdout.capture(self._output)
+        start = time.monotonic()
+        try:
+            ok = self.server.bot.handle(json.loads(line))
+        except Exception as e:
+            stdout.capture(None)
+            self._send({'event': 'error', 'message': f'{type(e).__name__}: {e}'})
+            return
+        stdout.capture(None)
+        if self.buffer:
+            self._send({'event': 'output', 'text': self.buffer})
+        self._send({'event': 'result', 'ok': bool(ok),
+                    'seconds': round(time.monotonic() - start, 3)})
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded Unix socket server in front of a BotDaemon"""
+
+    daemon_threads = True
+
+    def __init__(self, path, bot):
+        """
+        Args:
+            path (str): Unix socket path to listen on (replaced if stale)
+            bot (BotDaemon): Runs the requests
+
+        Raises:
+            RuntimeError: Another daemon is already listening on `path`, or
+                its directory is not private to this user
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        try:
+            _check_directory(directory)
+        except PermissionError as e:
+            # Clients refuse such a socket, so do not listen on it either
+            raise RuntimeError(f'Unsafe daemon socket directory: {e}') from e
+        if os.path.exists(path):
+            try:
+                _connect(path).close()
+            except DaemonUnavailable:
+                os.unlink(path)
+            else:
+                raise RuntimeError(f'A daemon is already listening on {path}')
+        self.bot = bot
+        self.stdout = _ThreadOutput(sys.stdout)
+        # Requests carry passwords: the socket is created owner-only
+        umask = os.umask(0o177)
+        try:
+            super().__init__(path, _Handler)
+        finally:
+            os.umask(umask)
+
+
+def serve(path=None):
+    """
+    Run the daemon in the foreground until interrupted
+
+    Args:
+        path (str, optional): Socket path; default_socket_path() if omitted
+    """
+    path = path or default_socket_path()
+    server = DaemonServer(path, BotDaemon())
+    sys.stdout = server.stdout
+    print(f"Teveclub daemon listening on {path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stdout = server.stdout.fallback
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
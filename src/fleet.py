@@ -0,0 +1,195 @@
+"""
+Batch runner for large account fleets
+Between runs an account is only an AccountState: a __slots__ record of what
+the next run needs (credentials, saved cookies, user agent, preferences and
+schedule). A TeveClub bot with its requests.Session exists only while the
+account is running; its cookies are written back to the record afterwards,
+so the next run can reuse the session without logging in again.
+
+    store = AccountStore('accounts.db')
+    FleetRunner(store).run_due()
+"""
+import sys
+import time
+
+from src.account_store import BATCH_SIZE, restore_session, session_state
+from src.config import ACCOUNT_WORKERS
+
+
+# Seconds between runs of one account
+RUN_INTERVAL = 24 * 60 * 60
+
+
+def _compact_cookies(cookies):
+    """Saved cookies as tuples, sharing the strings every account repeats"""
+    if not cookies:
+        return None
+    return tuple((sys.intern(name), value, sys.intern(domain), sys.intern(path), *rest)
+                 for name, value, domain, path, *rest in cookies)
+
+
+class AccountState:
+    """Everything a runner keeps about an idle account"""
+
+    __slots__ = ('username', 'password', 'cookies', 'user_agent', 'food_id', 'drink_id',
+                 'last_run', 'last_ok', 'next_due')
+
+    def __init__(self, username, password, cookies=None, user_agent=None, food_id=None,
+                 drink_id=None, last_run=None, last_ok=None, next_due=0.0):
+        self.username = username
+        self.password = password
+        self.cookies = _compact_cookies(cookies)
+        # Most accounts share a handful of user agents: keep one copy of each
+        self.user_agent = sys.intern(user_agent) if user_agent else None
+        self.food_id = food_id
+        self.drink_id = drink_id
+        self.last_run = last_run
+        self.last_ok = last_ok
+        self.next_due = next_due
+
+    @classmethod
+    def from_record(cls, record):
+        """
+        Build the state from an AccountStore row
+
+        Args:
+            record (dict): Account from AccountStore.iter_accounts() or get()
+        """
+        return cls(record['username'], record['password'], record['cookies'],
+                   record['user_agent'], record['food_id'], record['drink_id'],
+                   record['last_run'], record['last_ok'], record['next_due'])
+
+    def bot(self, scheduler=None):
+        """
+        Create a TeveClub bot for this account, with its saved session
+
+        Args:
+            scheduler (UpstreamScheduler, optional): Passed on to TeveClub
+
+        Returns:
+            tuple: (TeveClub, bool: True if saved cookies were restored)
+        """
+        from src.bot_core import TeveClub
+
+        teve = TeveClub(self.username, self.password, scheduler=scheduler)
+        restored = restore_session(teve, {'cookies': self.cookies, 'user_agent': self.user_agent})
+        return teve, restored
+
+    def release(self, teve):
+        """Keep the bot's cookies and user agent, then close its session"""
+        state = session_state(teve)
+        self.cookies = _compact_cookies(state['cookies'])
+        self.user_agent = sys.intern(state['user_agent']) if state['user_agent'] else None
+        teve.session.close()
+
+    def finish(self, ok, interval, error=None):
+        """
+        Record the result of a run
+
+        Args:
+            ok (bool): Whether the run succeeded
+            interval (float): Seconds until the account is due again
+            error (str, optional): Why the run failed
+
+        Returns:
+            tuple: (username, fields) for AccountStore.update()
+        """
+        self.last_run = time.time()
+        self.last_ok = ok
+        self.next_due = self.last_run + interval
+        return (self.username, {
+            'cookies': [list(cookie) for cookie in self.cookies or ()],
+            'user_agent': self.user_agent,
+            'last_run': self.last_run,
+            'last_ok': ok,
+            'last_error': error,
+            'next_due': self.next_due,
+        })
+
+
+class FleetRunner:
+    """Runs every due account of an AccountStore on a bounded thread pool"""
+
+    def __init__(self, store, workers=ACCOUNT_WORKERS, interval=RUN_INTERVAL,
+                 scheduler=None, batch_size=BATCH_SIZE):
+        """
+        Args:
+            store (AccountStore): Accounts to run; results are written back
+            workers (int): Accounts running at the same time
+            interval (float): Seconds between runs of one account
+            scheduler (UpstreamScheduler, optional): Passed on to every bot
+            batch_size (int): Results written per store transaction
+        """
+        self.store = store
+        self.workers = workers
+        self.interval = interval
+        self.scheduler = scheduler
+        self.batch_size = batch_size
+
+    def run_account(self, state):
+        """
+        Run all bot tasks for one account (pool thread)
+
+        Args:
+            state (AccountState): The account; updated with the result
+
+        Returns:
+            tuple: (username, fields) for AccountStore.update()
+        """
+        teve = None
+        try:
+            teve, restored = state.bot(self.scheduler)
+            # A restored session that is still logged in skips the login
+            warm = restored and teve.is_logged_in()
+            ok = teve.run_bot(login=not warm, food_id=state.food_id, drink_id=state.drink_id)
+            error = None if ok else 'Login failed'
+        except Exception as e:
+            ok, error = False, f'{type(e).__name__}: {e}'
+        finally:
+            if teve is not None:
+                state.release(teve)
+        return state.finish(ok, self.interval, error)
+
+    def run_due(self, now=None):
+        """
+        Run every account due at `now`, streaming them from the store
+
+        At most 2 x workers accounts are in memory as bots or queued states
+        at any time, however many are due.
+
+        Args:
+            now (float, optional): time.time() value; the current time if omitted
+
+        Returns:
+            tuple: (accounts that succeeded, accounts that failed)
+        """
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+        now = time.time() if now is None else now
+        results = []
+        succeeded = failed = 0
+
+        def collect(done):
+            nonlocal succeeded, failed
+            for future in done:
+                result = future.result()
+                results.append(result)
+                if result[1]['last_ok']:
+                    succeeded += 1
+                else:
+                    failed += 1
+            if len(results) >= self.batch_size:
+                self.store.update(results)
+                results.clear()
+
+        running = set()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='fleet') as pool:
+            for record in self.store.iter_accounts(due_before=now):
+                if len(running) >= 2 * self.workers:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    collect(done)
+                running.add(pool.submit(self.run_account, AccountState.from_record(record)))
+            collect(wait(running).done)
+        if results:
+            self.store.update(results)
+        return succeeded, failed
@@ -2,16 +2,36 @@
 GUI Module for Teveclub Bot
 Provides a graphical interface for interacting with the bot
 Styled to match Teveclub.hu website with rounded, brownish theme
-Uses threading to prevent UI freezing during operations
+Bot commands run in order on one worker thread, so the UI never freezes
+and several actions can be queued at once
 """
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
+from functools import lru_cache
 from pathlib import Path
-import threading
 import os
-from src.bot_core import TeveClub
-from src.config import CREDENTIALS_FILE
+import re
+from src import startup
+from src.config import (CREDENTIALS_FILE, ACCOUNTS_FILE, ACCOUNTS_DB, ACCOUNT_WORKERS,
+                        ACCOUNT_REFRESH_INTERVAL)
 from src.utils import load_credentials, save_credentials, get_icon_path, get_writable_path
+from src.worker import CommandWorker, UpdateBatcher
+
+
+def new_bot(username, password):
+    """
+    Create a TeveClub bot
+    The bot core (and requests) is imported here rather than at module load,
+    so the window appears first; LoginApp preloads it once idle.
+    """
+    from src.bot_core import TeveClub
+    return TeveClub(username, password)
+
+
+def preload_bot_core():
+    """Import the modules logging in needs, off the UI thread"""
+    import concurrent.futures  # noqa: F401  (accounts pool)
+    import src.bot_core  # noqa: F401
 
 
 class RoundedButton(tk.Canvas):
@@ -90,28 +110,7 @@ class RoundedButton(tk.Canvas):
         
     def create_rounded_rectangle(self, x1, y1, x2, y2, radius=25, **kwargs):
         """Create a rounded rectangle"""
-        points = [
-            x1+radius, y1,
-            x1+radius, y1,
-            x2-radius, y1,
-            x2-radius, y1,
-            x2, y1,
-            x2, y1+radius,
-            x2, y1+radius,
-            x2, y2-radius,
-            x2, y2-radius,
-            x2, y2,
-            x2-radius, y2,
-            x2-radius, y2,
-            x1+radius, y2,
-            x1+radius, y2,
-            x1, y2,
-            x1, y2-radius,
-            x1, y2-radius,
-            x1, y1+radius,
-            x1, y1+radius,
-            x1, y1
-        ]
+        points = _rounded_rectangle_points(x1, y1, x2, y2, radius)
         return self.create_polygon(points, smooth=True, **kwargs)
     
     def on_enter(self, event):
@@ -182,8 +181,10 @@ class RoundedEntry(tk.Frame):
 
 
 # Add method to Canvas for rounded rectangles
-def create_rounded_rectangle(self, x1, y1, x2, y2, radius=25, **kwargs):
-    points = [
+@lru_cache(maxsize=256)
+def _rounded_rectangle_points(x1, y1, x2, y2, radius):
+    """Polygon points of a rounded rectangle; cached, widgets reuse a few sizes"""
+    return (
         x1+radius, y1,
         x1+radius, y1,
         x2-radius, y1,
@@ -204,7 +205,11 @@ def create_rounded_rectangle(self, x1, y1, x2, y2, radius=25, **kwargs):
         x1, y1+radius,
         x1, y1+radius,
         x1, y1
-    ]
+    )
+
+
+def create_rounded_rectangle(self, x1, y1, x2, y2, radius=25, **kwargs):
+    points = _rounded_rectangle_points(x1, y1, x2, y2, radius)
     return self.create_polygon(points, smooth=True, **kwargs)
 
 tk.Canvas.create_rounded_rectangle = create_rounded_rectangle
@@ -329,6 +334,8 @@ class LoginApp:
     SUCCESS_COLOR = "#228B22"     # Forest green
     ERROR_COLOR = "#CD5C5C"       # Indian red
     
+    ACCOUNT_ROW_HEIGHT = 46       # Pixels per row in the accounts panel
+    
     def __init__(self, root):
         """
         Initialize the application
@@ -366,13 +373,36 @@ class LoginApp:
         self.username = ""
         self.password = ""
         self.teve = None  # Store the bot instance
-        self._operation_running = False  # Track if operation is in progress
+        self.worker = CommandWorker()  # Runs bot commands off the UI thread
         
-        # Get writable path for credentials
+        # Multi-account panel: bounded pool, one batched redraw per frame
+        self.accounts = {}  # username -> state from _new_account(), in list order
+        self.account_pool = None  # Created on first use
+        self.accounts_canvas = None
+        self._account_refresh_id = None
+        self.batcher = UpdateBatcher(self.root.after)
+        
+        # Get writable paths for credentials and the account list
         self.credentials_path = get_writable_path(CREDENTIALS_FILE)
+        self.account_store = None  # Opened with the accounts panel
+        
+        # Panels are built on first use, then hidden and shown again
+        self._panels = {}
+        self._current_panel = None
+        self._icon_image = None
+        self.root.bind_all("<MouseWheel>", self._on_mousewheel)
+        for key in ("<Down>", "<Up>", "<Prior>", "<Next>"):  # Prior/Next: Page Up/Down
+            self.root.bind(key, self._on_scroll_key)
         
         self.setup_icon()
         self.show_login_panel()
+        self.root.after_idle(self._on_interactive)
+    
+    def _on_interactive(self):
+        """First idle moment after startup: the window responds to input"""
+        startup.mark("interactive")
+        # Logging in needs the bot core; load it before the user gets there
+        self.worker.submit(preload_bot_core)
     
     def minimize_window(self):
         """Minimize the window"""
@@ -391,34 +421,23 @@ class LoginApp:
         y = self.root.winfo_y() + deltay
         self.root.geometry(f"+{x}+{y}")
     
-    def run_in_thread(self, target, *args):
+    def queue_command(self, target, *args, label=None, key=None):
         """
-        Run a function in a separate thread to prevent UI freezing
+        Queue a bot command on the worker thread to prevent UI freezing
         
         Args:
             target: Function to run
             *args: Arguments to pass to the function
+            label (str, optional): Shown in the status while it waits
+            key (str, optional): Coalescing key (see CommandWorker.submit)
         """
-        if self._operation_running:
-            messagebox.showwarning("Operation in Progress", 
-                                  "Please wait for the current operation to complete.")
-            return
-        
-        self._operation_running = True
-        # Disable buttons during operation if on main panel
-        if hasattr(self, 'action_buttons'):
-            for btn in self.action_buttons:
-                btn.config(state='disabled')
-        
-        thread = threading.Thread(target=target, args=args, daemon=True)
-        thread.start()
+        ahead = self.worker.submit(target, *args, key=key)
+        if ahead and label:
+            self.update_status(f"⏳ {label} queued ({ahead} ahead)", "blue")
     
-    def _operation_complete(self):
-        """Mark operation as complete and re-enable buttons"""
-        self._operation_running = False
-        if hasattr(self, 'action_buttons'):
-            for btn in self.action_buttons:
-                btn.config(state='normal')
+    def queue_refresh(self):
+        """Queue a state refresh after everything queued so far (any thread)"""
+        self.worker.submit(self._load_current_state, key='refresh')
     
     def safe_ui_update(self, callback):
         """
@@ -439,23 +458,80 @@ class LoginApp:
             self.root.iconbitmap(icon_path)
         except:
             try:
-                # Alternative Linux/Mac approach
-                img = tk.PhotoImage(file=icon_path)
-                self.root.tk.call('wm', 'iconphoto', self.root._w, img)
+                # Alternative Linux/Mac approach; keep a reference or Tk
+                # discards the image
+                self._icon_image = tk.PhotoImage(file=icon_path)
+                self.root.tk.call('wm', 'iconphoto', self.root._w, self._icon_image)
             except:
                 pass  # Complete silent fallback
                 
     def clear_window(self):
-        """Remove all widgets from the window"""
+        """Hide the current panel and remove any other widgets from the window"""
+        if self._current_panel is not None:
+            self._current_panel.pack_forget()
+            self._current_panel = None
+        panels = set(self._panels.values())
         for widget in self.root.winfo_children():
-            widget.destroy()
+            if widget not in panels:
+                widget.destroy()
     
-    def show_login_panel(self):
-        """Display the login interface with modern rounded design"""
-        self.clear_window()
+    def _show_panel(self, name, build):
+        """
+        Show a cached panel, building it on first use
         
+        Args:
+            name (str): Panel name
+            build (callable): Fills a new panel frame: build(frame)
+        
+        Returns:
+            bool: True if the panel was just built
+        """
+        self.clear_window()
+        panel = self._panels.get(name)
+        built = panel is None
+        if built:
+            panel = self._panels[name] = tk.Frame(self.root, bg=self.BG_COLOR)
+            panel.scroll_canvas = None  # Set by panels that scroll
+            panel.pack(expand=True, fill="both")
+            build(panel)
+            startup.mark(f"{name} panel built")
+        else:
+            panel.pack(expand=True, fill="both")
+        self._current_panel = panel
+        return built
+    
+    def _visible_panel(self, name):
+        """True while the named panel is on screen"""
+        return self._current_panel is not None and self._current_panel is self._panels.get(name)
+    
+    def _on_mousewheel(self, event):
+        canvas = self._current_panel.scroll_canvas if self._current_panel else None
+        if canvas is not None:
+            canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+    
+    def _on_scroll_key(self, event):
+        canvas = self._current_panel.scroll_canvas if self._current_panel else None
+        if canvas is None:
+            return
+        if event.keysym == 'Down':
+            canvas.yview_scroll(1, "units")
+        elif event.keysym == 'Up':
+            canvas.yview_scroll(-1, "units")
+        elif event.keysym == 'Next':
+            canvas.yview_scroll(1, "pages")
+        elif event.keysym == 'Prior':
+            canvas.yview_scroll(-1, "pages")
+    
+    def show_login_panel(self):
+        """Display the login interface"""
+        if not self._show_panel("login", self._build_login_panel):
+            # Typed credentials are kept; a stale status message is not
+            self.login_status.config(text="")
+    
+    def _build_login_panel(self, parent):
+        """Build the login interface with modern rounded design"""
         # Main background container
-        bg_container = tk.Frame(self.root, bg=self.BG_COLOR)
+        bg_container = tk.Frame(parent, bg=self.BG_COLOR)
         bg_container.pack(expand=True, fill="both", padx=20, pady=20)
         
         # Island panel with shadow effect (kept inside window)
@@ -566,6 +642,16 @@ class LoginApp:
                                     gradient=True)
         login_button.pack()
         
+        accounts_button = RoundedButton(button_frame, "👥 Manage Accounts",
+                                       command=self.show_accounts_panel,
+                                       bg_color=self.PANEL_BG,
+                                       hover_color="#E8C090",
+                                       text_color="#4A3820",
+                                       border_color=self.ACTION_BTN_BORDER,
+                                       border_width=2,
+                                       width=280, height=40)
+        accounts_button.pack(pady=(10, 0))
+        
         # Status area
         self.login_status = tk.Label(container, text="", 
                                     font=("Segoe UI", 9),
@@ -575,11 +661,17 @@ class LoginApp:
         self.login_status.pack(pady=15, fill="x")
     
     def show_main_panel(self):
-        """Display the main interface after successful login with rounded modern design"""
-        self.clear_window()
+        """Display the main interface after successful login"""
+        self._show_panel("main", self._build_main_panel)
+        self.welcome_label.config(text=f"Welcome, {self.username}! 🐪")
         
+        # Load current state in background
+        self.queue_refresh()
+    
+    def _build_main_panel(self, parent):
+        """Build the main interface with rounded modern design"""
         # Main background container
-        bg_container = tk.Frame(self.root, bg=self.BG_COLOR)
+        bg_container = tk.Frame(parent, bg=self.BG_COLOR)
         bg_container.pack(expand=True, fill="both", padx=20, pady=20)
         
         # Island panel with shadow
@@ -661,28 +753,8 @@ class LoginApp:
         canvas.create_window((0, 0), window=scrollable_frame, anchor="nw", width=panel_width - 60)
         canvas.configure(yscrollcommand=scrollbar.set)
         
-        # Enable mouse wheel scrolling
-        def _on_mousewheel(event):
-            canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-        
-        # Bind mouse wheel to canvas and all child widgets
-        canvas.bind_all("<MouseWheel>", _on_mousewheel)
-        
-        # Enable keyboard scrolling when window has focus
-        def _on_key_press(event):
-            if event.keysym == 'Down':
-                canvas.yview_scroll(1, "units")
-            elif event.keysym == 'Up':
-                canvas.yview_scroll(-1, "units")
-            elif event.keysym == 'Page_Down':
-                canvas.yview_scroll(1, "pages")
-            elif event.keysym == 'Page_Up':
-                canvas.yview_scroll(-1, "pages")
-        
-        self.root.bind("<Down>", _on_key_press)
-        self.root.bind("<Up>", _on_key_press)
-        self.root.bind("<Prior>", _on_key_press)  # Page Up
-        self.root.bind("<Next>", _on_key_press)   # Page Down
+        # Mouse wheel and arrow/page keys scroll this canvas while shown
+        parent.scroll_canvas = canvas
         
         # Welcome section
         welcome_canvas = tk.Canvas(scrollable_frame, height=80, bg=self.PANEL_BG, 
@@ -691,7 +763,7 @@ class LoginApp:
         welcome_canvas.create_rounded_rectangle(5, 5, 315, 75, radius=20,
                                                fill="#FFF8F0", outline=self.ACCENT_COLOR, width=2)
         
-        welcome_label = tk.Label(welcome_canvas, text=f"Welcome, {self.username}! 🐪", 
+        self.welcome_label = welcome_label = tk.Label(welcome_canvas, text=f"Welcome, {self.username}! 🐪", 
                                font=("Segoe UI", 16, "bold"),
                                fg=self.PRIMARY_COLOR, bg="#FFF8F0")
         welcome_canvas.create_window(160, 30, window=welcome_label)
@@ -847,9 +919,6 @@ class LoginApp:
                                    bg=self.PANEL_BG,
                                    wraplength=280, justify="left")
         status_canvas.create_window(160, 45, window=self.status_text)
-        
-        # Load current state in background
-        self.run_in_thread(self._load_current_state)
     
     def update_status(self, message, color="black"):
         """
@@ -878,8 +947,8 @@ class LoginApp:
         if not self.username or not self.password:
             self.login_status.config(text="⚠️ Please enter both username and password", fg=self.ERROR_COLOR)
         else:
-            # Run login in separate thread
-            self.run_in_thread(self._do_login)
+            # Run login on the worker thread
+            self.queue_command(self._do_login, key='login')
     
     def _do_login(self):
         """Perform login operation in background thread"""
@@ -888,7 +957,7 @@ class LoginApp:
             text="🔄 Logging in...", fg=self.PRIMARY_COLOR))
         
         try:
-            self.teve = TeveClub(self.username, self.password)
+            self.teve = new_bot(self.username, self.password)
             if self.teve.login():
                 # Success
                 self.safe_ui_update(lambda: self.login_status.config(
@@ -915,8 +984,6 @@ class LoginApp:
         except Exception as e:
             self.safe_ui_update(lambda: self.login_status.config(
                 text=f"❌ Error: {str(e)}", fg=self.ERROR_COLOR))
-        finally:
-            self.safe_ui_update(self._operation_complete)
 
     def feed_pet(self):
         """Handle the feed action"""
@@ -924,8 +991,8 @@ class LoginApp:
             self.update_status("❌ Not logged in. Please login again.", "red")
             return
         
-        # Run in separate thread
-        self.run_in_thread(self._do_feed)
+        # Run on the worker thread
+        self.queue_command(self._do_feed, label="Feeding")
     
     def _do_feed(self):
         """Perform feed operation in background thread"""
@@ -944,8 +1011,6 @@ class LoginApp:
         except Exception as e:
             self.safe_ui_update(lambda: self.update_status(
                 f"❌ Feeding failed: {str(e)}", "red"))
-        finally:
-            self.safe_ui_update(self._operation_complete)
 
     def learn(self):
         """Handle the learn action"""
@@ -953,8 +1018,8 @@ class LoginApp:
             self.update_status("❌ Not logged in. Please login again.", "red")
             return
         
-        # Run in separate thread
-        self.run_in_thread(self._do_learn)
+        # Run on the worker thread
+        self.queue_command(self._do_learn, label="Learning")
     
     def _do_learn(self):
         """Perform learn operation in background thread"""
@@ -967,14 +1032,14 @@ class LoginApp:
             if success:
                 self.safe_ui_update(lambda: self.update_status(
                     "✅ Learning completed successfully! 📚", "green"))
+                # The current trick may have changed
+                self.queue_refresh()
             else:
                 self.safe_ui_update(lambda: self.update_status(
                     "⚠️ No more tricks to learn!", "orange"))
         except Exception as e:
             self.safe_ui_update(lambda: self.update_status(
                 f"❌ Learning failed: {str(e)}", "red"))
-        finally:
-            self.safe_ui_update(self._operation_complete)
 
     def guess_game(self):
         """Handle the guess game action"""
@@ -982,8 +1047,8 @@ class LoginApp:
             self.update_status("❌ Not logged in. Please login again.", "red")
             return
         
-        # Run in separate thread
-        self.run_in_thread(self._do_guess)
+        # Run on the worker thread
+        self.queue_command(self._do_guess, label="Guess game")
     
     def _do_guess(self):
         """Perform guess game operation in background thread"""
@@ -1002,8 +1067,6 @@ class LoginApp:
         except Exception as e:
             self.safe_ui_update(lambda: self.update_status(
                 f"❌ Guess game failed: {str(e)}", "red"))
-        finally:
-            self.safe_ui_update(self._operation_complete)
     
     def on_food_selected(self, selection):
         """Handle food selection from custom dropdown"""
@@ -1015,8 +1078,8 @@ class LoginApp:
         if food_id is None:
             return
         
-        # Run in thread
-        self.run_in_thread(self._do_set_food, food_id)
+        # Run on the worker thread
+        self.queue_command(self._do_set_food, food_id, label="Setting food")
     
     def _do_set_food(self, food_id):
         """Set food in background thread"""
@@ -1029,15 +1092,13 @@ class LoginApp:
                 self.safe_ui_update(lambda: self.update_status(
                     f"✅ Food set successfully! 🍖", "green"))
                 # Reload current state
-                self.run_in_thread(self._load_current_state)
+                self.queue_refresh()
             else:
                 self.safe_ui_update(lambda: self.update_status(
                     "❌ Failed to set food", "red"))
         except Exception as e:
             self.safe_ui_update(lambda: self.update_status(
                 f"❌ Set food failed: {str(e)}", "red"))
-        finally:
-            self.safe_ui_update(self._operation_complete)
     
     def on_drink_selected(self, selection):
         """Handle drink selection from custom dropdown"""
@@ -1049,8 +1110,8 @@ class LoginApp:
         if drink_id is None:
             return
         
-        # Run in thread
-        self.run_in_thread(self._do_set_drink, drink_id)
+        # Run on the worker thread
+        self.queue_command(self._do_set_drink, drink_id, label="Setting drink")
     
     def _do_set_drink(self, drink_id):
         """Set drink in background thread"""
@@ -1063,23 +1124,21 @@ class LoginApp:
                 self.safe_ui_update(lambda: self.update_status(
                     f"✅ Drink set successfully! 🥤", "green"))
                 # Reload current state
-                self.run_in_thread(self._load_current_state)
+                self.queue_refresh()
             else:
                 self.safe_ui_update(lambda: self.update_status(
                     "❌ Failed to set drink", "red"))
         except Exception as e:
             self.safe_ui_update(lambda: self.update_status(
                 f"❌ Set drink failed: {str(e)}", "red"))
-        finally:
-            self.safe_ui_update(self._operation_complete)
     
     def _load_current_state(self):
-        """Load and display current food/drink/trick in background thread"""
+        """Load and display current food/drink/trick on the worker thread"""
         try:
             from src.config import FREE_FOOD, FREE_DRINK
             
-            # Get current food/drink
-            current = self.teve.get_current_food_drink()
+            # One myteve.pet request for food, drink and trick
+            current = self.teve.get_current_state()
             if current:
                 food_id = current.get('food_id')
                 drink_id = current.get('drink_id')
@@ -1099,22 +1158,391 @@ class LoginApp:
                 if hasattr(self, 'drink_dropdown') and drink_name in self.drink_items:
                     self.safe_ui_update(lambda: self.drink_dropdown.set_selection(drink_name))
             
-            # Get current trick
-            trick = self.teve.get_current_trick()
-            if trick:
-                self.safe_ui_update(lambda: self.current_trick_label.config(
-                    text=f"✨ Trick: {trick}"))
-            else:
-                self.safe_ui_update(lambda: self.current_trick_label.config(
-                    text="✨ Trick: No trick learned"))
+                # Show current trick
+                trick = current.get('trick')
+                if trick:
+                    self.safe_ui_update(lambda: self.current_trick_label.config(
+                        text=f"✨ Trick: {trick}"))
+                else:
+                    self.safe_ui_update(lambda: self.current_trick_label.config(
+                        text="✨ Trick: No trick learned"))
                 
         except Exception as e:
             print(f"Failed to load current state: {e}")
+
+    def show_accounts_panel(self):
+        """Display every saved account with live status, refreshed in the background"""
+        if not self.accounts:
+            self._load_accounts()
+        if self._show_panel("accounts", self._build_accounts_panel):
+            self._layout_account_rows()
+        self.refresh_all_accounts()
+        self._schedule_account_refresh()
+    
+    def _build_accounts_panel(self, parent):
+        """Build the accounts list and its controls"""
+        # Main background container
+        bg_container = tk.Frame(parent, bg=self.BG_COLOR)
+        bg_container.pack(expand=True, fill="both", padx=15, pady=10)
+        
+        # Title and summary
+        header = tk.Frame(bg_container, bg=self.BG_COLOR)
+        header.pack(fill="x")
+        tk.Label(header, text="👥 Accounts", font=("Segoe UI", 16, "bold"),
+                 fg=self.PRIMARY_COLOR, bg=self.BG_COLOR).pack(side="left")
+        self.accounts_summary = tk.Label(header, text="", font=("Segoe UI", 9),
+                                         fg=self.TEXT_COLOR, bg=self.BG_COLOR)
+        self.accounts_summary.pack(side="right")
+        
+        # Actions for all accounts
+        buttons_frame = tk.Frame(bg_container, bg=self.BG_COLOR)
+        buttons_frame.pack(fill="x", pady=8)
+        for text, command in (("⬅ Back", self.show_login_panel),
+                              ("🔄 Refresh", self.refresh_all_accounts),
+                              ("🚀 Run all", self.run_all_accounts),
+                              ("📂 Import", self.import_accounts)):
+            RoundedButton(buttons_frame, text, command=command,
+                          bg_color=self.PANEL_BG,
+                          hover_color="#E8C090",
+                          text_color="#4A3820",
+                          border_color=self.ACTION_BTN_BORDER,
+                          border_width=2,
+                          width=100, height=36).pack(side="left", padx=2)
+        
+        # Add account row
+        add_frame = tk.Frame(bg_container, bg=self.BG_COLOR)
+        add_frame.pack(fill="x", pady=(0, 8))
+        self.new_username_entry = tk.Entry(add_frame, bg=self.PANEL_BG, fg=self.TEXT_COLOR,
+                                           font=("Segoe UI", 10), relief="flat", width=15)
+        self.new_username_entry.pack(side="left", padx=(2, 4), ipady=6)
+        self.new_password_entry = tk.Entry(add_frame, bg=self.PANEL_BG, fg=self.TEXT_COLOR,
+                                           font=("Segoe UI", 10), relief="flat", width=13,
+                                           show="●")
+        self.new_password_entry.pack(side="left", padx=4, ipady=6)
+        RoundedButton(add_frame, "➕ Add", command=self.on_add_account,
+                      bg_color=self.BUTTON_BLUE_COLOR,
+                      hover_color=self.SECONDARY_COLOR,
+                      width=90, height=34).pack(side="right", padx=2)
+        
+        # Account list: one canvas with a few text items per row, so a
+        # hundred accounts cost a few hundred canvas items, not widgets
+        list_frame = tk.Frame(bg_container, bg=self.BG_COLOR)
+        list_frame.pack(expand=True, fill="both")
+        canvas = tk.Canvas(list_frame, bg=self.PANEL_BG, highlightthickness=2,
+                           highlightbackground=self.ACCENT_COLOR)
+        canvas.pack(side="left", expand=True, fill="both")
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=canvas.yview,
+                                  style="Custom.Vertical.TScrollbar")
+        scrollbar.pack(side="right", fill="y")
+        canvas.configure(yscrollcommand=scrollbar.set)
+        canvas.tag_bind("remove", "<Button-1>", self._on_remove_account)
+        parent.scroll_canvas = self.accounts_canvas = canvas
+        self.root.update_idletasks()
+    
+    def _load_accounts(self):
+        """Load the account list, seeded from accounts.json or the saved login on first use"""
+        import sqlite3
+        from src.account_store import AccountStore
+        
+        try:
+            if self.account_store is None:
+                self.account_store = AccountStore(get_writable_path(ACCOUNTS_DB))
+            store = self.account_store
+            if not store.count() and not store.import_json(get_writable_path(ACCOUNTS_FILE)):
+                store.import_json(self.credentials_path)
+            for stored in store.iter_accounts():
+                self.accounts[stored["username"]] = self._new_account(
+                    stored["username"], stored["password"], stored)
+        except sqlite3.Error as e:
+            messagebox.showwarning("Accounts Not Loaded",
+                                   f"The account database could not be opened:\n\n{e}")
+    
+    def _new_account(self, username, password, stored=None):
+        """State of one account in the panel; workers update it, the UI draws it"""
+        return {
+            'username': username,
+            'password': password,
+            'stored': stored,  # Saved session state, restored on first login
+            'teve': None,
+            'logged_in': False,
+            'busy': False,
+            'status': "Not checked yet",
+            'color': self.TEXT_COLOR,
+            'details': "",
+            'items': None,  # Canvas ids of the status and details texts
+        }
+    
+    def _layout_account_rows(self):
+        """Draw every account row; only needed when accounts are added or removed"""
+        canvas = self.accounts_canvas
+        canvas.delete("all")
+        self._remove_items = {}
+        width = canvas.winfo_width()
+        
+        for index, account in enumerate(self.accounts.values()):
+            y = index * self.ACCOUNT_ROW_HEIGHT
+            if index % 2:
+                canvas.create_rectangle(0, y, width, y + self.ACCOUNT_ROW_HEIGHT,
+                                        fill="#FFF3D9", outline="")
+            canvas.create_text(10, y + 14, anchor="w", text=f"👤 {account['username']}",
+                               font=("Segoe UI", 10, "bold"), fill=self.PRIMARY_COLOR)
+            status = canvas.create_text(width - 32, y + 14, anchor="e", text=account['status'],
+                                        font=("Segoe UI", 9), fill=account['color'])
+            details = canvas.create_text(10, y + 32, anchor="w", text=account['details'],
+                                         font=("Segoe UI", 8), fill=self.TEXT_COLOR)
+            remove = canvas.create_text(width - 14, y + 14, text="✖", tags=("remove",),
+                                        font=("Segoe UI", 9), fill=self.ERROR_COLOR)
+            account['items'] = (status, details)
+            self._remove_items[remove] = account['username']
+        
+        if not self.accounts:
+            canvas.create_text(width // 2, 40, text="No accounts yet.\nAdd one above or import a file.",
+                               font=("Segoe UI", 10), fill=self.TEXT_COLOR, justify="center")
+        canvas.configure(scrollregion=(0, 0, width, len(self.accounts) * self.ACCOUNT_ROW_HEIGHT))
+        self._update_accounts_summary()
+    
+    def _draw_account(self, username):
+        """Redraw one account row from its state (UI thread, batched)"""
+        account = self.accounts.get(username)
+        if account is None or account['items'] is None:
+            return
+        status, details = account['items']
+        self.accounts_canvas.itemconfigure(status, text=account['status'], fill=account['color'])
+        self.accounts_canvas.itemconfigure(details, text=account['details'])
+    
+    def _update_accounts_summary(self):
+        """Show account counts in the panel header (UI thread, batched)"""
+        if self.accounts_canvas is None:
+            return
+        accounts = list(self.accounts.values())
+        busy = sum(1 for account in accounts if account['busy'])
+        failed = sum(1 for account in accounts if account['color'] == self.ERROR_COLOR)
+        self.accounts_summary.config(
+            text=f"{len(accounts)} accounts · {busy} busy · {failed} failed")
+    
+    def _set_account_status(self, account, status, color, details=None):
+        """
+        Update an account's row from any thread
+        Rapid changes to the same row are drawn once per frame.
+        
+        Args:
+            account (dict): Account state from _new_account
+            status (str): Status text
+            color (str): Status text color
+            details (str, optional): New food/drink/trick line
+        """
+        account['status'] = status
+        account['color'] = color
+        if details is not None:
+            account['details'] = details
+        self.batcher.put(('account', account['username']),
+                         lambda: self._draw_account(account['username']))
+        self.batcher.put('summary', self._update_accounts_summary)
+    
+    def _submit_account(self, account, job):
+        """Queue a job for an account on the bounded pool, unless it has one"""
+        if account['busy']:
+            return
+        account['busy'] = True
+        if self.account_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.account_pool = ThreadPoolExecutor(max_workers=ACCOUNT_WORKERS,
+                                                   thread_name_prefix="accounts")
+        self._set_account_status(account, "⏳ Queued", self.BUTTON_BLUE_COLOR)
+        self.account_pool.submit(self._run_account_job, account, job)
+    
+    def _run_account_job(self, account, job):
+        """Run one account job on a pool thread"""
+        try:
+            job(account)
+        except Exception as e:
+            self._set_account_status(account, f"❌ Error: {str(e)}", self.ERROR_COLOR)
         finally:
-            self.safe_ui_update(self._operation_complete)
+            # The flag only changes on the UI thread, where it is read
+            self.batcher.put(('done', account['username']), lambda: self._account_job_done(account))
+    
+    def _account_job_done(self, account):
+        """Let an account take jobs again (UI thread, batched)"""
+        account['busy'] = False
+        self._update_accounts_summary()
+    
+    def _account_login(self, account):
+        """Log an account in unless its session already is (pool thread)"""
+        from src.account_store import restore_session, session_state
+        
+        if account['teve'] is None:
+            account['teve'] = new_bot(account['username'], account['password'])
+            # A session saved by an earlier run may still be logged in
+            if account['stored'] and restore_session(account['teve'], account['stored']):
+                self._set_account_status(account, "🔄 Checking session...", self.BUTTON_BLUE_COLOR)
+                account['logged_in'] = account['teve'].is_logged_in()
+            account['stored'] = None
+        if not account['logged_in']:
+            self._set_account_status(account, "🔄 Logging in...", self.BUTTON_BLUE_COLOR)
+            account['logged_in'] = account['teve'].login()
+            if not account['logged_in']:
+                self._set_account_status(account, "❌ Login failed", self.ERROR_COLOR)
+                return False
+            self._store(lambda store: store.update(
+                [(account['username'], session_state(account['teve']))]))
+        return account['logged_in']
+    
+    def _describe_state(self, state):
+        """One-line summary of an account's food, drink and trick"""
+        from src.config import FREE_FOOD, FREE_DRINK
+        
+        food_id, drink_id = state.get('food_id'), state.get('drink_id')
+        food_name = next((name for id, name in FREE_FOOD if id == food_id), f"ID:{food_id}")
+        drink_name = next((name for id, name in FREE_DRINK if id == drink_id), f"ID:{drink_id}")
+        return f"🍖 {food_name} · 🥤 {drink_name} · ✨ {state.get('trick') or 'No trick learned'}"
+    
+    def _refresh_account(self, account):
+        """Fetch an account's current state (pool thread)"""
+        if not self._account_login(account):
+            return
+        self._show_state(account, "✅ Up to date")
+    
+    def _show_state(self, account, done_status):
+        """Fetch and show the state of a logged-in account (pool thread)"""
+        self._set_account_status(account, "🔄 Refreshing...", self.BUTTON_BLUE_COLOR)
+        state = account['teve'].get_current_state()
+        if not state or (state['food_id'] is None and state['drink_id'] is None):
+            # Most likely logged out upstream: log in again next time
+            account['logged_in'] = False
+            self._set_account_status(account, "⚠️ Refresh failed", "#D4A574")
+            return
+        self._set_account_status(account, done_status, self.SUCCESS_COLOR,
+                                 details=self._describe_state(state))
+    
+    def _run_account(self, account):
+        """Run all bot tasks for an account, then show its state (pool thread)"""
+        if not self._account_login(account):
+            return
+        from src.account_store import session_state
+        
+        ok = account['teve'].run_bot(
+            progress=lambda step: self._set_account_status(
+                account, f"🔄 {step.capitalize()}...", self.BUTTON_BLUE_COLOR),
+            login=False)
+        self._store(lambda store: store.record_run(
+            account['username'], ok, ACCOUNT_REFRESH_INTERVAL,
+            state=session_state(account['teve'])))
+        # The session was just used, so skip the login step; run_bot's last
+        # myteve.pet load came before the lesson, so the trick is fetched
+        # once more
+        self._show_state(account, "✅ All tasks done")
+    
+    def refresh_all_accounts(self):
+        """Refresh every account that is not busy"""
+        for account in self.accounts.values():
+            self._submit_account(account, self._refresh_account)
+    
+    def run_all_accounts(self):
+        """Run the bot for every account that is not busy"""
+        for account in self.accounts.values():
+            self._submit_account(account, self._run_account)
+    
+    def _schedule_account_refresh(self):
+        """Refresh all accounts again after ACCOUNT_REFRESH_INTERVAL"""
+        if self._account_refresh_id is not None:
+            self.root.after_cancel(self._account_refresh_id)
+        self._account_refresh_id = self.root.after(ACCOUNT_REFRESH_INTERVAL * 1000,
+                                                   self._auto_refresh_accounts)
+    
+    def _auto_refresh_accounts(self):
+        self._account_refresh_id = None
+        if self._visible_panel("accounts"):
+            self.refresh_all_accounts()
+            self._schedule_account_refresh()
+    
+    def on_add_account(self):
+        """Handle the add account button"""
+        username = self.new_username_entry.get().strip()
+        password = self.new_password_entry.get().strip()
+        if not username or not password:
+            self.accounts_summary.config(text="⚠️ Enter both username and password")
+            return
+        self.new_username_entry.delete(0, tk.END)
+        self.new_password_entry.delete(0, tk.END)
+        self._add_accounts([(username, password)])
+    
+    def import_accounts(self):
+        """Add accounts from a text file with one 'username password' per line"""
+        path = filedialog.askopenfilename(
+            title="Import accounts",
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
+        if not path:
+            return
+        pairs = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                # username and password separated by whitespace, ':', ';' or ','
+                parts = re.split(r"[\s:;,]+", line.strip(), maxsplit=1)
+                if len(parts) == 2 and all(parts):
+                    pairs.append((parts[0], parts[1]))
+        self._add_accounts(pairs)
+    
+    def _add_accounts(self, pairs):
+        """Add or update accounts, save the list and refresh the new ones"""
+        added = []
+        busy = []
+        for username, password in pairs:
+            existing = self.accounts.get(username)
+            if existing is not None and existing['password'] == password:
+                continue
+            if existing is not None and existing['busy']:
+                # Its job holds the current entry: replacing it would lose
+                # the busy flag and let a second job start on the account
+                busy.append(username)
+                continue
+            self.accounts[username] = self._new_account(username, password)
+            added.append(self.accounts[username])
+        if busy:
+            self.accounts_summary.config(
+                text=f"⚠️ Busy, not updated: {', '.join(busy)}. Try again when done")
+        if not added:
+            return
+        self._store(lambda store: store.upsert(added))
+        self._layout_account_rows()
+        for account in added:
+            self._submit_account(account, self._refresh_account)
+    
+    def _on_remove_account(self, event):
+        """Handle a click on a row's ✖"""
+        item = self.accounts_canvas.find_withtag("current")
+        username = self._remove_items.get(item[0]) if item else None
+        if username is None:
+            return
+        if not messagebox.askyesno("Remove Account", f"Remove {username} from the list?"):
+            return
+        del self.accounts[username]
+        self._store(lambda store: store.remove([username]))
+        self._layout_account_rows()
+    
+    def _store(self, write):
+        """
+        Write to the account store, warning once per failure instead of raising
+        
+        Args:
+            write (callable): Called as write(store); may run on any thread
+        """
+        import sqlite3
+        
+        if self.account_store is None:
+            return
+        try:
+            write(self.account_store)
+        except sqlite3.Error as e:
+            print(f"Warning: Could not save accounts: {e}")
+            self.safe_ui_update(lambda: messagebox.showwarning(
+                "Accounts Not Saved", f"The account list could not be saved:\n\n{e}"))
 
     def exit_app(self):
         """Exit the application"""
+        if self.account_pool is not None:
+            self.account_pool.shutdown(wait=False, cancel_futures=True)
+        if self.account_store is not None:
+            self.account_store.close()
         self.root.quit()
 
 
@@ -1122,6 +1550,8 @@ def run_gui():
     """Run the GUI application"""
     root = tk.Tk()
     
+    startup.mark("tk root")
+    
     # Center the window on screen
     window_width = 450
     window_height = 700
@@ -1133,6 +1563,7 @@ def run_gui():
     
     try:
         app = LoginApp(root)
+        startup.mark("login panel shown")
         root.mainloop()
     except Exception as e:
         print(f"Error starting GUI: {e}")
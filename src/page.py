@@ -0,0 +1,84 @@
+"""
+teveclub.hu responses, decoded at most once
+A Page keeps the response body as bytes and pins its encoding: the charset
+the response names, else PAGE_ENCODING, so requests never falls back to
+character detection. Marker checks search the bytes for the marker
+pre-encoded in that encoding, the text is decoded only if something needs
+it, and lxml parses that same text instead of decoding the bytes again.
+"""
+import re
+from functools import lru_cache
+from src.config import PAGE_ENCODING
+
+
+_CHARSET = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+def page_encoding(response):
+    """
+    Encoding of a response: its declared charset, else PAGE_ENCODING
+
+    Args:
+        response (requests.Response): teveclub.hu response
+
+    Returns:
+        str: Codec name
+    """
+    match = _CHARSET.search(response.headers.get('Content-Type', ''))
+    return match.group(1) if match else PAGE_ENCODING
+
+
+@lru_cache(maxsize=64)
+def _encoded(marker, encoding):
+    """A marker as bytes in the page encoding; None if it cannot be encoded"""
+    try:
+        return marker.encode(encoding)
+    except (UnicodeEncodeError, LookupError):
+        return None
+
+
+class Page:
+    """The body of one response, with cheap marker checks"""
+
+    __slots__ = ('body', 'encoding', '_text')
+
+    def __init__(self, response):
+        """
+        Args:
+            response (requests.Response): teveclub.hu response; its encoding
+                is pinned too, so response.text never detects the charset
+        """
+        self.body = response.content
+        self.encoding = response.encoding = page_encoding(response)
+        self._text = None
+
+    def __contains__(self, marker):
+        """`marker in page`: search the raw bytes, not the decoded text"""
+        needle = _encoded(marker, self.encoding)
+        if needle is None:
+            return marker in self.text
+        return needle in self.body
+
+    @property
+    def text(self):
+        """The body decoded once, for regular expressions and BeautifulSoup"""
+        if self._text is None:
+            self._text = self.body.decode(self.encoding, errors='replace')
+        return self._text
+
+    def tree(self):
+        """
+        Parse the text with lxml
+        Cheaper than handing lxml the bytes: it would decode Latin-2 itself,
+        slower than Python, after the regexes already needed the text.
+
+        Returns:
+            lxml.html.HtmlElement: Document root
+        """
+        from lxml import html as lxml_html
+        try:
+            return lxml_html.fromstring(self.text)
+        except ValueError:
+            # lxml refuses str input with an XML encoding declaration
+            parser = lxml_html.HTMLParser(encoding=self.encoding)
+            return lxml_html.fromstring(self.body, parser=parser)
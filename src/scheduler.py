@@ -0,0 +1,172 @@
+"""
+Upstream request scheduler with priority lanes
+Bounds the teveclub.hu requests in progress and hands each freed slot to
+the waiting lanes by weighted fair queuing. Some slots are reserved for
+the interactive lane, so batch bot runs can never take every slot away
+from people using the web UI.
+
+A scheduler only sees the requests of its own process: under gunicorn each
+worker has one, so the limits add up across workers.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import requests
+
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+DEFAULT_WEIGHTS = {INTERACTIVE: 4, BACKGROUND: 1}
+
+# Seconds a ScheduledSession request waits for a slot at most
+SLOT_TIMEOUT = 60
+
+
+class SlotTimeout(TimeoutError):
+    """No upstream slot became free in time"""
+
+
+class _Lane:
+    """Waiters and fair-queuing bookkeeping of one priority class"""
+
+    def __init__(self, weight):
+        self.weight = weight
+        self.waiters = deque()
+        self.finish = 0.0  # Virtual finish time of the lane's last grant
+
+
+class UpstreamScheduler:
+    """Slot scheduler shared by every thread that talks to teveclub.hu"""
+
+    def __init__(self, slots, weights=None, reserved=1, observer=None):
+        """
+        Args:
+            slots (int): Upstream requests allowed in progress at once
+            weights (dict, optional): Lane name -> share of contended slots
+            reserved (int): Slots only the interactive lane may use
+            observer (callable, optional): Called as observer(lane, seconds
+                waited) after every grant, e.g. to record metrics
+        """
+        if not 0 <= reserved < slots:
+            raise ValueError('reserved must be at least 0 and below slots')
+        weights = weights or DEFAULT_WEIGHTS
+        for lane in (INTERACTIVE, BACKGROUND):
+            if lane not in weights:
+                raise ValueError(f'weights must include the {lane!r} lane')
+        for lane, weight in weights.items():
+            if not weight > 0:
+                raise ValueError(f'weight of the {lane!r} lane must be positive, not {weight!r}')
+        self.slots = slots
+        self.reserved = reserved
+        self.observer = observer
+        self._lanes = {name: _Lane(weight) for name, weight in weights.items()}
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._shared_in_use = 0  # Slots held by lanes other than interactive
+        self._vtime = 0.0
+
+    def _can_run(self, name):
+        if self._in_use >= self.slots:
+            return False
+        return name == INTERACTIVE or self._shared_in_use < self.slots - self.reserved
+
+    def _start_tag(self, lane):
+        return max(self._vtime, lane.finish)
+
+    def _grant(self, name):
+        lane = self._lanes[name]
+        start = self._start_tag(lane)
+        lane.finish = start + 1.0 / lane.weight
+        self._vtime = start
+        self._in_use += 1
+        if name != INTERACTIVE:
+            self._shared_in_use += 1
+
+    def _dispatch(self):
+        """Wake waiters while slots are free, smallest virtual finish first"""
+        while True:
+            ready = [(self._start_tag(lane) + 1.0 / lane.weight, name)
+                     for name, lane in self._lanes.items()
+                     if lane.waiters and self._can_run(name)]
+            if not ready:
+                return
+            _, name = min(ready)
+            waiter = self._lanes[name].waiters.popleft()
+            self._grant(name)
+            waiter['granted'] = True
+            waiter['event'].set()
+
+    def acquire(self, lane, timeout=None):
+        """
+        Wait for a slot
+
+        Args:
+            lane (str): Lane name, e.g. INTERACTIVE or BACKGROUND
+            timeout (float, optional): Seconds to wait before giving up
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            SlotTimeout: No slot became free within `timeout`
+        """
+        start = time.monotonic()
+        with self._lock:
+            if not self._lanes[lane].waiters and self._can_run(lane):
+                self._grant(lane)
+                return 0.0
+            waiter = {'event': threading.Event(), 'granted': False}
+            self._lanes[lane].waiters.append(waiter)
+
+        if not waiter['event'].wait(timeout):
+            with self._lock:
+                if not waiter['granted']:
+                    self._lanes[lane].waiters.remove(waiter)
+                    raise SlotTimeout(f'No upstream slot for the {lane} lane')
+        return time.monotonic() - start
+
+    def release(self, lane):
+        """Return a slot obtained from acquire()"""
+        with self._lock:
+            self._in_use -= 1
+            if lane != INTERACTIVE:
+                self._shared_in_use -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, lane, timeout=None):
+        """Hold one upstream slot for the duration of the with-block"""
+        waited = self.acquire(lane, timeout)
+        if self.observer is not None:
+            self.observer(lane, waited)
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+
+class ScheduledSession(requests.Session):
+    """requests.Session whose every request first waits for a scheduler slot"""
+
+    def __init__(self, scheduler, lane=BACKGROUND, slot_timeout=SLOT_TIMEOUT):
+        """
+        Args:
+            scheduler (UpstreamScheduler): Scheduler shared with other traffic
+            lane (str): Lane this session's requests are queued in
+            slot_timeout (float): Longest a request waits for a slot before
+                failing like an upstream timeout
+        """
+        super().__init__()
+        self.scheduler = scheduler
+        self.lane = lane
+        self.slot_timeout = slot_timeout
+
+    def request(self, method, url, *args, **kwargs):
+        try:
+            with self.scheduler.slot(self.lane, timeout=self.slot_timeout):
+                return super().request(method, url, *args, **kwargs)
+        except SlotTimeout as e:
+            # Callers already handle a slow teveclub.hu
+            raise requests.exceptions.Timeout(str(e)) from e
@@ -0,0 +1,33 @@
+"""
+Startup instrumentation
+Records how long the GUI takes from main.py to being interactive. Set
+TEVECLUB_STARTUP_TRACE=1 to print each milestone to stderr, e.g. to
+compare a source run with the PyInstaller onefile build (whose unpacking
+happens before main.py and is not included).
+"""
+import os
+import sys
+import time
+
+
+ENABLED = os.environ.get('TEVECLUB_STARTUP_TRACE') == '1'
+
+_origin = time.perf_counter()
+marks = []
+
+
+def mark(name):
+    """
+    Record a startup milestone
+
+    Args:
+        name (str): What just finished, e.g. 'tk root'
+
+    Returns:
+        float: Milliseconds since this module was first imported
+    """
+    elapsed = (time.perf_counter() - _origin) * 1000
+    marks.append((name, elapsed))
+    if ENABLED:
+        print(f"[startup] {elapsed:8.1f} ms  {name}", file=sys.stderr)
+    return elapsed
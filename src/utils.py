@@ -7,7 +7,6 @@ import json
 import os
 from pathlib import Path
 import sys
-import ctypes
 from src.config import DEFAULT_USER_AGENTS, USER_AGENTS_FILE, ICON_FILE
 
 
@@ -162,6 +161,7 @@ def is_admin():
         bool: True if running as admin, False otherwise
     """
     try:
+        import ctypes
         return ctypes.windll.shell32.IsUserAnAdmin()
     except:
         return False
@@ -0,0 +1,113 @@
+"""
+Background work for the GUI
+One persistent thread runs bot commands in the order they were queued, so
+the window stays responsive and users can queue several actions without
+waiting. Commands queued with a key (e.g. a state refresh) are coalesced:
+only the newest pending one runs, after everything queued before it.
+UpdateBatcher collects UI updates from any number of threads and applies
+them in a single Tk callback per frame.
+"""
+import threading
+from collections import deque
+
+
+# Milliseconds between batched UI flushes (about 60 per second)
+FRAME_MS = 16
+
+
+class CommandWorker:
+    """A single background thread working through a command queue"""
+
+    def __init__(self, name='bot-worker'):
+        """
+        Args:
+            name (str): Thread name
+        """
+        self._pending = deque()  # (key, target, args)
+        self._busy = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, target, *args, key=None):
+        """
+        Queue a command
+
+        Args:
+            target (callable): Function to run on the worker thread
+            *args: Arguments to pass to it
+            key (str, optional): Coalescing key; a pending command with the
+                same key is dropped in favour of this one
+
+        Returns:
+            int: Commands that will run before this one
+        """
+        with self._cond:
+            if key is not None:
+                self._pending = deque(command for command in self._pending if command[0] != key)
+            ahead = len(self._pending) + self._busy
+            self._pending.append((key, target, args))
+            self._cond.notify()
+        return ahead
+
+    def unfinished(self):
+        """Number of commands queued or running"""
+        with self._cond:
+            return len(self._pending) + self._busy
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                _, target, args = self._pending.popleft()
+                self._busy = True
+            try:
+                target(*args)
+            except Exception as e:
+                print(f"Command failed: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+
+
+class UpdateBatcher:
+    """Coalesces UI updates from worker threads into one callback per frame"""
+
+    def __init__(self, schedule, interval_ms=FRAME_MS):
+        """
+        Args:
+            schedule (callable): Runs a function on the UI thread after a
+                delay, called as schedule(ms, function), e.g. root.after
+            interval_ms (int): Delay before a flush
+        """
+        self.schedule = schedule
+        self.interval_ms = interval_ms
+        self._pending = {}
+        self._scheduled = False
+        self._lock = threading.Lock()
+
+    def put(self, key, callback):
+        """
+        Queue an update; a pending update with the same key is replaced
+
+        Args:
+            key: Identifies what the update redraws, e.g. an account row
+            callback (callable): Applies the update on the UI thread
+        """
+        with self._lock:
+            self._pending[key] = callback
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.schedule(self.interval_ms, self._flush)
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._scheduled = False
+        for callback in pending.values():
+            try:
+                callback()
+            except Exception as e:
+                print(f"UI update failed: {e}")
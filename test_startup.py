@@ -0,0 +1,69 @@
+"""
+Import-time budget for headless (CLI, cron, Django job) startup
+Fails when the CLI path starts importing the GUI or the HTML parsers
+eagerly, or when its own import cost grows past the budget.
+"""
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Modules only the GUI or the page parsers need
+HEAVY_MODULES = ('tkinter', '_tkinter', 'bs4', 'lxml')
+
+# Milliseconds src.bot_core may add on top of requests, which it needs anyway
+BUDGET_MS = float(os.environ.get('TEVECLUB_IMPORT_BUDGET_MS', '25'))
+
+HEADLESS_IMPORTS = [
+    'import main',
+    'import src',
+    'from src.bot_core import TeveClub',
+    'from src.daemon import submit',
+]
+
+# The daemon client path: imports nothing the warm daemon already holds
+CLIENT_IMPORT = 'import main; from src.daemon import DaemonUnavailable, run_action, submit'
+
+
+def import_profile(code):
+    """
+    Run `code` under python -X importtime
+
+    Returns:
+        dict: Module name -> cumulative import time in microseconds
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    profile = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|\s+(\S+)', line)
+        if match:
+            profile[match.group(2)] = int(match.group(1))
+    return profile
+
+
+def test_headless_imports_skip_gui_and_parsers():
+    """CLI and library imports never load tkinter, bs4 or lxml"""
+    for code in HEADLESS_IMPORTS:
+        loaded = import_profile(code)
+        heavy = [name for name in loaded if name.split('.')[0] in HEAVY_MODULES]
+        assert not heavy, f'{code!r} imported {heavy}'
+
+
+def test_daemon_client_skips_bot_imports():
+    """Submitting to the daemon does not load requests or the bot core"""
+    loaded = import_profile(CLIENT_IMPORT)
+    bot = [name for name in loaded if name.split('.')[0] == 'requests' or name == 'src.bot_core']
+    assert not bot, f'daemon client imported {bot}'
+
+
+def test_headless_import_budget():
+    """The bot core's own import cost stays within BUDGET_MS"""
+    own_ms = min(
+        (profile['src.bot_core'] - profile.get('requests', 0)) / 1000
+        for profile in (import_profile('from src.bot_core import TeveClub') for _ in range(3))
+    )
+    print(f'src.bot_core import: {own_ms:.1f} ms on top of requests (budget {BUDGET_MS:.0f} ms)')
+    assert own_ms <= BUDGET_MS